@@ -0,0 +1,127 @@
+"""
+Benchmark del codec de estado
+-----------------------------
+Mide el throughput de codificación y decodificación del codec central
+(core.utils.codec, orjson) frente a la serialización anterior con json
+de la stdlib (indent=2, ensure_ascii=False), sobre estados de campaña de
+tamaño realista: N jugadores con inventario completo, la aventura de
+ejemplo de adventures/ y un historial de memoria narrativa.
+
+Uso:
+    python benchmarks/bench_codec.py
+    python benchmarks/bench_codec.py --players 8 32 128 --seconds 1.0
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.utils import codec  # noqa: E402
+
+
+def _load_adventure() -> Dict[str, Any]:
+    path = os.path.join(ROOT, "adventures", "demo_mine_v1.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_campaign_state(players: int, timeline: int = 200) -> Dict[str, Any]:
+    """Estado con la forma de data/campaign_state.json + memoria narrativa."""
+    roster = {}
+    for i in range(players):
+        telegram_id = 100000000 + i
+        roster[str(telegram_id)] = {
+            "name": f"Aventurero {i}",
+            "race": "Elfo",
+            "class": "Mago",
+            "background": "Sabio",
+            "level": 3,
+            "telegram_id": telegram_id,
+            "attributes": {"STR": 8, "DEX": 14, "CON": 13, "INT": 16, "WIS": 12, "CHA": 10},
+            "modifiers": {"STR": -1, "DEX": 2, "CON": 1, "INT": 3, "WIS": 1, "CHA": 0},
+            "skills": ["Arcanos", "Historia", "Investigación", "Percepción"],
+            "spells": ["Luz", "Proyectil mágico", "Dormir", "Escudo", "Detectar magia"],
+            "equipment": {"weapon": "Bastón", "armor": None, "shield": None},
+            "inventory": [
+                {"name": f"Poción de curación {n}", "quantity": 1, "weight": 0.5, "description": "Recupera 2d4+2 PG."}
+                for n in range(12)
+            ],
+            "gold": 75,
+            "hp": {"current": 17, "max": 17},
+        }
+    return {
+        "campaign_name": "demo_mine_v1",
+        "campaign_title": "La Mina Olvidada",
+        "chapter": 1,
+        "current_scene": "Entrada de la mina",
+        "current_scene_id": "mine_entrance",
+        "adventure_ref": {"slug": "demo_mine_v1", "hash": "0123456789abcdef"},
+        "players": roster,
+        "active_party": [100000000 + i for i in range(min(players, 8))],
+        "party_chats": {str(100000000 + i): -1001234567890 for i in range(min(players, 8))},
+        "adventure_data": _load_adventure(),
+        "memory": {
+            "timeline": [
+                {"event": f"Evento {n}", "emotion": "tensión", "theme": "misterio", "timestamp": "2025-01-01T00:00:00"}
+                for n in range(timeline)
+            ],
+        },
+    }
+
+
+def _measure(fn: Callable[[], Any], seconds: float) -> float:
+    """Devuelve operaciones por segundo ejecutando fn durante ~seconds."""
+    fn()  # calentamiento
+    ops = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        fn()
+        ops += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return ops / (now - started)
+
+
+def run(player_counts: List[int], seconds: float) -> None:
+    header = f"{'jugadores':>9} {'tamaño':>10} {'codec':<22} {'encode/s':>10} {'decode/s':>10} {'MB/s enc':>9} {'MB/s dec':>9}"
+    print(header)
+    print("-" * len(header))
+    for players in player_counts:
+        state = build_campaign_state(players)
+        variants = {
+            "json (indent=2)": (
+                lambda: json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8"),
+                json.loads,
+            ),
+            "orjson compacto": (lambda: codec.dumps(state, pretty=False), codec.loads),
+            "orjson pretty": (lambda: codec.dumps(state, pretty=True), codec.loads),
+        }
+        for name, (encode, decode) in variants.items():
+            payload = encode()
+            size_mb = len(payload) / (1024 * 1024)
+            encode_rate = _measure(encode, seconds)
+            decode_rate = _measure(lambda: decode(payload), seconds)
+            print(
+                f"{players:>9} {len(payload):>9}B {name:<22} {encode_rate:>10.0f} {decode_rate:>10.0f} "
+                f"{encode_rate * size_mb:>9.1f} {decode_rate * size_mb:>9.1f}"
+            )
+        print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del codec de estado (orjson vs json)")
+    parser.add_argument("--players", type=int, nargs="+", default=[4, 8, 32, 128])
+    parser.add_argument("--seconds", type=float, default=0.5, help="duración de cada medición")
+    args = parser.parse_args()
+    run(args.players, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
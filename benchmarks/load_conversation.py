@@ -0,0 +1,368 @@
+"""
+Generador de carga de extremo a extremo
+---------------------------------------
+Simula N chats con M jugadores que envían acciones en lenguaje natural y
+las pasa por el camino real del bot: ChatUpdateProcessor (o procesamiento
+secuencial, como PTB sin concurrent_updates) -> ConversationHandler.handle_message
+-> ProcessPlayerActionUseCase -> GameService -> HTTP -> GameAPI local
+(benchmarks/mock_gameapi.py).
+
+Telegram se sustituye por un bot falso que registra los mensajes enviados y
+editados: nada sale a la red. La campaña y el StoryDirector son sustitutos
+en memoria (roster y escena fijos) para no tocar data/.
+
+Informa throughput y latencia extremo a extremo (p50/p95/p99) desde que
+llega el update hasta el mensaje final con la narrativa, y en streaming
+también hasta el primer mensaje visible. Además cuenta llamadas al GameAPI,
+mensajes y ediciones de Telegram y acciones descartadas por backpressure.
+
+Uso:
+    python benchmarks/load_conversation.py --chats 8 --players 4 --actions 5
+    python benchmarks/load_conversation.py --sequential --latency lognormal:0.8,0.5
+    python benchmarks/load_conversation.py --round-mode --latency fixed:1.0
+    python benchmarks/load_conversation.py --stream-mode --stream-delay 0.05
+    python benchmarks/load_conversation.py --gameapi-url http://127.0.0.1:9000
+
+Sin --gameapi-url arranca el GameAPI local en un puerto libre con las
+opciones de simulación indicadas (--latency, --error-rate, --cold-start...).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+from telegram import Update  # noqa: E402
+
+from benchmarks.mock_gameapi import LatencyModel, add_arguments  # noqa: E402
+
+ACTIONS = [
+    "abro la puerta con cuidado",
+    "miro alrededor buscando huellas",
+    "hablo con el minero herido",
+    "avanzo por el tunel con la antorcha",
+    "ataco al goblin con mi hacha",
+    "registro el cofre oxidado",
+]
+
+
+# ---------------------------------------------------------
+# Telegram falso
+# ---------------------------------------------------------
+class FakeMessage:
+    def __init__(self, bot: "FakeBot", chat_id: int, text: str) -> None:
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+
+    async def edit_text(self, text: str, parse_mode: Optional[str] = None, **kwargs: Any) -> "FakeMessage":
+        await self.bot.delay()
+        self.text = text
+        self.bot.edits += 1
+        self.bot.record(self.chat_id, text, final=parse_mode is not None)
+        return self
+
+
+class FakeBot:
+    """Bot sin red: registra envíos y ediciones y resuelve las acciones pendientes."""
+
+    def __init__(self, latency: LatencyModel) -> None:
+        self.latency = latency
+        self.id = 1
+        self.sends = 0
+        self.edits = 0
+        self.waits = 0
+        self.pending: Dict[int, Dict[str, Dict[str, float]]] = {}
+
+    async def delay(self) -> None:
+        seconds = self.latency.sample()
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def track(self, chat_id: int, token: str) -> None:
+        self.pending.setdefault(chat_id, {})[token] = {"sent": time.monotonic()}
+
+    def record(self, chat_id: int, text: str, final: bool) -> None:
+        now = time.monotonic()
+        for token, timing in self.pending.get(chat_id, {}).items():
+            if token not in text:
+                continue
+            timing.setdefault("first", now)
+            if final:
+                timing.setdefault("final", now)
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: Optional[str] = None, **kwargs: Any) -> FakeMessage:
+        await self.delay()
+        self.sends += 1
+        if text.startswith("⏳"):
+            self.waits += 1
+        self.record(chat_id, text, final=parse_mode is not None)
+        return FakeMessage(self, chat_id, text)
+
+    async def send_chat_action(self, chat_id: int, action: str, **kwargs: Any) -> None:
+        return None
+
+    async def get_chat(self, chat_id: int) -> SimpleNamespace:
+        return SimpleNamespace(id=chat_id, type="group")
+
+
+# ---------------------------------------------------------
+# Campaña en memoria
+# ---------------------------------------------------------
+class FakeCampaign:
+    def __init__(self, chats: int, players: int) -> None:
+        self.players: Dict[int, Dict[str, Any]] = {}
+        self.chat_members: Dict[int, List[int]] = {}
+        for c in range(chats):
+            chat_id = -1000 - c
+            self.chat_members[chat_id] = []
+            for p in range(players):
+                user_id = 100000 + c * 100 + p
+                self.players[user_id] = {"name": f"Heroe{c}_{p}", "class": "Guerrero", "level": 1, "chat_id": chat_id}
+                self.chat_members[chat_id].append(user_id)
+
+    def get_player_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return self.players.get(telegram_id)
+
+    def members_in_chat(self, chat_id: int, include_unassigned: bool = True) -> List[int]:
+        return self.chat_members.get(chat_id, [])
+
+    def get_all_party_chat_ids(self) -> List[int]:
+        return list(self.chat_members)
+
+
+class FakeStoryDirector:
+    def __init__(self, campaign: FakeCampaign) -> None:
+        self.campaign = campaign
+
+    def get_player(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.campaign.players.get(user_id)
+
+    def get_current_scene(self) -> Dict[str, Any]:
+        return {"found": True, "scene": {"title": "La mina abandonada", "narration": "Gotea agua en la oscuridad."}}
+
+
+# ---------------------------------------------------------
+# GameAPI local
+# ---------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args: argparse.Namespace) -> subprocess.Popen:
+    port = _free_port()
+    command = [
+        sys.executable, os.path.join(ROOT, "benchmarks", "mock_gameapi.py"), "--port", str(port),
+        "--latency", args.latency, "--meta-latency", args.meta_latency,
+        "--error-rate", str(args.error_rate), "--error-status", str(args.error_status),
+        "--cold-start", str(args.cold_start), "--idle-timeout", str(args.idle_timeout),
+        "--stream-delay", str(args.stream_delay),
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            # /mock/stats no cuenta como tráfico, así que no dispara el arranque en frío
+            if httpx.get(f"{url}/mock/stats", timeout=1).status_code == 200:
+                args.gameapi_url = url
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("El GameAPI local no arrancó")
+
+
+# ---------------------------------------------------------
+# Carga
+# ---------------------------------------------------------
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ["GAME_API_URL"] = args.gameapi_url
+    os.environ["ROUND_MODE"] = "1" if args.round_mode else "0"
+    os.environ["STREAM_MODE"] = "1" if args.stream_mode else "0"
+
+    # Importar tras fijar el entorno: los servicios leen su configuración al crearse
+    from core.handlers.conversation_handler import ConversationHandler
+    from core.services.chat_dispatcher import ChatUpdateProcessor
+    from core.services.game_service import GameService
+    from core.services.http_client_manager import HttpClientManager, install_http_client_manager
+    from core.story_director.director_link import DirectorLink
+    from core.use_cases.process_player_action import ProcessPlayerActionUseCase
+
+    rng = random.Random(args.seed)
+    manager = HttpClientManager()
+    install_http_client_manager(manager)
+    campaign = FakeCampaign(args.chats, args.players)
+    story_director = FakeStoryDirector(campaign)
+    use_case = ProcessPlayerActionUseCase(GameService(), story_director, DirectorLink(story_director))
+    handler = ConversationHandler(use_case, campaign)
+    bot = FakeBot(LatencyModel(args.telegram_latency, rng))
+    bot_data: Dict[str, Any] = {}
+    user_data: Dict[int, Dict[str, Any]] = {}
+
+    processor = None if args.sequential else ChatUpdateProcessor()
+    sequential_queue: "asyncio.Queue" = asyncio.Queue()
+
+    async def sequential_worker() -> None:
+        # Como PTB sin concurrent_updates: un update a la vez para todos los chats
+        while True:
+            coroutine = await sequential_queue.get()
+            try:
+                await coroutine
+            except Exception as e:
+                logging.getLogger("load").error(f"Error procesando update: {e}")
+            sequential_queue.task_done()
+
+    worker = asyncio.create_task(sequential_worker()) if processor is None else None
+    update_id = 0
+
+    async def player(chat_id: int, user_id: int) -> None:
+        nonlocal update_id
+        for n in range(args.actions):
+            await asyncio.sleep(rng.uniform(0, args.think_time))
+            update_id += 1
+            token = f"#{user_id}-{n}"
+            text = f"{rng.choice(ACTIONS)} {token}"
+            update = Update.de_json(
+                {
+                    "update_id": update_id,
+                    "message": {
+                        "message_id": update_id,
+                        "date": int(time.time()),
+                        "chat": {"id": chat_id, "type": "group"},
+                        "from": {"id": user_id, "is_bot": False, "first_name": f"Jugador{user_id}"},
+                        "text": text,
+                    },
+                },
+                bot,
+            )
+            context = SimpleNamespace(bot=bot, bot_data=bot_data, user_data=user_data.setdefault(user_id, {}))
+            bot.track(chat_id, token)
+            coroutine = handler.handle_message(update, context)
+            if processor is None:
+                sequential_queue.put_nowait(coroutine)
+            else:
+                await processor.process_update(update, coroutine)
+
+    started = time.monotonic()
+    await asyncio.gather(
+        *(player(chat_id, user_id) for chat_id, members in campaign.chat_members.items() for user_id in members)
+    )
+    total = args.chats * args.players * args.actions
+
+    def resolved() -> int:
+        return sum(1 for chat in bot.pending.values() for t in chat.values() if "final" in t)
+
+    deadline = time.monotonic() + args.timeout
+    while resolved() + bot.waits < total and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+
+    if processor is not None:
+        await processor.shutdown()
+        dispatcher_stats = processor.stats()
+    else:
+        worker.cancel()
+        dispatcher_stats = None
+    await manager.aclose()
+    install_http_client_manager(None)
+
+    timings = [t for chat in bot.pending.values() for t in chat.values()]
+    final = [t["final"] - t["sent"] for t in timings if "final" in t]
+    first = [t["first"] - t["sent"] for t in timings if "first" in t]
+    try:
+        gameapi = httpx.get(f"{args.gameapi_url}/mock/stats", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        gameapi = None
+
+    return {
+        "mode": "sequential" if args.sequential else "dispatcher",
+        "round_mode": args.round_mode,
+        "stream_mode": args.stream_mode,
+        "chats": args.chats,
+        "players": args.players,
+        "actions": total,
+        "completed": len(final),
+        "told_to_wait": bot.waits,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(final) / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {p: round(percentile(final, q), 3) for p, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "first_response_s": {p: round(percentile(first, q), 3) for p, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "telegram": {"sends": bot.sends, "edits": bot.edits},
+        "gameapi": gameapi,
+        "http": manager.stats(),
+        "outbound": manager.scheduler.stats(),
+        "dispatcher": dispatcher_stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga de extremo a extremo sobre ConversationHandler")
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--actions", type=int, default=5, help="acciones por jugador")
+    parser.add_argument("--think-time", type=float, default=2.0, help="pausa máxima entre acciones de un jugador (s)")
+    parser.add_argument("--sequential", action="store_true", help="un update a la vez (PTB sin concurrent_updates)")
+    parser.add_argument("--round-mode", action="store_true")
+    parser.add_argument("--stream-mode", action="store_true")
+    parser.add_argument("--telegram-latency", default="fixed:0", help="latencia simulada de cada envío/edición")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--gameapi-url", default=None, help="GameAPI existente (si no, se arranca el local)")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    process = start_mock(args) if args.gameapi_url is None else None
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    print(
+        f"{report['mode']}{' + rondas' if report['round_mode'] else ''}{' + streaming' if report['stream_mode'] else ''}: "
+        f"{report['chats']} chats x {report['players']} jugadores, {report['actions']} acciones"
+    )
+    print(f"  completadas {report['completed']}, 'espera tu turno' {report['told_to_wait']}, {report['elapsed_s']}s")
+    print(f"  throughput {report['throughput_per_s']} acciones/s")
+    lat, first = report["latency_s"], report["first_response_s"]
+    print(f"  latencia final   p50 {lat['p50']}s  p95 {lat['p95']}s  p99 {lat['p99']}s")
+    print(f"  primera respuesta p50 {first['p50']}s  p95 {first['p95']}s  p99 {first['p99']}s")
+    print(f"  telegram: {report['telegram']['sends']} envíos, {report['telegram']['edits']} ediciones")
+    if report["gameapi"]:
+        print(f"  gameapi: {report['gameapi']['requests']}, errores {report['gameapi']['errors']}")
+    for name, info in report["outbound"]["classes"].items():
+        if info["calls"]:
+            print(f"  turnos {name}: {info['calls']} llamadas, espera p50 {info['wait_p50']}s  p95 {info['wait_p95']}s")
+
+
+if __name__ == "__main__":
+    main()
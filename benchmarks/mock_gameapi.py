@@ -0,0 +1,322 @@
+"""
+GameAPI local de pruebas
+------------------------
+Servidor FastAPI que imita al GameAPI para desarrollo local y benchmarks,
+sin depender del servicio en Render. Responde con narrativa sintética.
+
+Endpoints:
+    GET  /health
+    POST /game/start            {"party_levels"} -> estado inicial
+    GET  /game/state
+    POST /party/join            {"player"} (400 si ya está en el grupo)
+    GET  /party
+    POST /game/action           {"player", "action", ...} -> {"player", "result"}
+    POST /game/action/stream    igual que /game/action, en Server-Sent Events
+                                (STREAM_MODE=1): "data: {"delta"}" por palabra
+                                y "event: done" al final
+    POST /game/actions/batch    contrato de rondas (ROUND_MODE=1):
+         request:  {"round_id", "scene"?, "actions": [{"action_id", "player", "action", "character"?}]}
+         response: {"round_id", "narrative", "results": [{"action_id", "player", "result", "event"?}]}
+    GET  /mock/stats            peticiones por endpoint, errores inyectados y arranques en frío
+
+/game/action y /game/action/stream implementan la caché de contexto de
+core/services/context_cache.py: guardan escena y personaje por hash,
+aceptan *_ref / *_delta, responden "context_cached": true (en streaming,
+cabecera X-Context-Cached: 1) y 409 {"missing": [...]} si no conocen un hash.
+
+La narrativa combinada de una ronda tiene una sección "Nombre: ..." por
+jugador, el formato que separa split_round_narrative(). Las respuestas se
+recuerdan por Idempotency-Key, como haría el GameAPI real ante un reintento.
+
+Simulación (opciones de línea de comandos):
+    --latency SPEC        latencia de los endpoints de acción
+    --meta-latency SPEC   latencia de estado, party y health
+        SPEC: fixed:S | uniform:A-B | normal:MEDIA,DESV | lognormal:MEDIANA,SIGMA (segundos)
+    --error-rate P        fracción de peticiones que fallan con --error-status (no /health)
+    --cold-start S        la primera petición (y la primera tras --idle-timeout
+                          segundos sin tráfico) espera S segundos, como Render al despertar;
+                          las que llegan mientras tanto esperan lo mismo
+    --stream-delay S      segundos entre fragmentos del stream
+
+Uso:
+    python benchmarks/mock_gameapi.py --port 9000
+    python benchmarks/mock_gameapi.py --port 9000 --latency lognormal:0.8,0.5 --error-rate 0.05 --cold-start 20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+CONTEXT_KINDS = ("scene", "character")
+
+ACTION_PATHS = ("/game/action", "/game/action/stream", "/game/actions/batch")
+
+
+class LatencyModel:
+    """Distribución de latencia a partir de una especificación de texto."""
+
+    def __init__(self, spec: str, rng: Optional[random.Random] = None) -> None:
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        try:
+            if self.kind == "fixed":
+                self.params = (float(params or 0),)
+            elif self.kind == "uniform":
+                low, high = params.split("-")
+                self.params = (float(low), float(high))
+            elif self.kind in ("normal", "lognormal"):
+                center, spread = params.split(",")
+                self.params = (float(center), float(spread))
+            else:
+                raise ValueError(kind)
+        except ValueError:
+            raise ValueError(f"Especificación de latencia inválida: {spec!r}") from None
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(*self.params))
+        median, sigma = self.params
+        return self.rng.lognormvariate(0.0, sigma) * median
+
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:0"
+    meta_latency: str = "fixed:0"
+    error_rate: float = 0.0
+    error_status: int = 503
+    cold_start: float = 0.0
+    idle_timeout: float = 900.0
+    stream_delay: float = 0.05
+    seed: Optional[int] = None
+
+
+class ActionRequest(BaseModel):
+    player: str
+    action: str
+    scene: Optional[Dict[str, Any]] = None
+    character: Optional[Dict[str, Any]] = None
+    scene_hash: Optional[str] = None
+    scene_ref: Optional[str] = None
+    scene_delta: Optional[Dict[str, Any]] = None
+    character_hash: Optional[str] = None
+    character_ref: Optional[str] = None
+    character_delta: Optional[Dict[str, Any]] = None
+
+
+class RoundAction(BaseModel):
+    action_id: str
+    player: str
+    action: str
+    character: Optional[Dict[str, Any]] = None
+
+
+class RoundRequest(BaseModel):
+    round_id: str
+    actions: List[RoundAction]
+    scene: Optional[Dict[str, Any]] = None
+
+
+class StartRequest(BaseModel):
+    party_levels: List[int] = [1]
+
+
+class JoinRequest(BaseModel):
+    player: str
+
+
+def _narrate(player: str, action: str, scene: Optional[Dict[str, Any]]) -> str:
+    place = (scene or {}).get("title") or "la escena"
+    return f"{player} intenta: {action.strip()}. En {place}, el mundo reacciona a su decisión."
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    action_latency = LatencyModel(config.latency, rng)
+    meta_latency = LatencyModel(config.meta_latency, rng)
+
+    app = FastAPI(title="GameAPI mock")
+    seen: Dict[str, Dict[str, Any]] = {}
+    game: Dict[str, Any] = {"started": False, "party_levels": [], "turn": 0}
+    party: List[str] = []
+    stats: Dict[str, Any] = {"requests": Counter(), "errors": 0, "cold_starts": 0, "context_bytes": 0}
+    clock = {"last_request": None, "awake_at": 0.0}
+    contexts: Dict[str, Dict[str, Any]] = {}
+
+    def resolve_context(body: ActionRequest) -> List[str]:
+        """Completa escena/personaje desde la caché. Retorna los hashes que faltan."""
+        stats["context_bytes"] += len(body.model_dump_json(exclude_none=True))
+        missing = []
+        for kind in CONTEXT_KINDS:
+            full, ref = getattr(body, kind), getattr(body, f"{kind}_ref")
+            if full is None and ref is not None:
+                base = contexts.get(ref)
+                if base is None:
+                    missing.append(kind)
+                    continue
+                full = {**base, **(getattr(body, f"{kind}_delta") or {})}
+                setattr(body, kind, full)
+            hash_ = getattr(body, f"{kind}_hash") or ref
+            if full is not None and hash_:
+                contexts[hash_] = full
+        return missing
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        path = request.url.path
+        if path == "/mock/stats":
+            return await call_next(request)
+        stats["requests"][path] += 1
+
+        now = time.monotonic()
+        last = clock["last_request"]
+        clock["last_request"] = now
+        if config.cold_start > 0 and (last is None or now - last > config.idle_timeout):
+            clock["awake_at"] = now + config.cold_start
+            stats["cold_starts"] += 1
+        if now < clock["awake_at"]:
+            await asyncio.sleep(clock["awake_at"] - now)
+
+        delay = (action_latency if path in ACTION_PATHS else meta_latency).sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if path != "/health" and config.error_rate > 0 and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"detail": "error simulado"}, status_code=config.error_status)
+        return await call_next(request)
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok"}
+
+    @app.get("/mock/stats")
+    async def mock_stats() -> Dict[str, Any]:
+        return {
+            "requests": dict(stats["requests"]),
+            "errors": stats["errors"],
+            "cold_starts": stats["cold_starts"],
+            "action_body_bytes": stats["context_bytes"],
+        }
+
+    @app.post("/game/start")
+    async def game_start(body: StartRequest) -> Dict[str, Any]:
+        game.update(started=True, party_levels=body.party_levels, turn=0)
+        return {"status": "started", **game, "scene": {"title": "La entrada de la mina", "options": ["Entrar", "Esperar"]}}
+
+    @app.get("/game/state")
+    async def game_state() -> Dict[str, Any]:
+        return {**game, "party": party}
+
+    @app.post("/party/join")
+    async def party_join(body: JoinRequest) -> Dict[str, Any]:
+        if body.player in party:
+            raise HTTPException(status_code=400, detail="Ya está en el grupo")
+        party.append(body.player)
+        return {"joined": body.player, "party": party}
+
+    @app.get("/party")
+    async def get_party() -> Dict[str, Any]:
+        return {"party": party}
+
+    @app.post("/game/action")
+    async def game_action(body: ActionRequest, idempotency_key: Optional[str] = Header(None)) -> Any:
+        if idempotency_key and idempotency_key in seen:
+            return seen[idempotency_key]
+        missing = resolve_context(body)
+        if missing:
+            return JSONResponse({"missing": missing}, status_code=409)
+        game["turn"] += 1
+        response = {"player": body.player, "result": _narrate(body.player, body.action, body.scene), "context_cached": True}
+        if idempotency_key:
+            seen[idempotency_key] = response
+        return response
+
+    @app.post("/game/action/stream")
+    async def game_action_stream(body: ActionRequest) -> Any:
+        missing = resolve_context(body)
+        if missing:
+            return JSONResponse({"missing": missing}, status_code=409)
+        game["turn"] += 1
+        words = _narrate(body.player, body.action, body.scene).split(" ")
+
+        async def events():
+            for i, word in enumerate(words):
+                await asyncio.sleep(config.stream_delay)
+                delta = word if i == 0 else f" {word}"
+                yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"X-Context-Cached": "1"})
+
+    @app.post("/game/actions/batch")
+    async def game_actions_batch(body: RoundRequest, idempotency_key: Optional[str] = Header(None)) -> Dict[str, Any]:
+        key = idempotency_key or body.round_id
+        if key in seen:
+            return seen[key]
+        game["turn"] += 1
+        results = [
+            {"action_id": a.action_id, "player": a.player, "result": _narrate(a.player, a.action, body.scene)}
+            for a in body.actions
+        ]
+        narrative = "\n\n".join(f"{r['player']}: {r['result']}" for r in results)
+        response = {"round_id": body.round_id, "narrative": narrative, "results": results}
+        seen[key] = response
+        return response
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opciones de simulación (compartidas con load_conversation.py)."""
+    parser.add_argument("--latency", default="fixed:0", help="latencia de las acciones (ver docstring)")
+    parser.add_argument("--meta-latency", default="fixed:0", help="latencia de estado/party/health")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--cold-start", type=float, default=0.0)
+    parser.add_argument("--idle-timeout", type=float, default=900.0)
+    parser.add_argument("--stream-delay", type=float, default=0.05, help="segundos entre fragmentos del stream")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        meta_latency=args.meta_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        cold_start=args.cold_start,
+        idle_timeout=args.idle_timeout,
+        stream_delay=args.stream_delay,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="GameAPI local de pruebas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
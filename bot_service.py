@@ -2,6 +2,8 @@ import os
 import httpx
 from dotenv import load_dotenv
 
+from core.services.http_client_manager import http_client
+
 # ================================================================
 # ⚙️ Configuración base
 # ================================================================
@@ -27,6 +29,7 @@ def get_http_client():
     """
     Devuelve un cliente HTTPX configurado para conexiones seguras (HTTPS)
     compatible con Render y entornos Windows.
+    Las funciones de este módulo usan el cliente compartido de http_client("gameapi").
     """
     return httpx.AsyncClient(
         timeout=60.0,
@@ -42,7 +45,7 @@ def get_http_client():
 async def send_action(player: str, action: str) -> dict:
     """Envía una acción al GameAPI y devuelve la respuesta procesada."""
     try:
-        async with get_http_client() as client:
+        async with http_client("gameapi") as client:
             payload = {"player": player, "action": action}
             url = f"{GAME_API_URL}/game/action"
             r = await client.post(url, json=payload)
@@ -58,7 +61,7 @@ async def send_action(player: str, action: str) -> dict:
 async def get_state() -> dict:
     """Obtiene el estado actual de la partida desde el GameAPI."""
     try:
-        async with get_http_client() as client:
+        async with http_client("gameapi") as client:
             url = f"{GAME_API_URL}/game/state"
             r = await client.get(url)
             r.raise_for_status()
@@ -77,7 +80,7 @@ async def get_state() -> dict:
 async def start_game():
     """Inicia una nueva partida en el GameAPI (si no hay partida activa)."""
     try:
-        async with get_http_client() as client:
+        async with http_client("gameapi") as client:
             payload = {"party_levels": [3, 3, 4]}  # grupo base de ejemplo
             url = f"{GAME_API_URL}/game/start"
             r = await client.post(url, json=payload)
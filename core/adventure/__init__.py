@@ -1,3 +1,4 @@
 from .adventure_loader import AdventureLoader
+from .adventure_store import AdventureStore
 
-__all__ = ["AdventureLoader"]
+__all__ = ["AdventureLoader", "AdventureStore"]
@@ -0,0 +1,125 @@
+"""
+Adventure Store
+Content-addressed store for parsed adventures.
+
+Adventures are identified by a reference {"slug": ..., "hash": ...} where the
+hash is computed over the canonical JSON content. Campaign state only keeps
+that reference; the parsed adventure lives in a shared in-memory cache and,
+on disk, in an immutable blob (data/adventure_store/<slug>-<hash>.json) that
+is written once per adventure version.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from core.adventure.adventure_loader import AdventureLoader
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+
+class AdventureStore:
+    """
+    Shared cache of parsed adventures keyed by slug + content hash.
+    All instances share the same in-memory cache.
+    """
+
+    _cache: Dict[str, Dict[str, Any]] = {}
+
+    def __init__(self, store_dir: str = "data/adventure_store", adventures_dir: str = "adventures"):
+        self.store_dir = store_dir
+        self.adventures_dir = adventures_dir
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    # ---------------------------------------------------------
+    # Hashing / keys
+    # ---------------------------------------------------------
+    @staticmethod
+    def content_hash(adventure_data: Dict[str, Any]) -> str:
+        """Returns a short sha256 over the canonical JSON of the adventure."""
+        canonical = json.dumps(adventure_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _key(ref: Dict[str, str]) -> str:
+        return f"{ref['slug']}@{ref['hash']}"
+
+    def _blob_path(self, ref: Dict[str, str]) -> str:
+        safe_slug = "".join(c if c.isalnum() or c in "-_" else "_" for c in ref["slug"])
+        return os.path.join(self.store_dir, f"{safe_slug}-{ref['hash']}.json")
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def put(self, slug: str, adventure_data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Registers an adventure and returns its reference.
+        The blob is only written the first time a given version is seen.
+        """
+        ref = {"slug": slug, "hash": self.content_hash(adventure_data)}
+        key = self._key(ref)
+        if key not in self._cache:
+            self._cache[key] = adventure_data
+        path = self._blob_path(ref)
+        if not os.path.exists(path):
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    codec.dump(adventure_data, f)
+                os.replace(tmp_path, path)
+                logger.info(f"[AdventureStore] Adventure '{slug}' stored as {os.path.basename(path)}")
+            except Exception as e:
+                logger.warning(f"[AdventureStore] Could not write blob for '{slug}': {e}")
+        return ref
+
+    def get(self, ref: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """
+        Resolves a reference to the parsed adventure.
+        Order: in-memory cache -> stored blob -> adventures/ source file.
+        """
+        if not ref or not ref.get("slug") or not ref.get("hash"):
+            return None
+
+        key = self._key(ref)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        path = self._blob_path(ref)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    adventure_data = codec.load(f)
+                self._cache[key] = adventure_data
+                logger.info(f"[AdventureStore] Adventure '{ref['slug']}' loaded from store ({ref['hash']})")
+                return adventure_data
+            except Exception as e:
+                logger.warning(f"[AdventureStore] Could not read blob {path}: {e}")
+
+        # Fallback: source file in adventures/ (may be a newer version)
+        adventure_data = AdventureLoader(self.adventures_dir).load_adventure(ref["slug"])
+        if adventure_data is None:
+            logger.error(f"[AdventureStore] Adventure '{ref['slug']}' not found in store nor in {self.adventures_dir}")
+            return None
+        new_ref = self.put(ref["slug"], adventure_data)
+        if new_ref["hash"] != ref["hash"]:
+            logger.warning(
+                f"[AdventureStore] Adventure '{ref['slug']}' changed on disk "
+                f"({ref['hash']} -> {new_ref['hash']}), using current version"
+            )
+        self._cache[key] = adventure_data
+        return adventure_data
+
+    @classmethod
+    def peek(cls, ref: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Returns the cached adventure for a reference without touching disk."""
+        if not ref or not ref.get("slug") or not ref.get("hash"):
+            return None
+        return cls._cache.get(cls._key(ref))
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Empties the shared in-memory cache."""
+        cls._cache.clear()
@@ -2,6 +2,8 @@ import os
 import json
 from datetime import datetime
 
+from core.utils.segmented_log import log_dir_for, read_log
+
 # ================================================================
 # 📊 EMOTIONAL ANALYTICS DASHBOARD (Fase 6.28)
 # ================================================================
@@ -29,6 +31,10 @@ def _load_json(path, default):
     except json.JSONDecodeError:
         return default
 
+def _load_log(path):
+    # Memorias emocionales con historial segmentado (ver core/utils/segmented_log.py)
+    return read_log(log_dir_for(path), legacy_file=path)
+
 def _fmt_pct(x):
     try:
         return f"{100*float(x):.0f}%"
@@ -57,10 +63,10 @@ class EmotionDashboard:
         # Cargas suaves (no rompen si falta algún archivo)
         self.scene_history = _load_json(FILES["scene_history"], {"scenes": []})
         self.emotional_state = _load_json(FILES["emotional_state"], {"summary": {}, "vector": {}})
-        self.tone_memory = _load_json(FILES["tone_memory"], {"imprint": {}, "history": []})
-        self.collective = _load_json(FILES["collective_memory"], {"patterns": {}, "history": []})
-        self.projection = _load_json(FILES["world_projection"], {"history": []})
-        self.reinforcement = _load_json(FILES["reinforcement"], {"reinforcement_profile": {}, "history": []})
+        self.tone_memory = _load_log(FILES["tone_memory"])
+        self.collective = _load_log(FILES["collective_memory"])
+        self.projection = _load_log(FILES["world_projection"])
+        self.reinforcement = _load_log(FILES["reinforcement"])
 
     # ------------------------------------------------------------
     # 🔎 Extractores de métricas
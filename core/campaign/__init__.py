@@ -1,3 +1,6 @@
+from .campaign_index import CampaignIndex
 from .campaign_manager import CampaignManager
+from .journal import CampaignJournal
+from .state_store import JsonStateStore, SqliteStateStore, StateStoreClosedError, create_state_store
 
-__all__ = ["CampaignManager"]
+__all__ = ["CampaignManager", "CampaignIndex", "CampaignJournal", "JsonStateStore", "SqliteStateStore", "StateStoreClosedError", "create_state_store"]
@@ -0,0 +1,131 @@
+"""
+Campaign Index
+--------------
+Índices secundarios en memoria sobre el estado de CampaignManager.
+
+Evitan recorrer todos los jugadores en cada búsqueda:
+- telegram_id -> clave del jugador
+- nombre (sin mayúsculas) -> clave del jugador
+- chat_id -> miembros de la party en ese chat
+
+CampaignManager los mantiene al día en cada mutación (add_player,
+update_player_field, add_to_active_party) y los reconstruye al cargar
+el estado completo (_load_state, load_from_dict).
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _as_telegram_id(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _name_key(name: Any) -> Optional[str]:
+    if not isinstance(name, str) or not name.strip():
+        return None
+    return name.strip().casefold()
+
+
+class CampaignIndex:
+    """
+    Mapas de búsqueda O(1) derivados del estado de campaña.
+    El estado sigue siendo la fuente de verdad; el índice se puede
+    reconstruir en cualquier momento con rebuild().
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.player_by_telegram_id: Dict[int, str] = {}
+        self.player_by_name: Dict[str, str] = {}
+        self.members_by_chat: Dict[int, Dict[int, None]] = {}
+        self.chat_by_member: Dict[int, int] = {}
+        self.active_party: Dict[int, None] = {}
+        self.unassigned: Dict[int, None] = {}  # miembros activos sin chat registrado
+        # Términos indexados por jugador, para poder desindexarlo al cambiar
+        self._player_terms: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+
+    def rebuild(self, state: Dict[str, Any]) -> None:
+        """Reconstruye todos los índices a partir del estado completo."""
+        self.clear()
+        for key, player in state.get("players", {}).items():
+            if isinstance(player, dict):
+                self.index_player(str(key), player)
+        for telegram_id, chat_id in state.get("party_chats", {}).items():
+            self.set_member_chat(telegram_id, chat_id)
+        for telegram_id in state.get("active_party", []):
+            self.add_member(telegram_id)
+
+    # ---------------------------------------------------------
+    # Jugadores
+    # ---------------------------------------------------------
+    def index_player(self, player_key: str, player: Dict[str, Any]) -> None:
+        """Indexa (o reindexa) un jugador por telegram_id y nombre."""
+        self.unindex_player(player_key)
+        telegram_id = _as_telegram_id(player.get("telegram_id"))
+        name = _name_key(player.get("name"))
+        if telegram_id is not None:
+            self.player_by_telegram_id.setdefault(telegram_id, player_key)
+        if name is not None:
+            self.player_by_name.setdefault(name, player_key)
+        self._player_terms[player_key] = (telegram_id, name)
+
+    def unindex_player(self, player_key: str) -> None:
+        telegram_id, name = self._player_terms.pop(player_key, (None, None))
+        if telegram_id is not None and self.player_by_telegram_id.get(telegram_id) == player_key:
+            del self.player_by_telegram_id[telegram_id]
+        if name is not None and self.player_by_name.get(name) == player_key:
+            del self.player_by_name[name]
+
+    def player_key_for(self, telegram_id: Any) -> Optional[str]:
+        return self.player_by_telegram_id.get(_as_telegram_id(telegram_id))
+
+    def player_key_by_name(self, name: str) -> Optional[str]:
+        return self.player_by_name.get(_name_key(name))
+
+    # ---------------------------------------------------------
+    # Party / chats
+    # ---------------------------------------------------------
+    def add_member(self, telegram_id: Any) -> None:
+        telegram_id = _as_telegram_id(telegram_id)
+        if telegram_id is not None:
+            self.active_party[telegram_id] = None
+            if telegram_id not in self.chat_by_member:
+                self.unassigned[telegram_id] = None
+
+    def set_member_chat(self, telegram_id: Any, chat_id: Any) -> None:
+        telegram_id = _as_telegram_id(telegram_id)
+        if telegram_id is None:
+            return
+        previous = self.chat_by_member.pop(telegram_id, None)
+        if previous is not None:
+            members = self.members_by_chat.get(previous, {})
+            members.pop(telegram_id, None)
+            if not members:
+                self.members_by_chat.pop(previous, None)
+        if chat_id:
+            self.chat_by_member[telegram_id] = chat_id
+            self.members_by_chat.setdefault(chat_id, {})[telegram_id] = None
+            self.unassigned.pop(telegram_id, None)
+        elif telegram_id in self.active_party:
+            self.unassigned[telegram_id] = None
+
+    def is_member(self, telegram_id: Any) -> bool:
+        return _as_telegram_id(telegram_id) in self.active_party
+
+    def members_in_chat(self, chat_id: int, include_unassigned: bool = True) -> List[int]:
+        """
+        Miembros de la party activa en un chat.
+        Con include_unassigned también se incluyen los miembros sin chat registrado.
+        """
+        members = [t for t in self.members_by_chat.get(chat_id, {}) if t in self.active_party]
+        if include_unassigned:
+            members.extend(self.unassigned)
+        return members
+
+    def chat_ids(self) -> List[int]:
+        return list(self.members_by_chat)
@@ -1,8 +1,16 @@
-import json
 import os
 import logging
 from typing import Any, Dict, Optional
 
+from core.campaign.campaign_index import CampaignIndex
+from core.campaign.journal import CampaignJournal
+from core.campaign.state_store import StateStoreClosedError, create_state_store, migrate_json_state
+from core.services.persistence_service import verify_snapshot
+
+# Claves que solo viven en memoria: la aventura se persiste como referencia
+# (adventure_ref) en el AdventureStore, no embebida en cada archivo de guardado.
+TRANSIENT_KEYS = ("adventure_data", "adventure_scenes")
+
 
 class CampaignManager:
     """
@@ -10,11 +18,38 @@ class CampaignManager:
     - datos de campaña (nombre, capítulo, escena)
     - jugadores
     Se persiste en un JSON (por defecto: data/campaign_state.json)
+
+    En modo journal (CAMPAIGN_JOURNAL_MODE=1) los cambios pequeños se añaden
+    como registros delta a data/campaign_state.journal y el snapshot completo
+    solo se reescribe al compactar (compact_journal).
+
+    Con STATE_STORE_BACKEND=sqlite el estado se guarda en SQLite (WAL) con
+    escrituras puntuales por jugador/miembro y búsquedas indexadas. Si la base
+    está vacía se migra una vez desde los archivos JSON existentes.
+
+    Las búsquedas por telegram_id, nombre y chat usan índices en memoria
+    (CampaignIndex) que se mantienen en cada mutación.
     """
 
-    def __init__(self, state_path: str = "data/campaign_state.json") -> None:
+    def __init__(
+        self,
+        state_path: str = "data/campaign_state.json",
+        journal_mode: Optional[bool] = None,
+        store=None,
+        story_director_state_path: Optional[str] = None,
+        shard: bool = False,
+    ) -> None:
         self.logger = logging.getLogger("core.campaign.campaign_manager")
         self.state_path = state_path
+        # story_director_state.json del mismo directorio: la migración a SQLite
+        # solo lee los archivos de este estado (global o shard de un chat)
+        self.story_director_state_path = story_director_state_path or os.path.join(
+            os.path.dirname(state_path), "story_director_state.json"
+        )
+        if journal_mode is None:
+            journal_mode = os.getenv("CAMPAIGN_JOURNAL_MODE", "").lower() in ("1", "true", "yes")
+        self.store = store if store is not None else create_state_store(state_path, journal_mode=journal_mode, shard=shard)
+        self.index = CampaignIndex()
         self.state: Dict[str, Any] = {
             "campaign_name": "TheGeniesWishes",
             "chapter": 1,
@@ -23,7 +58,12 @@ class CampaignManager:
         }
         self._ensure_dir()
         self._load_state()
-        self.logger.info("[CampaignManager] Estado cargado en %s", self.state_path)
+        self.logger.info("[CampaignManager] Estado cargado en %s (backend: %s)", self.state_path, self.store.backend)
+
+    @property
+    def journal(self) -> Optional[CampaignJournal]:
+        """Journal delta del backend JSON (None si no está activo)."""
+        return getattr(self.store, "journal", None)
 
     # ---------------------------------------------------------
     # Inicialización y persistencia
@@ -45,62 +85,74 @@ class CampaignManager:
         }
         self.state = default_state.copy()
         
-        if os.path.exists(self.state_path):
+        persisted = self.store.exists()
+        try:
+            loaded_state = self.store.load()
+            if loaded_state is None and self.store.backend == "sqlite":
+                # Migración única desde los archivos JSON
+                loaded_state = migrate_json_state(self.state_path, self.story_director_state_path)
+                persisted = False
+        except Exception as e:
+            self.logger.warning("[CampaignManager] No pude leer el estado guardado, uso estado por defecto: %s", e)
+            loaded_state = None
+
+        if loaded_state is not None:
             try:
-                with open(self.state_path, "r", encoding="utf-8") as f:
-                    loaded_state = json.load(f)
-                    
-                    # Migrate old format to new format
-                    if "campaign_id" in loaded_state:
-                        # Old format - migrate
-                        self.state["campaign_name"] = loaded_state.get("campaign_title", loaded_state.get("campaign_id", "TheGeniesWishes"))
-                        self.state["chapter"] = loaded_state.get("current_chapter", 1)
-                        self.state["current_scene"] = loaded_state.get("active_scene", "Oasis perdido")
-                        self.logger.info("[CampaignManager] Migrated old campaign state format")
-                    
-                    # Preserve ALL other keys from loaded state (including adventure data)
-                    for key, value in loaded_state.items():
-                        if key not in ["campaign_id", "campaign_title", "current_chapter", "active_scene"]:
-                            # Preserve all other keys, including adventure_data, current_scene_id, etc.
-                            self.state[key] = value
-                    
-                    # Explicitly preserve these critical keys if they exist
-                    if "players" in loaded_state and isinstance(loaded_state["players"], dict):
-                        self.state["players"] = loaded_state["players"]
-                    
-                    if "active_party" in loaded_state:
-                        self.state["active_party"] = loaded_state["active_party"]
-                    
-                    if "party_chats" in loaded_state:
-                        self.state["party_chats"] = loaded_state["party_chats"]
-                    
-                    if "adventure_data" in loaded_state:
-                        self.state["adventure_data"] = loaded_state["adventure_data"]
-                    
-                    if "current_scene_id" in loaded_state:
-                        self.state["current_scene_id"] = loaded_state["current_scene_id"]
-                    
-                    if "adventure_scenes" in loaded_state:
-                        self.state["adventure_scenes"] = loaded_state["adventure_scenes"]
-                    
-                    if "campaign_title" in loaded_state:
-                        self.state["campaign_title"] = loaded_state["campaign_title"]
-                    
-                    # Logging para verificar que adventure_data se cargó
-                    loaded_adventure_data = self.state.get("adventure_data")
-                    loaded_scene_id = self.state.get("current_scene_id")
-                    self.logger.info(f"[CampaignManager] Estado cargado. adventure_data presente: {loaded_adventure_data is not None}, current_scene_id: {loaded_scene_id}")
-                    if loaded_adventure_data:
-                        # Verificar estructura
-                        if isinstance(loaded_adventure_data, dict) and "scenes" in loaded_adventure_data:
-                            scene_count = len(loaded_adventure_data.get("scenes", []))
-                            self.logger.info(f"[CampaignManager] adventure_data tiene estructura válida con {scene_count} escenas")
-                        else:
-                            self.logger.warning(f"[CampaignManager] adventure_data no tiene estructura válida. Tipo: {type(loaded_adventure_data)}, keys: {list(loaded_adventure_data.keys()) if isinstance(loaded_adventure_data, dict) else 'N/A'}")
-                    
+                # Migrate old format to new format
+                if "campaign_id" in loaded_state:
+                    # Old format - migrate
+                    self.state["campaign_name"] = loaded_state.get("campaign_title", loaded_state.get("campaign_id", "TheGeniesWishes"))
+                    self.state["chapter"] = loaded_state.get("current_chapter", 1)
+                    self.state["current_scene"] = loaded_state.get("active_scene", "Oasis perdido")
+                    self.logger.info("[CampaignManager] Migrated old campaign state format")
+                
+                # Preserve ALL other keys from loaded state (including adventure data)
+                for key, value in loaded_state.items():
+                    if key not in ["campaign_id", "campaign_title", "current_chapter", "active_scene"]:
+                        # Preserve all other keys, including adventure_data, current_scene_id, etc.
+                        self.state[key] = value
+                
+                # Explicitly preserve these critical keys if they exist
+                if "players" in loaded_state and isinstance(loaded_state["players"], dict):
+                    self.state["players"] = loaded_state["players"]
+                
+                if "active_party" in loaded_state:
+                    self.state["active_party"] = loaded_state["active_party"]
+                
+                if "party_chats" in loaded_state:
+                    self.state["party_chats"] = loaded_state["party_chats"]
+                
+                if "adventure_data" in loaded_state:
+                    self.state["adventure_data"] = loaded_state["adventure_data"]
+                
+                if "current_scene_id" in loaded_state:
+                    self.state["current_scene_id"] = loaded_state["current_scene_id"]
+                
+                if "adventure_scenes" in loaded_state:
+                    self.state["adventure_scenes"] = loaded_state["adventure_scenes"]
+                
+                if "campaign_title" in loaded_state:
+                    self.state["campaign_title"] = loaded_state["campaign_title"]
+
+                # Resolver la referencia a la aventura (o migrar adventure_data embebido)
+                self._attach_adventure()
+                
+                # Logging para verificar que adventure_data se cargó
+                loaded_adventure_data = self.state.get("adventure_data")
+                loaded_scene_id = self.state.get("current_scene_id")
+                self.logger.info(f"[CampaignManager] Estado cargado. adventure_data presente: {loaded_adventure_data is not None}, adventure_ref: {self.state.get('adventure_ref')}, current_scene_id: {loaded_scene_id}")
+                if loaded_adventure_data:
+                    # Verificar estructura
+                    if isinstance(loaded_adventure_data, dict) and "scenes" in loaded_adventure_data:
+                        scene_count = len(loaded_adventure_data.get("scenes", []))
+                        self.logger.info(f"[CampaignManager] adventure_data tiene estructura válida con {scene_count} escenas")
+                    else:
+                        self.logger.warning(f"[CampaignManager] adventure_data no tiene estructura válida. Tipo: {type(loaded_adventure_data)}, keys: {list(loaded_adventure_data.keys()) if isinstance(loaded_adventure_data, dict) else 'N/A'}")
+                
             except Exception as e:
-                self.logger.warning("[CampaignManager] No pude leer el JSON, uso estado por defecto: %s", e)
-        else:
+                self.logger.warning("[CampaignManager] No pude aplicar el estado guardado, uso estado por defecto: %s", e)
+
+        if not persisted:
             self._save_state()
 
         # Ensure critical keys exist (safety check)
@@ -110,6 +162,7 @@ class CampaignManager:
         self.state.setdefault("current_scene", "Oasis perdido")
         self.state.setdefault("active_party", [])
         self.state.setdefault("party_chats", {})
+        self.rebuild_indexes()
         
         # CORRECCIÓN CRÍTICA: Si current_scene es un nombre de archivo JSON, corregirlo
         current_scene = self.state.get("current_scene", "")
@@ -148,10 +201,58 @@ class CampaignManager:
             # Nota: No podemos acceder a StoryDirector desde aquí, así que solo logueamos
             self.logger.info(f"[CampaignManager] Se recomienda ejecutar /loadcampaign {campaign_name} para recargar la aventura")
 
+    def _attach_adventure(self) -> None:
+        """
+        Enlaza el estado con la aventura del AdventureStore.
+        - Si hay adventure_data embebido (formato antiguo), lo registra en el store
+          y guarda solo la referencia.
+        - Si solo hay adventure_ref, resuelve la aventura desde la caché compartida.
+        """
+        from core.adventure.adventure_store import AdventureStore
+
+        store = AdventureStore()
+        adventure_data = self.state.get("adventure_data")
+        ref = self.state.get("adventure_ref")
+        try:
+            if isinstance(adventure_data, dict) and ref and store.peek(ref) is adventure_data:
+                pass  # ya enlazada con la caché compartida
+            elif isinstance(adventure_data, dict):
+                slug = (ref or {}).get("slug") or self.state.get("campaign_name", "adventure")
+                ref = store.put(slug, adventure_data)
+                self.state["adventure_ref"] = ref
+                self.state["adventure_data"] = store.get(ref)
+            elif ref:
+                self.state["adventure_data"] = store.get(ref)
+        except Exception as e:
+            self.logger.error(f"[CampaignManager] Error resolviendo aventura {ref}: {e}", exc_info=True)
+
+        adventure_data = self.state.get("adventure_data")
+        if isinstance(adventure_data, dict):
+            self.state["adventure_scenes"] = adventure_data.get("scenes", [])
+
+    def set_adventure(self, slug: str, adventure_data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Registra la aventura en el AdventureStore y la asocia a la campaña.
+        El estado persistido solo guarda la referencia {slug, hash}.
+        """
+        from core.adventure.adventure_store import AdventureStore
+
+        store = AdventureStore()
+        ref = store.put(slug, adventure_data)
+        self.state["adventure_ref"] = ref
+        self.state["adventure_data"] = store.get(ref)
+        self.state["adventure_scenes"] = self.state["adventure_data"].get("scenes", [])
+        return ref
+
+    def _serializable_state(self) -> Dict[str, Any]:
+        """Estado tal como se persiste: sin el contenido de la aventura, solo su referencia."""
+        return {k: v for k, v in self.state.items() if k not in TRANSIENT_KEYS}
+
     def _save_state(self) -> None:
         try:
             # Verificar que adventure_data está presente antes de guardar
             has_adventure_data = "adventure_data" in self.state and self.state.get("adventure_data") is not None
+            adventure_ref = self.state.get("adventure_ref")
             current_scene_id = self.state.get("current_scene_id")
             campaign_name = self.state.get("campaign_name", "")
             
@@ -159,44 +260,53 @@ class CampaignManager:
                 adventure_data = self.state.get("adventure_data")
                 if isinstance(adventure_data, dict):
                     scene_count = len(adventure_data.get("scenes", []))
-                    self.logger.info(f"[CampaignManager] _save_state - Guardando estado con adventure_data ({scene_count} escenas), current_scene_id: {current_scene_id}, campaign_name: {campaign_name}")
+                    self.logger.info(f"[CampaignManager] _save_state - Guardando estado con adventure_ref {adventure_ref} ({scene_count} escenas), current_scene_id: {current_scene_id}, campaign_name: {campaign_name}")
                 else:
                     self.logger.warning(f"[CampaignManager] _save_state - adventure_data no es un dict: {type(adventure_data)}")
             else:
                 self.logger.warning(f"[CampaignManager] _save_state - adventure_data NO está presente. campaign_name: {campaign_name}, current_scene_id: {current_scene_id}")
             
-            # Intentar serializar para verificar que no hay problemas
-            try:
-                json_str = json.dumps(self.state, ensure_ascii=False, indent=2)
-                json_size = len(json_str)
-                self.logger.debug(f"[CampaignManager] Estado serializado correctamente. Tamaño: {json_size} bytes")
-            except Exception as e:
-                self.logger.error(f"[CampaignManager] Error al serializar estado: {e}", exc_info=True)
-                raise
-            
-            with open(self.state_path, "w", encoding="utf-8") as f:
-                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            # JSON: snapshot atómico con cabecera (write-behind vía PersistenceService,
+            # o inmediato si no hay event loop). SQLite: reescritura de las tablas en una transacción.
+            written_now = self.store.save_snapshot(self._serializable_state)
             
-            # Verificar que se guardó correctamente leyendo el archivo
-            if has_adventure_data:
-                try:
-                    with open(self.state_path, "r", encoding="utf-8") as f:
-                        saved_data = json.load(f)
-                        saved_has_adventure = "adventure_data" in saved_data and saved_data.get("adventure_data") is not None
-                        if saved_has_adventure:
-                            saved_adventure = saved_data.get("adventure_data")
-                            if isinstance(saved_adventure, dict):
-                                saved_scene_count = len(saved_adventure.get("scenes", []))
-                                self.logger.info(f"[CampaignManager] Estado guardado y verificado. adventure_data en archivo: True ({saved_scene_count} escenas), current_scene_id guardado: {saved_data.get('current_scene_id')}")
-                            else:
-                                self.logger.warning(f"[CampaignManager] adventure_data guardado pero no es un dict: {type(saved_adventure)}")
-                        else:
-                            self.logger.error(f"[CampaignManager] ERROR: adventure_data NO se guardó en el archivo aunque estaba presente antes de guardar!")
-                except Exception as e:
-                    self.logger.warning(f"[CampaignManager] No se pudo verificar el archivo guardado: {e}", exc_info=True)
+            # Verificar el guardado por cabecera (longitud + checksum), sin releer el JSON
+            if has_adventure_data and written_now and self.store.backend == "json":
+                if verify_snapshot(self.state_path):
+                    self.logger.info(f"[CampaignManager] Estado guardado y verificado. adventure_ref: {adventure_ref}, current_scene_id: {current_scene_id}")
+                else:
+                    self.logger.error(f"[CampaignManager] ERROR: el snapshot {self.state_path} no pasó la verificación de cabecera!")
+        except StateStoreClosedError:
+            # Sesión ya cerrada: el llamador debe enterarse, no perder el cambio en silencio
+            raise
         except Exception as e:
             self.logger.error("[CampaignManager] Error guardando estado: %s", e, exc_info=True)
 
+    def _persist_change(self, *records: Dict[str, Any]) -> None:
+        """
+        Persiste un cambio puntual a través del backend:
+        registros de journal, snapshot JSON o escritura puntual en SQLite.
+        """
+        try:
+            self.store.apply(self._serializable_state, *records)
+        except StateStoreClosedError:
+            raise
+        except Exception as e:
+            self.logger.error(f"[CampaignManager] Error persistiendo cambio, guardando snapshot completo: {e}", exc_info=True)
+            self._save_state()
+
+    def compact_journal(self) -> bool:
+        """
+        Compacta el journal: escribe un snapshot completo y trunca el journal.
+        Retorna True si había registros pendientes.
+        """
+        pending = self.store.pending_changes()
+        if pending == 0:
+            return False
+        self._save_state()
+        self.logger.info(f"[CampaignManager] Journal compactado ({pending} registros)")
+        return True
+
     # ---------------------------------------------------------
     # API pública que usan los handlers
     # ---------------------------------------------------------
@@ -253,21 +363,43 @@ class CampaignManager:
             player_entry["telegram_id"] = telegram_id
 
         players[player_key] = player_entry
+        self.index.index_player(player_key, player_entry)
 
-        self._save_state()
+        self._persist_change(CampaignJournal.record("set", ["players", player_key], player_entry))
         self.logger.info("[CampaignManager] Personaje %s agregado con éxito (key=%s).", player_name, player_key)
         return player_key
 
     # ---------------------------------------------------------
     # Lecturas usadas por /status, /progress, /scene
     # ---------------------------------------------------------
-    def get_player_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+    def _player_key_for(self, telegram_id: int) -> Optional[str]:
+        """
+        Clave del jugador con ese telegram_id (índice en memoria).
+        Si el índice no lo conoce se consulta el backend y se repara el índice.
+        """
         players = self.state.get("players", {})
-        for p in players.values():
-            if p.get("telegram_id") == telegram_id:
-                return p
+        player_key = self.index.player_key_for(telegram_id)
+        if player_key is not None and player_key in players:
+            return player_key
+        player_key = self.store.find_player_key(self.state, telegram_id)
+        if player_key is not None and player_key in players:
+            self.index.index_player(player_key, players[player_key])
+            return player_key
         return None
 
+    def get_player_by_telegram_id(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        player_key = self._player_key_for(telegram_id)
+        if player_key is None:
+            return None
+        return self.state.get("players", {}).get(player_key)
+
+    def get_player_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un jugador por su nombre (sin distinguir mayúsculas)."""
+        player_key = self.index.player_key_by_name(name)
+        if player_key is None:
+            return None
+        return self.state.get("players", {}).get(player_key)
+
     def get_players(self) -> Dict[str, Any]:
         return self.state.get("players", {})
 
@@ -282,7 +414,7 @@ class CampaignManager:
 
     def set_current_scene(self, scene_name: str) -> None:
         self.state["current_scene"] = scene_name
-        self._save_state()
+        self._persist_change(CampaignJournal.record("set", ["current_scene"], scene_name))
 
     def get_progress(self) -> Dict[str, Any]:
         """
@@ -308,11 +440,15 @@ class CampaignManager:
         if "party_chats" not in self.state:
             self.state["party_chats"] = {}  # Maps telegram_id -> chat_id
         
-        if telegram_id not in self.state["active_party"]:
+        if not self.index.is_member(telegram_id):
             self.state["active_party"].append(telegram_id)
+            self.index.add_member(telegram_id)
+            records = [CampaignJournal.record("append", ["active_party"], telegram_id)]
             if chat_id:
                 self.state["party_chats"][str(telegram_id)] = chat_id
-            self._save_state()
+                self.index.set_member_chat(telegram_id, chat_id)
+                records.append(CampaignJournal.record("set", ["party_chats", str(telegram_id)], chat_id))
+            self._persist_change(*records)
             self.logger.info(f"[CampaignManager] Jugador {telegram_id} añadido a la party activa (chat: {chat_id}).")
     
     def get_party_chat_id(self, telegram_id: int) -> Optional[int]:
@@ -327,8 +463,18 @@ class CampaignManager:
         """
         Obtiene todos los IDs de chat únicos donde hay jugadores de la party.
         """
-        party_chats = self.state.get("party_chats", {})
-        return list(set(party_chats.values()))
+        return self.index.chat_ids()
+
+    def members_in_chat(self, chat_id: int, include_unassigned: bool = True) -> list:
+        """
+        IDs de telegram de los miembros de la party activa que están en un chat.
+        Con include_unassigned se incluyen también los miembros sin chat registrado.
+        """
+        return self.index.members_in_chat(chat_id, include_unassigned=include_unassigned)
+
+    def rebuild_indexes(self) -> None:
+        """Reconstruye los índices en memoria (tras modificar self.state directamente)."""
+        self.index.rebuild(self.state)
 
     def get_active_party(self) -> list:
         """Retorna la lista de IDs de telegram de la party activa."""
@@ -365,20 +511,18 @@ class CampaignManager:
         players = self.state.get("players", {})
         player_key = str(telegram_id)
         
-        if player_key in players:
+        if player_key not in players:
+            # Buscar por telegram_id dentro del objeto
+            player_key = self._player_key_for(telegram_id)
+        
+        if player_key is not None and player_key in players:
             players[player_key][field] = value
-            self._save_state()
+            if field in ("name", "telegram_id"):
+                self.index.index_player(player_key, players[player_key])
+            self._persist_change(CampaignJournal.record("set", ["players", player_key, field], value))
             self.logger.info(f"[CampaignManager] Campo '{field}' actualizado para jugador {telegram_id}")
             return True
         
-        # Buscar por telegram_id dentro del objeto
-        for key, player in players.items():
-            if player.get("telegram_id") == telegram_id:
-                player[field] = value
-                self._save_state()
-                self.logger.info(f"[CampaignManager] Campo '{field}' actualizado para jugador {telegram_id}")
-                return True
-        
         return False
 
     def get_player_by_key(self, player_key: str) -> Optional[Dict[str, Any]]:
@@ -406,6 +550,15 @@ class CampaignManager:
                 self.state["adventure_scenes"] = data["adventure_scenes"]
             if "campaign_title" in data:
                 self.state["campaign_title"] = data["campaign_title"]
+            if "adventure_ref" in data:
+                self.state["adventure_ref"] = data["adventure_ref"]
+                if "adventure_data" not in data:
+                    # La referencia manda: descartar la aventura previa en memoria
+                    self.state.pop("adventure_data", None)
+
+            # Resolver la aventura referenciada desde el AdventureStore
+            self._attach_adventure()
+            self.rebuild_indexes()
             
             # Logging detallado
             adventure_data = self.state.get("adventure_data")
@@ -429,27 +582,14 @@ class CampaignManager:
         """
         Exporta el estado como diccionario.
         Útil para guardar desde StoryDirector.
-        Asegura que todos los campos, incluyendo adventure_data, se incluyan.
+        La aventura se exporta como referencia (adventure_ref), no embebida;
+        load_from_dict la resuelve desde el AdventureStore.
         """
-        state_copy = self.state.copy()
-        # Asegurar que adventure_data y campos relacionados se incluyan
-        if "adventure_data" in self.state:
-            state_copy["adventure_data"] = self.state["adventure_data"]
-        if "current_scene_id" in self.state:
-            state_copy["current_scene_id"] = self.state["current_scene_id"]
-        if "adventure_scenes" in self.state:
-            state_copy["adventure_scenes"] = self.state["adventure_scenes"]
-        if "campaign_title" in self.state:
-            state_copy["campaign_title"] = self.state["campaign_title"]
-        has_adventure = 'adventure_data' in state_copy
+        state_copy = self._serializable_state()
+        adventure_ref = state_copy.get('adventure_ref')
         scene_id = state_copy.get('current_scene_id')
-        if has_adventure:
-            adventure = state_copy.get('adventure_data')
-            if isinstance(adventure, dict):
-                scene_count = len(adventure.get('scenes', []))
-                self.logger.info(f"[CampaignManager] to_dict() - adventure_data presente: True ({scene_count} escenas), current_scene_id: {scene_id}")
-            else:
-                self.logger.warning(f"[CampaignManager] to_dict() - adventure_data presente pero no es dict: {type(adventure)}")
+        if adventure_ref:
+            self.logger.info(f"[CampaignManager] to_dict() - adventure_ref: {adventure_ref}, current_scene_id: {scene_id}")
         else:
-            self.logger.warning(f"[CampaignManager] to_dict() - adventure_data NO presente, current_scene_id: {scene_id}")
+            self.logger.warning(f"[CampaignManager] to_dict() - adventure_ref NO presente, current_scene_id: {scene_id}")
         return state_copy
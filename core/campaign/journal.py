@@ -0,0 +1,175 @@
+"""
+Campaign Journal
+----------------
+Journal append-only para el estado de CampaignManager.
+
+En lugar de reescribir el snapshot completo en cada cambio, cada mutación
+se guarda como un registro delta (una línea JSON) al final del journal.
+Periódicamente el journal se compacta: se escribe un snapshot nuevo y el
+journal se trunca. Al arrancar se carga el snapshot y se reproducen los
+registros pendientes.
+
+Formato de cada registro:
+    {"op": "set" | "append" | "delete", "path": ["players", "123", "inventory"], "value": ...}
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_OPS = ("set", "append", "delete")
+
+
+class CampaignJournal:
+    """
+    Journal de registros delta asociado a un snapshot de campaña.
+    """
+
+    def __init__(self, journal_path: str, fsync: bool = False) -> None:
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.pending_records = 0
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def path_for(state_path: str) -> str:
+        """Devuelve la ruta del journal asociada a un snapshot (x.json -> x.journal)."""
+        base, _ = os.path.splitext(state_path)
+        return f"{base}.journal"
+
+    @staticmethod
+    def record(op: str, path: List[Any], value: Any = None) -> Dict[str, Any]:
+        """Construye un registro delta."""
+        if op not in JOURNAL_OPS:
+            raise ValueError(f"Operación de journal desconocida: {op}")
+        entry: Dict[str, Any] = {"op": op, "path": [str(p) for p in path]}
+        if op != "delete":
+            entry["value"] = value
+        return entry
+
+    # ---------------------------------------------------------
+    # Escritura
+    # ---------------------------------------------------------
+    def append(self, *records: Dict[str, Any]) -> None:
+        """
+        Añade uno o más registros al final del journal con una sola escritura.
+        El coste depende del tamaño del cambio, no del tamaño de la campaña.
+        """
+        if not records:
+            return
+        lines = b"".join(codec.dumps(r, pretty=False) + b"\n" for r in records)
+        with open(self.journal_path, "ab") as f:
+            f.write(lines)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.pending_records += len(records)
+
+    def reset(self) -> None:
+        """Trunca el journal (después de escribir un snapshot completo)."""
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+        self.pending_records = 0
+
+    def checkpoint(self) -> Dict[str, int]:
+        """
+        Marca la posición actual del journal.
+        Se toma al serializar un snapshot: todo lo anterior queda cubierto por él.
+        """
+        return {"offset": self.size_bytes() or 0, "records": self.pending_records}
+
+    def discard_through(self, checkpoint: Dict[str, int]) -> None:
+        """
+        Descarta los registros cubiertos por un snapshot ya escrito.
+        Los registros añadidos después del checkpoint (p.ej. mientras el
+        snapshot se escribía en segundo plano) se conservan.
+        """
+        offset = checkpoint.get("offset", 0)
+        size = self.size_bytes() or 0
+        if size <= offset:
+            self.reset()
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            remainder = f.read()
+        with open(self.journal_path, "wb") as f:
+            f.write(remainder)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.pending_records = max(0, self.pending_records - checkpoint.get("records", 0))
+
+    # ---------------------------------------------------------
+    # Lectura / replay
+    # ---------------------------------------------------------
+    def replay(self, state: Dict[str, Any]) -> int:
+        """
+        Aplica sobre `state` todos los registros del journal.
+        Una última línea truncada (crash a mitad de escritura) se ignora.
+        Retorna el número de registros aplicados.
+        """
+        if not os.path.exists(self.journal_path):
+            self.pending_records = 0
+            return 0
+
+        applied = 0
+        with open(self.journal_path, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self.apply(state, codec.loads(line))
+                    applied += 1
+                except Exception as e:
+                    logger.warning(f"[CampaignJournal] Registro {line_no} ignorado en {self.journal_path}: {e}")
+
+        self.pending_records = applied
+        return applied
+
+    @staticmethod
+    def apply(state: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        """Aplica un registro delta sobre el estado."""
+        op = entry["op"]
+        path = entry["path"]
+        if not path:
+            raise ValueError("Registro sin path")
+
+        parent: Dict[str, Any] = state
+        for key in path[:-1]:
+            child = parent.get(key)
+            if not isinstance(child, dict):
+                child = {}
+                parent[key] = child
+            parent = child
+
+        leaf = path[-1]
+        if op == "set":
+            parent[leaf] = entry.get("value")
+        elif op == "append":
+            target = parent.get(leaf)
+            if not isinstance(target, list):
+                target = []
+                parent[leaf] = target
+            target.append(entry.get("value"))
+        elif op == "delete":
+            parent.pop(leaf, None)
+        else:
+            raise ValueError(f"Operación de journal desconocida: {op}")
+
+    def __len__(self) -> int:
+        return self.pending_records
+
+    def size_bytes(self) -> Optional[int]:
+        """Tamaño actual del journal en disco (None si no existe)."""
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return None
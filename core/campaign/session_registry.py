@@ -0,0 +1,236 @@
+"""
+Campaign Session Registry
+-------------------------
+Sesiones de campaña por chat de Telegram.
+
+Con CAMPAIGN_SESSIONS=1 cada chat tiene su propio shard de estado
+(data/sessions/<chat_id>/campaign_state.json + story_director_state.json)
+con su propio StoryDirector y CampaignManager:
+
+- El shard se carga de forma perezosa con el primer mensaje del chat.
+- Las sesiones se mantienen en un LRU; al superar CAMPAIGN_SESSIONS_MAX
+  la menos usada se persiste y se descarga de memoria.
+- Una sesión en uso (in_use(), que ChatUpdateProcessor abre mientras procesa
+  un update del chat) nunca se expulsa: el LRU puede superar el máximo hasta
+  que quede libre. Si aun así se escribe en un manager ya cerrado, el store
+  lanza StateStoreClosedError en lugar de perder la escritura.
+- Las acciones de un grupo nunca reescriben el estado de otro.
+
+Los personajes siguen registrándose también en el roster global
+(el CampaignManager del ServiceContainer), de modo que un personaje creado
+por privado se incorpora al shard del grupo al usarlo allí.
+
+Sin CAMPAIGN_SESSIONS los handlers siguen usando las instancias globales.
+"""
+
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CampaignSession:
+    """Estado de campaña de un chat."""
+
+    chat_id: int
+    story_director: Any
+    last_used: float = field(default_factory=time.monotonic)
+    # Objetos de los handlers ligados a esta sesión (caso de uso, roller...)
+    services: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def campaign_manager(self):
+        return self.story_director.campaign_manager
+
+
+class CampaignSessionRegistry:
+    """
+    Registro LRU de sesiones por chat_id.
+    """
+
+    def __init__(
+        self,
+        roster=None,
+        base_dir: Optional[str] = None,
+        max_sessions: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        if enabled is None:
+            enabled = os.getenv("CAMPAIGN_SESSIONS", "").lower() in ("1", "true", "yes")
+        if base_dir is None:
+            base_dir = os.getenv("CAMPAIGN_SESSIONS_DIR", "data/sessions")
+        if max_sessions is None:
+            max_sessions = int(os.getenv("CAMPAIGN_SESSIONS_MAX", "64"))
+        self.enabled = enabled
+        self.base_dir = base_dir
+        self.max_sessions = max(1, max_sessions)
+        # CampaignManager global: roster de personajes compartido entre chats
+        self.roster = roster
+        self._sessions: "OrderedDict[int, CampaignSession]" = OrderedDict()
+        # chat_id -> updates/tareas que están usando la sesión
+        self._in_use: Counter = Counter()
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    # ---------------------------------------------------------
+    # Acceso
+    # ---------------------------------------------------------
+    def get(self, chat_id: int) -> CampaignSession:
+        """Devuelve la sesión del chat, cargándola si no está en memoria."""
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            self._sessions.move_to_end(chat_id)
+            self.stats["hits"] += 1
+        else:
+            session = self._open(chat_id)
+            self._sessions[chat_id] = session
+            self.stats["loads"] += 1
+            self._shrink(keep=chat_id)
+        session.last_used = time.monotonic()
+        return session
+
+    @contextmanager
+    def in_use(self, chat_id: int) -> Iterator[None]:
+        """Marca la sesión del chat como en uso: no se expulsa hasta salir del bloque."""
+        self._in_use[chat_id] += 1
+        try:
+            yield
+        finally:
+            self._in_use[chat_id] -= 1
+            if self._in_use[chat_id] <= 0:
+                del self._in_use[chat_id]
+                self._shrink()
+
+    def is_busy(self, chat_id: int) -> bool:
+        return self._in_use[chat_id] > 0
+
+    def shard_dir(self, chat_id: int) -> str:
+        return os.path.join(self.base_dir, str(chat_id))
+
+    def _open(self, chat_id: int) -> CampaignSession:
+        from core.story_director.story_director import StoryDirector
+
+        shard = self.shard_dir(chat_id)
+        story_director = StoryDirector(
+            state_path=os.path.join(shard, "story_director_state.json"),
+            campaign_state_path=os.path.join(shard, "campaign_state.json"),
+            shard=True,
+        )
+        logger.info(f"[SessionRegistry] Sesión cargada para chat {chat_id} ({len(self._sessions) + 1} en memoria)")
+        return CampaignSession(chat_id=chat_id, story_director=story_director)
+
+    # ---------------------------------------------------------
+    # Expulsión / cierre
+    # ---------------------------------------------------------
+    def _shrink(self, keep: Optional[int] = None) -> None:
+        """Expulsa las sesiones libres menos usadas mientras se supere el máximo (nunca `keep`)."""
+        while len(self._sessions) > self.max_sessions:
+            idle = next(
+                (chat_id for chat_id in self._sessions if chat_id != keep and not self.is_busy(chat_id)), None
+            )
+            if idle is None:
+                # Todas en uso: se expulsarán al quedar libres
+                return
+            self.evict(idle)
+
+    def evict(self, chat_id: int, force: bool = False) -> bool:
+        """Persiste y descarga de memoria la sesión de un chat (salvo que esté en uso)."""
+        if self.is_busy(chat_id) and not force:
+            return False
+        session = self._sessions.pop(chat_id, None)
+        if session is None:
+            return False
+        self._close(session)
+        self.stats["evictions"] += 1
+        logger.info(f"[SessionRegistry] Sesión del chat {chat_id} expulsada de memoria")
+        return True
+
+    def _close(self, session: CampaignSession) -> None:
+        campaign_manager = session.campaign_manager
+        try:
+            campaign_manager.compact_journal()
+            campaign_manager.store.close()
+        except Exception as e:
+            logger.warning(f"[SessionRegistry] Error cerrando la sesión del chat {session.chat_id}: {e}")
+
+    def close_all(self) -> None:
+        """Persiste y descarga todas las sesiones (al apagar)."""
+        for chat_id in list(self._sessions):
+            self.evict(chat_id, force=True)
+
+    def compact_journals(self) -> int:
+        """Compacta el journal de cada sesión en memoria. Retorna cuántas tenían cambios."""
+        compacted = 0
+        for session in self._sessions.values():
+            if session.campaign_manager.compact_journal():
+                compacted += 1
+        return compacted
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ---------------------------------------------------------
+    # Personajes
+    # ---------------------------------------------------------
+    def register_player(self, session: CampaignSession, telegram_id: int, character: Dict[str, Any]) -> None:
+        """Guarda un personaje en la sesión y en el roster global."""
+        session.campaign_manager.add_player(
+            telegram_id=telegram_id, player_name=character["name"], player_data=character
+        )
+        session.story_director.players[telegram_id] = character
+        if self.roster is not None and self.roster is not session.campaign_manager:
+            self.roster.add_player(telegram_id=telegram_id, player_name=character["name"], player_data=character)
+
+    def ensure_player(self, session: CampaignSession, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el personaje del jugador en esta sesión.
+        Si solo existe en el roster global (creado en otro chat), lo copia al shard.
+        """
+        player = session.campaign_manager.get_player_by_telegram_id(telegram_id)
+        if player is None and self.roster is not None:
+            global_player = self.roster.get_player_by_telegram_id(telegram_id)
+            if global_player is not None:
+                character = dict(global_player)
+                session.campaign_manager.add_player(
+                    telegram_id=telegram_id, player_name=character.get("name", "Aventurero"), player_data=character
+                )
+                player = session.campaign_manager.get_player_by_telegram_id(telegram_id)
+                logger.info(f"[SessionRegistry] Personaje {telegram_id} incorporado a la sesión del chat {session.chat_id}")
+        if player is not None and telegram_id not in session.story_director.players:
+            session.story_director.players[telegram_id] = player
+        return player
+
+
+# ---------------------------------------------------------
+# Resolución desde los handlers
+# ---------------------------------------------------------
+def get_session(context, chat_id: Optional[int]) -> Optional[CampaignSession]:
+    """Sesión del chat si las sesiones por chat están activas; None si no."""
+    registry: Optional[CampaignSessionRegistry] = context.bot_data.get("session_registry")
+    if registry is None or not registry.enabled or chat_id is None:
+        return None
+    return registry.get(chat_id)
+
+
+def story_director_for(context, chat_id: Optional[int]):
+    """StoryDirector de la sesión del chat, o el global."""
+    session = get_session(context, chat_id)
+    if session is not None:
+        return session.story_director
+    return context.bot_data.get("story_director")
+
+
+def campaign_manager_for(context, chat_id: Optional[int], default=None):
+    """CampaignManager de la sesión del chat, o el global."""
+    session = get_session(context, chat_id)
+    if session is not None:
+        return session.campaign_manager
+    return default if default is not None else context.bot_data.get("campaign_manager")
@@ -0,0 +1,425 @@
+"""
+State Store
+-----------
+Backends de persistencia para el estado de CampaignManager.
+
+CampaignManager mantiene el estado en memoria y describe cada cambio puntual
+con registros delta (el mismo formato que CampaignJournal). El backend decide
+cómo persistirlos:
+
+- JsonStateStore: comportamiento original. Snapshot JSON completo
+  (data/campaign_state.json) y, en modo journal, registros delta en
+  data/campaign_state.journal.
+- SqliteStateStore: SQLite en modo WAL (data/campaign_state.db) con tablas
+  indexadas para jugadores, party y metadatos de campaña. Cada cambio es una
+  escritura puntual de una fila y las búsquedas por telegram_id o chat_id usan
+  índices en lugar de recorrer todo el estado.
+
+El backend se elige con STATE_STORE_BACKEND (json | sqlite).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.campaign.journal import CampaignJournal
+from core.services.persistence_service import previous_snapshot_path, read_snapshot, save_json
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+STATE_STORE_BACKENDS = ("json", "sqlite")
+
+Snapshot = Callable[[], Dict[str, Any]]
+
+
+class StateStoreClosedError(RuntimeError):
+    """Escritura en un store ya cerrado (p.ej. el de una sesión expulsada)."""
+
+
+class JsonStateStore:
+    """
+    Snapshot JSON completo (+ journal opcional).
+    Las búsquedas recorren el estado en memoria.
+    """
+
+    backend = "json"
+
+    def __init__(self, state_path: str, journal_mode: bool = False) -> None:
+        self.state_path = state_path
+        self.closed = False
+        self.journal: Optional[CampaignJournal] = (
+            CampaignJournal(CampaignJournal.path_for(state_path)) if journal_mode else None
+        )
+
+    def exists(self) -> bool:
+        return os.path.exists(self.state_path) or os.path.exists(previous_snapshot_path(self.state_path))
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Lee el snapshot (verificando cabecera y checksum; si está dañado se usa
+        el snapshot anterior) y reproduce el journal pendiente.
+        Retorna None si no hay nada persistido.
+        """
+        data: Optional[Dict[str, Any]] = read_snapshot(self.state_path)
+
+        if self.journal is not None and (self.journal.size_bytes() or 0) > 0:
+            if data is None:
+                data = {}
+            replayed = self.journal.replay(data)
+            if replayed:
+                logger.info(f"[JsonStateStore] {replayed} registros del journal reproducidos sobre el snapshot")
+        return data
+
+    def save_snapshot(self, snapshot: Snapshot) -> bool:
+        """
+        Reescribe el snapshot completo (write-behind vía PersistenceService).
+        El checkpoint del journal se toma al serializar: solo se descartan los
+        registros que el snapshot ya cubre.
+        Retorna True si el archivo quedó escrito inmediatamente.
+        """
+        self._check_open()
+        journal_checkpoint: Dict[str, Any] = {}
+
+        def serialize() -> Dict[str, Any]:
+            if self.journal is not None:
+                journal_checkpoint.update(self.journal.checkpoint())
+            return snapshot()
+
+        def on_written() -> None:
+            if self.journal is not None:
+                self.journal.discard_through(journal_checkpoint)
+
+        return save_json(self.state_path, serialize, on_written=on_written, checksum=True)
+
+    def apply(self, snapshot: Snapshot, *records: Dict[str, Any]) -> None:
+        """
+        Persiste un cambio puntual.
+        En modo journal añade los registros delta; si no, reescribe el snapshot.
+        """
+        self._check_open()
+        if self.journal is None:
+            self.save_snapshot(snapshot)
+            return
+        try:
+            self.journal.append(*records)
+        except Exception as e:
+            logger.error(f"[JsonStateStore] Error escribiendo journal, guardando snapshot completo: {e}", exc_info=True)
+            self.save_snapshot(snapshot)
+
+    def pending_changes(self) -> int:
+        return len(self.journal) if self.journal is not None else 0
+
+    # ---------------------------------------------------------
+    # Consultas (recorren el estado en memoria)
+    # ---------------------------------------------------------
+    def find_player_key(self, state: Dict[str, Any], telegram_id: int) -> Optional[str]:
+        for key, player in state.get("players", {}).items():
+            if player.get("telegram_id") == telegram_id:
+                return key
+        return None
+
+    def in_active_party(self, state: Dict[str, Any], telegram_id: int) -> bool:
+        return telegram_id in state.get("active_party", [])
+
+    def party_chat_ids(self, state: Dict[str, Any]) -> List[int]:
+        return list(set(state.get("party_chats", {}).values()))
+
+    def close(self) -> None:
+        self.closed = True
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise StateStoreClosedError(f"Store cerrado: {self.state_path}")
+
+
+class SqliteStateStore:
+    """
+    SQLite en modo WAL con tablas indexadas:
+
+    - campaign_meta(key, value): claves de campaña (nombre, capítulo, escena,
+      adventure_ref...) como JSON.
+    - players(player_key, telegram_id, name, data): un jugador por fila,
+      índice por telegram_id.
+    - active_party(telegram_id, position) y party_chats(telegram_id, chat_id),
+      índice por chat_id.
+    """
+
+    backend = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS campaign_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS players (
+            player_key TEXT PRIMARY KEY,
+            telegram_id INTEGER,
+            name TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_players_telegram_id ON players(telegram_id);
+        CREATE TABLE IF NOT EXISTS active_party (
+            telegram_id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS party_chats (
+            telegram_id TEXT PRIMARY KEY,
+            chat_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_party_chats_chat_id ON party_chats(chat_id);
+    """
+
+    # Claves del estado que tienen tabla propia; el resto va a campaign_meta
+    TABLE_KEYS = ("players", "active_party", "party_chats")
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.closed = False
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def exists(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT EXISTS(SELECT 1 FROM campaign_meta) OR EXISTS(SELECT 1 FROM players)"
+            ).fetchone()
+        return bool(row[0])
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Reconstruye el estado completo. Retorna None si la base está vacía."""
+        if not self.exists():
+            return None
+        state: Dict[str, Any] = {}
+        with self._lock:
+            for key, value in self._conn.execute("SELECT key, value FROM campaign_meta"):
+                state[key] = codec.loads(value)
+            state["players"] = {
+                key: codec.loads(data)
+                for key, data in self._conn.execute("SELECT player_key, data FROM players ORDER BY rowid")
+            }
+            state["active_party"] = [
+                row[0] for row in self._conn.execute("SELECT telegram_id FROM active_party ORDER BY position")
+            ]
+            state["party_chats"] = {
+                key: chat_id for key, chat_id in self._conn.execute("SELECT telegram_id, chat_id FROM party_chats")
+            }
+        return state
+
+    def save_snapshot(self, snapshot: Snapshot) -> bool:
+        """Reescribe todas las tablas en una sola transacción."""
+        self._check_open()
+        state = snapshot()
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM campaign_meta")
+            self._conn.executemany(
+                "INSERT INTO campaign_meta (key, value) VALUES (?, ?)",
+                [(key, self._encode(value)) for key, value in state.items() if key not in self.TABLE_KEYS],
+            )
+            self._write_players(state.get("players", {}))
+            self._write_active_party(state.get("active_party", []))
+            self._write_party_chats(state.get("party_chats", {}))
+        return True
+
+    def apply(self, snapshot: Snapshot, *records: Dict[str, Any]) -> None:
+        """
+        Traduce los registros delta a escrituras puntuales:
+        solo se toca la fila del jugador, miembro o clave afectada.
+        """
+        self._check_open()
+        if not records:
+            return
+        state = snapshot()
+        with self._lock, self._transaction():
+            for entry in records:
+                path = entry["path"]
+                top = path[0]
+                if top == "players":
+                    if len(path) == 1:
+                        self._write_players(state.get("players", {}))
+                    else:
+                        self._upsert_player(path[1], state.get("players", {}).get(path[1]))
+                elif top == "active_party":
+                    if entry["op"] == "append":
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO active_party (telegram_id, position) "
+                            "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM active_party))",
+                            (entry.get("value"),),
+                        )
+                    else:
+                        self._write_active_party(state.get("active_party", []))
+                elif top == "party_chats":
+                    if len(path) == 1:
+                        self._write_party_chats(state.get("party_chats", {}))
+                    elif entry["op"] == "delete":
+                        self._conn.execute("DELETE FROM party_chats WHERE telegram_id = ?", (path[1],))
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO party_chats (telegram_id, chat_id) VALUES (?, ?)",
+                            (path[1], state.get("party_chats", {}).get(path[1])),
+                        )
+                elif top in state:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO campaign_meta (key, value) VALUES (?, ?)",
+                        (top, self._encode(state[top])),
+                    )
+                else:
+                    self._conn.execute("DELETE FROM campaign_meta WHERE key = ?", (top,))
+
+    def pending_changes(self) -> int:
+        return 0
+
+    # ---------------------------------------------------------
+    # Consultas indexadas
+    # ---------------------------------------------------------
+    def find_player_key(self, state: Dict[str, Any], telegram_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT player_key FROM players WHERE telegram_id = ? LIMIT 1", (telegram_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def in_active_party(self, state: Dict[str, Any], telegram_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM active_party WHERE telegram_id = ?", (telegram_id,)
+            ).fetchone()
+        return row is not None
+
+    def party_chat_ids(self, state: Dict[str, Any]) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT chat_id FROM party_chats WHERE chat_id IS NOT NULL"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._conn.close()
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise StateStoreClosedError(f"Store cerrado: {self.db_path}")
+
+    # ---------------------------------------------------------
+    # Internos
+    # ---------------------------------------------------------
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return codec.dumps_str(value, pretty=False)
+
+    @staticmethod
+    def _telegram_id(player: Dict[str, Any]) -> Optional[int]:
+        try:
+            value = player.get("telegram_id")
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def _upsert_player(self, player_key: str, player: Optional[Dict[str, Any]]) -> None:
+        if player is None:
+            self._conn.execute("DELETE FROM players WHERE player_key = ?", (player_key,))
+            return
+        self._conn.execute(
+            "INSERT INTO players (player_key, telegram_id, name, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(player_key) DO UPDATE SET "
+            "telegram_id = excluded.telegram_id, name = excluded.name, data = excluded.data",
+            (player_key, self._telegram_id(player), player.get("name"), self._encode(player)),
+        )
+
+    def _write_players(self, players: Dict[str, Any]) -> None:
+        self._conn.execute("DELETE FROM players")
+        for key, player in players.items():
+            self._upsert_player(str(key), player)
+
+    def _write_active_party(self, active_party: Iterable[Any]) -> None:
+        self._conn.execute("DELETE FROM active_party")
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO active_party (telegram_id, position) VALUES (?, ?)",
+            [(telegram_id, position) for position, telegram_id in enumerate(active_party)],
+        )
+
+    def _write_party_chats(self, party_chats: Dict[str, Any]) -> None:
+        self._conn.execute("DELETE FROM party_chats")
+        self._conn.executemany(
+            "INSERT INTO party_chats (telegram_id, chat_id) VALUES (?, ?)",
+            [(str(key), chat_id) for key, chat_id in party_chats.items()],
+        )
+
+
+def migrate_json_state(
+    campaign_state_path: str = "data/campaign_state.json",
+    story_director_state_path: str = "data/story_director_state.json",
+) -> Optional[Dict[str, Any]]:
+    """
+    Lee el estado de los archivos JSON existentes para la migración inicial a SQLite.
+    La sección "campaign" de story_director_state.json se aplica encima, igual
+    que hace StoryDirector al arrancar (load_from_dict).
+    Retorna None si no hay nada que migrar.
+    """
+    state: Optional[Dict[str, Any]] = None
+    try:
+        state = JsonStateStore(campaign_state_path, journal_mode=True).load()
+    except Exception as e:
+        logger.warning(f"[StateStore] No se pudo leer {campaign_state_path} para migrar: {e}")
+
+    if os.path.exists(story_director_state_path) or os.path.exists(previous_snapshot_path(story_director_state_path)):
+        try:
+            campaign_data = (read_snapshot(story_director_state_path) or {}).get("campaign") or {}
+            if campaign_data:
+                state = state or {}
+                players = {**state.get("players", {}), **campaign_data.get("players", {})}
+                state.update(campaign_data)
+                state["players"] = players
+        except Exception as e:
+            logger.warning(f"[StateStore] No se pudo leer {story_director_state_path} para migrar: {e}")
+
+    if state is not None:
+        logger.info(
+            f"[StateStore] Migrando estado JSON a SQLite ({len(state.get('players', {}))} jugadores)"
+        )
+    return state
+
+
+def create_state_store(
+    state_path: str = "data/campaign_state.json",
+    journal_mode: bool = False,
+    backend: Optional[str] = None,
+    shard: bool = False,
+):
+    """
+    Crea el backend configurado (STATE_STORE_BACKEND, por defecto json).
+    La base SQLite se guarda junto al JSON (x.json -> x.db) salvo que se
+    indique STATE_DB_PATH, que solo vale para el estado global: el store de
+    un shard por chat (shard=True) usa siempre su propia base.
+    """
+    if backend is None:
+        backend = os.getenv("STATE_STORE_BACKEND", "json").lower()
+    if backend not in STATE_STORE_BACKENDS:
+        logger.warning(f"[StateStore] Backend desconocido '{backend}', uso json")
+        backend = "json"
+
+    if backend == "sqlite":
+        db_path = (None if shard else os.getenv("STATE_DB_PATH")) or f"{os.path.splitext(state_path)[0]}.db"
+        return SqliteStateStore(db_path)
+    return JsonStateStore(state_path, journal_mode=journal_mode)
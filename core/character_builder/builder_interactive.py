@@ -1,5 +1,6 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from core.character_builder.enhanced_builder import EnhancedCharacterBuilder
+from core.character_builder.srd_prefetch import SrdPrefetch
 
 class CharacterBuilderInteractive:
     """
@@ -158,13 +159,13 @@ class CharacterBuilderInteractive:
     # -----------------------------------------------------
     #  FINALIZACIÓN
     # -----------------------------------------------------
-    async def finalize_character(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def finalize_character(self, data: Dict[str, Any], prefetch: Optional[SrdPrefetch] = None) -> Dict[str, Any]:
         """
         Devuelve el dict final del personaje con todas las mejoras:
         - Bonos raciales aplicados
         - Habilidades calculadas
-        - Hechizos cargados (si aplica)
+        - Hechizos y rasgos SRD (los ya adelantados en `prefetch`, si los hay)
         - Características de trasfondo
         """
         # Use enhanced builder for finalization
-        return await self.enhanced_builder.finalize_character_enhanced(data)
+        return await self.enhanced_builder.finalize_character_enhanced(data, prefetch)
@@ -2,9 +2,11 @@
 Enhanced Character Builder with SRD Integration
 Integrates with sam-srdservice for race/class features, spells, and skills
 """
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from core.srd_client import lookup
+from core.character_builder.srd_prefetch import SrdPrefetch
 from uuid import uuid4
 
 logger = logging.getLogger(__name__)
@@ -239,11 +241,28 @@ class EnhancedCharacterBuilder:
             return ability_modifier + proficiency_bonus
         return ability_modifier
 
-    async def finalize_character_enhanced(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def prefetch_race(self, prefetch: SrdPrefetch, race: str) -> None:
+        """
+        Starts the race features lookup in the background (see srd_prefetch.py).
+        """
+        prefetch.start("race", race, lambda: self.get_race_features(race))
+
+    def prefetch_class(self, prefetch: SrdPrefetch, class_name: str) -> None:
+        """
+        Starts the class features and spell list lookups in the background.
+        """
+        prefetch.start("class", class_name, lambda: self.get_class_features(class_name))
+        if class_name in SPELLCASTING_CLASSES:
+            prefetch.start("spells", class_name, lambda: self.get_spells_for_class(class_name, level=1))
+
+    async def finalize_character_enhanced(
+        self, data: Dict[str, Any], prefetch: Optional[SrdPrefetch] = None
+    ) -> Dict[str, Any]:
         """
         Finalizes character with all enhancements:
         - Applies racial bonuses
-        - Loads spells for spellcasting classes
+        - Loads race/class features and spells (concurrently, reusing the
+          lookups started by the conversation when `prefetch` is given)
         - Calculates skill modifiers
         - Adds background features
         """
@@ -272,10 +291,14 @@ class EnhancedCharacterBuilder:
                 skill, enhanced_attributes, proficiency=True, proficiency_bonus=2
             )
         
-        # Get spells for spellcasting classes
-        spells = []
-        if class_name in SPELLCASTING_CLASSES:
-            spells = await self.get_spells_for_class(class_name, level=1)
+        # SRD lookups: race/class features and spells, all at once
+        prefetch = prefetch or SrdPrefetch()
+        race_features, class_features, spells = await asyncio.gather(
+            prefetch.result("race", race, lambda: self.get_race_features(race)),
+            prefetch.result("class", class_name, lambda: self.get_class_features(class_name)),
+            # Empty list without a lookup for non-spellcasting classes
+            prefetch.result("spells", class_name, lambda: self.get_spells_for_class(class_name, level=1)),
+        )
         
         # Get background feature
         background_feature = self.get_background_feature(background)
@@ -291,6 +314,8 @@ class EnhancedCharacterBuilder:
             "modifiers": modifiers,
             "skills": selected_skills,
             "skill_modifiers": skill_modifiers,
+            "race_features": race_features,
+            "class_features": class_features,
             "spells": spells,
             "spell_slots": self._get_spell_slots(class_name, 1),
             "background_feature": background_feature,
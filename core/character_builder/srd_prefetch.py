@@ -0,0 +1,81 @@
+"""
+SRD Prefetch
+------------
+Consultas SRD de /createcharacter lanzadas por adelantado.
+
+finalize_character_enhanced() necesita los rasgos de raza, los de clase y
+los hechizos de la clase. En cuanto race_step o class_step registran la
+elección, el handler arranca esas consultas como tareas en segundo plano
+(una por tipo, guardadas en context.user_data); mientras el jugador elige
+trasfondo, atributos y habilidades ya se están resolviendo, y el paso final
+recoge los resultados ya cargados.
+
+- Si el valor cambia (nueva /createcharacter con otra raza), la tarea
+  anterior se cancela y se lanza otra.
+- result() usa la tarea si corresponde al mismo valor; si no hay o falló,
+  hace la consulta en el momento.
+- cancel() cancela lo pendiente: se llama al cancelar, al caducar la
+  conversación y al empezar una nueva.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Factory = Callable[[], Awaitable[Any]]
+
+
+class SrdPrefetch:
+    """Tareas de consulta SRD de una conversación, una por tipo ("race", "class", "spells")."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, Tuple[Any, "asyncio.Task[Any]"]] = {}
+
+    def start(self, kind: str, value: Any, factory: Factory) -> None:
+        """Lanza la consulta de `kind` para `value` si no está ya en curso."""
+        current = self._tasks.get(kind)
+        if current is not None:
+            if current[0] == value:
+                return
+            current[1].cancel()
+        task = asyncio.get_running_loop().create_task(factory(), name=f"srd-prefetch-{kind}")
+        self._tasks[kind] = (value, task)
+        logger.debug(f"[SrdPrefetch] Consulta de {kind} {value!r} lanzada por adelantado")
+
+    async def result(self, kind: str, value: Any, factory: Factory) -> Any:
+        """Resultado de la consulta: el de la tarea adelantada si coincide el valor, o uno nuevo."""
+        current = self._tasks.pop(kind, None)
+        if current is not None:
+            prefetched_value, task = current
+            if prefetched_value == value and not task.cancelled():
+                try:
+                    return await task
+                except Exception as e:
+                    logger.warning(f"[SrdPrefetch] Falló la consulta adelantada de {kind} {value!r}: {e}")
+            else:
+                task.cancel()
+        return await factory()
+
+    def pending(self) -> int:
+        return sum(1 for _, task in self._tasks.values() if not task.done())
+
+    def cancel(self) -> int:
+        """Cancela las consultas pendientes. Retorna cuántas seguían en curso."""
+        cancelled = 0
+        for _, task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        self._tasks.clear()
+        return cancelled
+
+
+def discard_prefetch(user_data: Optional[Dict[str, Any]]) -> None:
+    """Quita de user_data el prefetch de la conversación y cancela lo pendiente."""
+    prefetch: Optional[SrdPrefetch] = (user_data or {}).pop("srd_prefetch", None)
+    if prefetch is not None:
+        cancelled = prefetch.cancel()
+        if cancelled:
+            logger.info(f"[SrdPrefetch] {cancelled} consultas adelantadas canceladas")
@@ -9,8 +9,10 @@ import logging
 from typing import Optional
 
 from core.campaign.campaign_manager import CampaignManager
+from core.campaign.session_registry import CampaignSessionRegistry
 from core.story_director.story_director import StoryDirector
 from core.services.game_service import GameService
+from core.services.persistence_service import PersistenceService, set_persistence_service
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,8 @@ class ServiceContainer:
         self._campaign_manager: Optional[CampaignManager] = None
         self._story_director: Optional[StoryDirector] = None
         self._game_service: Optional[GameService] = None
+        self._persistence_service: Optional[PersistenceService] = None
+        self._session_registry: Optional[CampaignSessionRegistry] = None
         logger.info("[ServiceContainer] Contenedor inicializado.")
 
     @property
@@ -79,6 +83,37 @@ class ServiceContainer:
             logger.info("[ServiceContainer] GameService creado.")
         return self._game_service
 
+    @property
+    def persistence_service(self) -> PersistenceService:
+        """
+        Obtiene o crea el PersistenceService (escrituras JSON write-behind).
+        Al crearlo se instala como servicio por defecto para todos los componentes.
+        """
+        if self._persistence_service is None:
+            self._persistence_service = PersistenceService()
+            set_persistence_service(self._persistence_service)
+            logger.info(
+                "[ServiceContainer] PersistenceService creado (debounce=%.2fs, max_delay=%.2fs).",
+                self._persistence_service.debounce,
+                self._persistence_service.max_delay,
+            )
+        return self._persistence_service
+
+    @property
+    def session_registry(self) -> CampaignSessionRegistry:
+        """
+        Obtiene o crea el registro de sesiones por chat.
+        El CampaignManager global actúa como roster de personajes compartido.
+        """
+        if self._session_registry is None:
+            self._session_registry = CampaignSessionRegistry(roster=self.campaign_manager)
+            logger.info(
+                "[ServiceContainer] CampaignSessionRegistry creado (activo=%s, max=%d).",
+                self._session_registry.enabled,
+                self._session_registry.max_sessions,
+            )
+        return self._session_registry
+
     def reset(self) -> None:
         """
         Resetea todas las instancias de servicios.
@@ -87,4 +122,11 @@ class ServiceContainer:
         self._campaign_manager = None
         self._story_director = None
         self._game_service = None
+        if self._session_registry is not None:
+            self._session_registry.close_all()
+        self._session_registry = None
+        if self._persistence_service is not None:
+            self._persistence_service.flush_sync()
+            set_persistence_service(None)
+        self._persistence_service = None
         logger.info("[ServiceContainer] Todos los servicios reseteados.")
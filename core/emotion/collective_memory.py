@@ -1,7 +1,8 @@
 import os
-import json
 from datetime import datetime
-from statistics import mean
+
+from core.utils.running_stats import RecentWindow, RunningStats
+from core.utils.segmented_log import SegmentedLog, log_dir_for
 
 # ================================================================
 # 🧠 COLLECTIVE EMOTIONAL MEMORY (Fase 6.24)
@@ -11,30 +12,55 @@ from statistics import mean
 # ================================================================
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), "../../data/emotion")
-MEMORY_FILE = os.path.join(BASE_DIR, "collective_emotional_memory.json")
+MEMORY_FILE = os.path.join(BASE_DIR, "collective_emotional_memory.json")  # formato antiguo (se migra)
+LOG_DIR = log_dir_for(MEMORY_FILE)
 
 
 class CollectiveEmotionalMemory:
     def __init__(self):
         os.makedirs(BASE_DIR, exist_ok=True)
-        self.memory = self._load_memory()
+        # Historial segmentado; el resumen guarda los patrones y los agregados
+        self.log = SegmentedLog(LOG_DIR, legacy_file=MEMORY_FILE)
+        self.memory = {"history": self.log.records, "patterns": self.log.summary.get("patterns", {})}
+        self.stats = self._load_stats()
+        # Ventana reciente para consultas "últimos N" / "últimas X horas"
+        self.window = RecentWindow(self.log.records)
         self.last_update = None
 
     # ------------------------------------------------------------
     # 🔧 Utilidades internas
     # ------------------------------------------------------------
-    def _load_memory(self):
-        if not os.path.exists(MEMORY_FILE):
-            return {"history": [], "patterns": {}}
-        try:
-            with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"history": [], "patterns": {}}
+    def _load_stats(self):
+        """
+        Agregados persistidos; si faltan (memoria antigua) se reconstruyen una vez.
+        Los registros que el resumen no llegó a cubrir (cierre abrupto) se suman aquí.
+        """
+        if "aggregates" in self.log.summary:
+            stats = RunningStats.from_dict(self.log.summary["aggregates"])
+            for h in self.log.unsummarized:
+                self._add_to_stats(stats, h)
+            if self.log.unsummarized:
+                self.log.summary["aggregates"] = stats.to_dict()
+                self.log.save()
+            return stats
+        stats = RunningStats()
+        archived = self.log.summary.pop("archived", None)
+        if archived:
+            stats.count = archived["count"]
+            stats.freq = dict(archived["emotions"])
+            stats.sums = {"cohesion": archived["cohesion_sum"]}
+        for h in self.log.records:
+            self._add_to_stats(stats, h)
+        return stats
+
+    @staticmethod
+    def _add_to_stats(stats, entry):
+        stats.add(entry["dominant_emotion"], cohesion=entry["cohesion"], avg_strength=entry.get("avg_strength", 0.0))
 
     def _save_memory(self):
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=4, ensure_ascii=False)
+        self.log.summary["patterns"] = self.memory["patterns"]
+        self.log.summary["aggregates"] = self.stats.to_dict()
+        self.log.save()
 
     # ------------------------------------------------------------
     # 🧩 Registrar estado grupal
@@ -52,7 +78,9 @@ class CollectiveEmotionalMemory:
             "group_state": group_result.get("group_state", "stable"),
         }
 
-        self.memory["history"].append(entry)
+        self.log.append(entry)
+        self.window.append(entry)
+        self._add_to_stats(self.stats, entry)
         self._update_patterns()
         self._save_memory()
 
@@ -62,34 +90,35 @@ class CollectiveEmotionalMemory:
     # 🔬 Analizar patrones a largo plazo
     # ------------------------------------------------------------
     def _update_patterns(self):
-        """Calcula promedios de cohesión y tendencias emocionales."""
-        history = self.memory["history"]
-        if not history:
+        """Deriva promedios de cohesión y tendencias de los agregados (coste constante)."""
+        if not self.stats.count:
             return
 
-        emotions = [h["dominant_emotion"] for h in history]
-        cohesion = [h["cohesion"] for h in history]
-
-        freq = {}
-        for e in emotions:
-            freq[e] = freq.get(e, 0) + 1
-
-        total = sum(freq.values())
-        distribution = {k: round(v / total, 2) for k, v in freq.items()}
-
-        avg_cohesion = round(mean(cohesion), 2)
-        dominant = max(freq, key=freq.get)
+        dominant = self.stats.dominant()
         trend = "positive" if dominant in ["joy", "hopeful", "surprise"] else "negative" if dominant in ["fear", "anger", "sadness"] else "neutral"
 
         self.memory["patterns"] = {
             "dominant_emotion": dominant,
-            "emotion_distribution": distribution,
-            "avg_cohesion": avg_cohesion,
+            "emotion_distribution": self.stats.distribution(2),
+            "avg_cohesion": round(self.stats.mean("cohesion"), 2),
+            "recent_cohesion": round(self.stats.decayed("cohesion"), 2),
+            "total_records": self.stats.count,
             "trend": trend,
             "last_update": datetime.utcnow().isoformat(),
         }
         self.last_update = self.memory["patterns"]["last_update"]
 
+    # ------------------------------------------------------------
+    # 🪟 Consultas de ventana
+    # ------------------------------------------------------------
+    def recent_states(self, n: int = 20):
+        """Últimos n estados grupales registrados."""
+        return self.window.last(n)
+
+    def states_since(self, seconds: float):
+        """Estados grupales registrados en los últimos `seconds` segundos."""
+        return self.window.since(seconds)
+
     # ------------------------------------------------------------
     # 📊 Obtener resumen colectivo
     # ------------------------------------------------------------
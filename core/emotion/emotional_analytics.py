@@ -1,8 +1,8 @@
 import os
-import json
 from statistics import mean
 from typing import Dict, List, Any
 import math
+from core.utils import codec
 
 # ================================================================
 # 📊 EMOTIONAL ANALYTICS
@@ -23,8 +23,8 @@ def _load_history() -> Dict[str, Any]:
         return {"history": []}
     with open(HISTORY_FILE, "r", encoding="utf-8") as f:
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
+            return codec.load(f)
+        except codec.JSONDecodeError:
             return {"history": []}
 
 
@@ -2,6 +2,8 @@ import os
 import json
 from datetime import datetime
 from core.emotion.narrative_memory import NarrativeMemory
+from core.services.persistence_service import save_json
+from core.utils import codec
 
 # ================================================================
 # 🧠 EMOTIONAL CONTINUITY (Fase 6.15)
@@ -27,18 +29,17 @@ class EmotionalContinuity:
         os.makedirs(BASE_DIR, exist_ok=True)
         if not os.path.exists(STATE_FILE):
             with open(STATE_FILE, "w", encoding="utf-8") as f:
-                json.dump({"last_update": None, "state": {}}, f, indent=4, ensure_ascii=False)
+                codec.dump({"last_update": None, "state": {}}, f)
 
     def _load_state(self):
         with open(STATE_FILE, "r", encoding="utf-8") as f:
             try:
-                return json.load(f)
+                return codec.load(f)
             except json.JSONDecodeError:
                 return {"last_update": None, "state": {}}
 
     def _save_state(self):
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.state, f, indent=4, ensure_ascii=False)
+        save_json(STATE_FILE, lambda: self.state)
 
     # ------------------------------------------------------------
     # 💾 Guardar memoria emocional global
@@ -1,7 +1,7 @@
 import os
-import json
 from datetime import datetime
-from statistics import mean
+
+from core.utils.segmented_log import SegmentedLog, log_dir_for
 
 # ================================================================
 # ♻️ EMOTIONAL REINFORCEMENT LOOP (Fase 6.27)
@@ -11,30 +11,36 @@ from statistics import mean
 # ================================================================
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), "../../data/emotion")
-REINFORCEMENT_FILE = os.path.join(BASE_DIR, "emotional_reinforcement.json")
+REINFORCEMENT_FILE = os.path.join(BASE_DIR, "emotional_reinforcement.json")  # formato antiguo (se migra)
+LOG_DIR = log_dir_for(REINFORCEMENT_FILE)
 
 
 class EmotionalReinforcementLoop:
     def __init__(self):
         os.makedirs(BASE_DIR, exist_ok=True)
-        self.memory = self._load_memory()
+        # Historial segmentado; el resumen guarda el perfil y lo ya rotado
+        self.log = SegmentedLog(LOG_DIR, on_expire=self._archive, legacy_file=REINFORCEMENT_FILE)
+        self.memory = {
+            "history": self.log.records,
+            "reinforcement_profile": self.log.summary.get("reinforcement_profile", {}),
+        }
         self.last_update = None
 
     # ------------------------------------------------------------
     # 🔧 Utilidades internas
     # ------------------------------------------------------------
-    def _load_memory(self):
-        if not os.path.exists(REINFORCEMENT_FILE):
-            return {"history": [], "reinforcement_profile": {}}
-        try:
-            with open(REINFORCEMENT_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"history": [], "reinforcement_profile": {}}
-
     def _save_memory(self):
-        with open(REINFORCEMENT_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=4, ensure_ascii=False)
+        self.log.summary["reinforcement_profile"] = self.memory["reinforcement_profile"]
+        self.log.save()
+
+    @staticmethod
+    def _archive(summary, records):
+        """Pliega en el resumen los encuentros de un segmento que expira."""
+        archived = summary.setdefault("archived", {"types": {}})
+        for h in records:
+            acc = archived["types"].setdefault(h["type"], {"sum": 0.0, "count": 0})
+            acc["sum"] += h["delta_cohesion"]
+            acc["count"] += 1
 
     # ------------------------------------------------------------
     # 🧩 Registrar impacto emocional del encuentro
@@ -57,7 +63,7 @@ class EmotionalReinforcementLoop:
             "reinforced": delta >= 0,
         }
 
-        self.memory["history"].append(result)
+        self.log.append(result)
         self._update_reinforcement_profile()
         self._save_memory()
 
@@ -70,17 +76,19 @@ class EmotionalReinforcementLoop:
     def _update_reinforcement_profile(self):
         """Identifica qué tipos de encuentros suelen reforzar o debilitar la cohesión."""
         history = self.memory["history"]
-        if not history:
+        archived = self.log.summary.get("archived", {}).get("types", {})
+        if not history and not archived:
             return
 
-        grouped = {}
+        grouped = {t: [acc["sum"], acc["count"]] for t, acc in archived.items()}
         for h in history:
-            t = h["type"]
-            grouped.setdefault(t, []).append(h["delta_cohesion"])
+            acc = grouped.setdefault(h["type"], [0.0, 0])
+            acc[0] += h["delta_cohesion"]
+            acc[1] += 1
 
         profile = {}
-        for t, deltas in grouped.items():
-            avg_delta = round(mean(deltas), 2)
+        for t, (delta_sum, count) in grouped.items():
+            avg_delta = round(delta_sum / count, 2)
             profile[t] = {
                 "avg_delta": avg_delta,
                 "trend": "positive" if avg_delta > 0 else "negative" if avg_delta < 0 else "neutral"
@@ -88,7 +96,7 @@ class EmotionalReinforcementLoop:
 
         self.memory["reinforcement_profile"] = {
             "encounter_types": profile,
-            "total_records": len(history),
+            "total_records": self.log.total_records,
             "last_update": datetime.utcnow().isoformat()
         }
         self.last_update = self.memory["reinforcement_profile"]["last_update"]
@@ -1,8 +1,8 @@
 import os
-import json
 from datetime import datetime
 from typing import Dict, Any, Optional
 from core.utils.logger import safe_logger
+from core.utils import codec
 
 logger = safe_logger(__name__)
 
@@ -27,7 +27,7 @@ class SessionEmotionEvaluator:
             return {}
         try:
             with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return codec.load(f)
         except Exception as e:
             logger.error(f"Error al cargar JSON {path}: {e}")
             return {}
@@ -35,7 +35,7 @@ class SessionEmotionEvaluator:
     def _save_json(self, path: str, data: Dict[str, Any]):
         try:
             with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+                codec.dump(data, f)
             logger.info(f"Guardado emocional intersesión: {path}")
         except Exception as e:
             logger.error(f"Error al guardar JSON {path}: {e}")
@@ -1,7 +1,8 @@
 import os
-import json
 from datetime import datetime
-from statistics import mean
+
+from core.utils.running_stats import RecentWindow, RunningStats
+from core.utils.segmented_log import SegmentedLog, log_dir_for
 
 # ================================================================
 # 🧬 TONE MEMORY IMPRINTING (Fase 6.20)
@@ -11,30 +12,50 @@ from statistics import mean
 # ================================================================
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), "../../data/emotion")
-MEMORY_FILE = os.path.join(BASE_DIR, "tone_memory.json")
+MEMORY_FILE = os.path.join(BASE_DIR, "tone_memory.json")  # formato antiguo (se migra)
+LOG_DIR = log_dir_for(MEMORY_FILE)
 
 
 class ToneMemory:
     def __init__(self):
         os.makedirs(BASE_DIR, exist_ok=True)
-        self.memory = self._load_memory()
+        # Historial segmentado; el resumen guarda el imprint y los agregados
+        self.log = SegmentedLog(LOG_DIR, legacy_file=MEMORY_FILE)
+        self.memory = {"history": self.log.records, "imprint": self.log.summary.get("imprint", {})}
+        self.stats = self._load_stats()
+        # Ventana reciente para consultas "últimos N" / "últimas X horas"
+        self.window = RecentWindow(self.log.records)
         self.last_update = None
 
     # ------------------------------------------------------------
     # 📖 Cargar y guardar memoria
     # ------------------------------------------------------------
-    def _load_memory(self):
-        if not os.path.exists(MEMORY_FILE):
-            return {"history": [], "imprint": {}}
-        try:
-            with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"history": [], "imprint": {}}
+    def _load_stats(self):
+        """
+        Agregados persistidos; si faltan (memoria antigua) se reconstruyen una vez.
+        Los registros que el resumen no llegó a cubrir (cierre abrupto) se suman aquí.
+        """
+        if "aggregates" in self.log.summary:
+            stats = RunningStats.from_dict(self.log.summary["aggregates"])
+            for h in self.log.unsummarized:
+                stats.add(h["label"])
+            if self.log.unsummarized:
+                self.log.summary["aggregates"] = stats.to_dict()
+                self.log.save()
+            return stats
+        stats = RunningStats()
+        archived = self.log.summary.pop("archived", None)
+        if archived:
+            stats.freq = dict(archived["labels"])
+            stats.count = sum(stats.freq.values())
+        for h in self.log.records:
+            stats.add(h["label"])
+        return stats
 
     def _save_memory(self):
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=4, ensure_ascii=False)
+        self.log.summary["imprint"] = self.memory["imprint"]
+        self.log.summary["aggregates"] = self.stats.to_dict()
+        self.log.save()
 
     # ------------------------------------------------------------
     # 🧠 Registrar un blend de tono
@@ -49,7 +70,9 @@ class ToneMemory:
             "label": blend["label"],
             "description": blend.get("description", ""),
         }
-        self.memory["history"].append(entry)
+        self.log.append(entry)
+        self.window.append(entry)
+        self.stats.add(entry["label"])
         self._update_imprint()
         self._save_memory()
 
@@ -59,27 +82,34 @@ class ToneMemory:
     # 🔬 Calcular “firma tonal” (imprint)
     # ------------------------------------------------------------
     def _update_imprint(self):
-        """Calcula la frecuencia de los blends y actualiza el imprint."""
-        history = self.memory["history"]
-        if not history:
+        """Actualiza el imprint a partir de los contadores de blends (coste constante)."""
+        if not self.stats.count:
             return
 
-        freq = {}
-        for h in history:
-            lbl = h["label"]
-            freq[lbl] = freq.get(lbl, 0) + 1
-
-        total = sum(freq.values())
-        imprint = {k: round(v / total, 3) for k, v in freq.items()}
+        recent = {}
+        for h in self.window.last(20):
+            recent[h["label"]] = recent.get(h["label"], 0) + 1
 
         self.memory["imprint"] = {
-            "total_blends": total,
-            "dominant_signature": max(imprint, key=imprint.get),
-            "blend_distribution": imprint,
+            "total_blends": self.stats.count,
+            "dominant_signature": self.stats.dominant(),
+            "recent_signature": max(recent, key=recent.get) if recent else None,
+            "blend_distribution": self.stats.distribution(3),
             "last_update": datetime.utcnow().isoformat(),
         }
         self.last_update = self.memory["imprint"]["last_update"]
 
+    # ------------------------------------------------------------
+    # 🪟 Consultas de ventana
+    # ------------------------------------------------------------
+    def recent_blends(self, n: int = 20):
+        """Últimos n blends registrados."""
+        return self.window.last(n)
+
+    def blends_since(self, seconds: float):
+        """Blends registrados en los últimos `seconds` segundos."""
+        return self.window.since(seconds)
+
     # ------------------------------------------------------------
     # 🌈 Obtener firma tonal actual
     # ------------------------------------------------------------
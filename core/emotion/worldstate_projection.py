@@ -1,9 +1,8 @@
 import os
-import json
 from datetime import datetime
-from statistics import mean
 
 from core.emotion.collective_memory import CollectiveEmotionalMemory
+from core.utils.segmented_log import SegmentedLog, log_dir_for
 
 # ================================================================
 # 🔮 EMOTIONAL WORLDSTATE PROJECTION (Fase 6.25)
@@ -14,32 +13,19 @@ from core.emotion.collective_memory import CollectiveEmotionalMemory
 # ================================================================
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), "../../data/emotion")
-PROJECTION_FILE = os.path.join(BASE_DIR, "worldstate_projection.json")
+PROJECTION_FILE = os.path.join(BASE_DIR, "worldstate_projection.json")  # formato antiguo (se migra)
+LOG_DIR = log_dir_for(PROJECTION_FILE)
 
 
 class EmotionalWorldstateProjection:
     def __init__(self):
         os.makedirs(BASE_DIR, exist_ok=True)
         self.collective_memory = CollectiveEmotionalMemory()
-        self.state = self._load_projection()
+        # Historial segmentado de proyecciones (append-only, con retención)
+        self.log = SegmentedLog(LOG_DIR, legacy_file=PROJECTION_FILE)
+        self.state = {"history": self.log.records}
         self.last_projection = None
 
-    # ------------------------------------------------------------
-    # 📖 Cargar / guardar predicciones
-    # ------------------------------------------------------------
-    def _load_projection(self):
-        if not os.path.exists(PROJECTION_FILE):
-            return {"history": []}
-        try:
-            with open(PROJECTION_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"history": []}
-
-    def _save_projection(self):
-        with open(PROJECTION_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.state, f, indent=4, ensure_ascii=False)
-
     # ------------------------------------------------------------
     # 🔮 Calcular proyección emocional
     # ------------------------------------------------------------
@@ -87,8 +73,7 @@ class EmotionalWorldstateProjection:
         projection["source_dominant"] = dominant
         self.last_projection = projection
 
-        self.state["history"].append(projection)
-        self._save_projection()
+        self.log.append(projection)
 
         print(f"🔮 [WorldstateProjection] Tendencia futura: {projection['predicted_trend']} → {projection['event_bias']}")
         return projection
@@ -26,6 +26,11 @@ class GameAPIError(SAMException):
     pass
 
 
+class CircuitOpenError(GameAPIError):
+    """GameAPI marcado como caído por el circuit breaker (fallo rápido)."""
+    pass
+
+
 class CharacterCreationError(SAMException):
     """Error al crear personaje."""
     pass
@@ -34,3 +39,8 @@ class CharacterCreationError(SAMException):
 class SceneNotFoundError(SAMException):
     """Escena no encontrada."""
     pass
+
+
+class SnapshotCorruptError(SAMException):
+    """Snapshot de estado truncado o con checksum inválido."""
+    pass
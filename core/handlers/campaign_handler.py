@@ -12,20 +12,22 @@ from telegram.ext import CommandHandler
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from core.campaign.session_registry import story_director_for
+
 logger = logging.getLogger(__name__)
 
 async def progress(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sd = context.bot_data.get("story_director")
+    sd = story_director_for(context, update.effective_chat.id)
     summary = sd.get_campaign_progress()
     await update.message.reply_text(summary, parse_mode="Markdown")
 
 async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sd = context.bot_data.get("story_director")
+    sd = story_director_for(context, update.effective_chat.id)
     sd.restart_campaign()
     await update.message.reply_text("🔄 Campaña reiniciada desde el inicio.")
 
 async def loadcampaign(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sd = context.bot_data.get("story_director")
+    sd = story_director_for(context, update.effective_chat.id)
     if not sd:
         await update.message.reply_text("⚠️ StoryDirector no disponible.")
         return
@@ -5,6 +5,8 @@ for natural language interpretation and narrative response.
 Supports multi-player broadcasting in group chats (2-8 players).
 """
 import logging
+import os
+import time
 from telegram import Update
 from telegram.ext import MessageHandler, ContextTypes, filters
 from core.services.game_service import GameService
@@ -12,6 +14,9 @@ from core.campaign.campaign_manager import CampaignManager
 from core.use_cases.process_player_action import ProcessPlayerActionUseCase
 from core.exceptions import PlayerNotFoundError, GameAPIError
 from core.dice_roller.conversational_roller import ConversationalRoller
+from core.campaign.session_registry import get_session
+from core.services.chat_dispatcher import message_text as queued_message_text
+from core.services.round_batcher import RoundBatcher, round_mode_enabled
 
 logger = logging.getLogger("ConversationHandler")
 
@@ -55,6 +60,75 @@ def split_long_message(text: str, max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH)
     return messages
 
 
+class ProgressiveMessage:
+    """
+    Mensaje que se va editando mientras llega la narrativa en streaming.
+    Las ediciones intermedias van sin formato (el Markdown puede estar a medias)
+    y como mucho una cada `interval` segundos, por los límites de Telegram.
+    """
+
+    def __init__(self, bot, chat_id: int, header: str, interval: float = None):
+        if interval is None:
+            interval = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+        self.bot = bot
+        self.chat_id = chat_id
+        self.header = header
+        self.interval = interval
+        self.message = None
+        self._shown = ""
+        self._last_edit = 0.0
+
+    async def start(self) -> None:
+        self.message = await self.bot.send_message(chat_id=self.chat_id, text=f"{self.header}\n\n✍️ ...")
+        self._last_edit = time.monotonic()
+
+    async def update(self, text: str) -> None:
+        if self.message is None or time.monotonic() - self._last_edit < self.interval:
+            return
+        preview = f"{self.header}\n\n{text} ✍️"
+        if len(preview) > TELEGRAM_MAX_MESSAGE_LENGTH:
+            preview = preview[: TELEGRAM_MAX_MESSAGE_LENGTH - 2] + " …"
+        if preview == self._shown:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit_text(preview)
+            self._shown = preview
+        except Exception as e:
+            logger.debug(f"[ConversationHandler] Edicion progresiva omitida: {e}")
+
+    async def finish(self, text: str) -> None:
+        """Deja el texto final (con Markdown); lo que no cabe va en mensajes nuevos."""
+        parts = split_long_message(text)
+        for i, part in enumerate(parts):
+            if len(parts) > 1 and i < len(parts) - 1:
+                part = part + "\n\n_(continua...)_"
+            elif len(parts) > 1 and i > 0:
+                part = "_(continuacion)_\n\n" + part
+            try:
+                if i == 0 and self.message is not None:
+                    await self._edit_or_plain(part)
+                else:
+                    await self._send_or_plain(part)
+            except Exception as e:
+                logger.error(f"[ConversationHandler] Error enviando narrativa final: {e}")
+                return
+
+    async def _edit_or_plain(self, text: str) -> None:
+        try:
+            await self.message.edit_text(text, parse_mode="Markdown")
+        except Exception as e:
+            logger.warning(f"Error editando mensaje con Markdown: {e}, intentando sin formato")
+            await self.message.edit_text(text)
+
+    async def _send_or_plain(self, text: str) -> None:
+        try:
+            await self.bot.send_message(chat_id=self.chat_id, text=text, parse_mode="Markdown")
+        except Exception as e:
+            logger.warning(f"Error enviando mensaje con Markdown: {e}, intentando sin formato")
+            await self.bot.send_message(chat_id=self.chat_id, text=text)
+
+
 class ConversationHandler:
     """
     Handles conversational gameplay - processes free-form player messages
@@ -79,22 +153,48 @@ class ConversationHandler:
         self.process_action_use_case = process_action_use_case
         self.campaign_manager = campaign_manager
         self.dice_roller = ConversationalRoller(campaign_manager)
+        # Modo por rondas (ROUND_MODE=1): acciones del chat agrupadas en una llamada
+        self.round_batcher = RoundBatcher(self._resolve_round) if round_mode_enabled() else None
+        # Modo streaming (STREAM_MODE=1): la narrativa se muestra a medida que llega
+        self.stream_mode = os.getenv("STREAM_MODE", "0").lower() in ("1", "true", "yes")
 
-    async def _get_party_members_in_chat(self, chat_id: int) -> list:
+    def _services_for(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+        """
+        Returns (session, campaign_manager, process_action_use_case, dice_roller) for a chat.
+        With per-chat sessions (CAMPAIGN_SESSIONS=1) they are bound to the chat's shard
+        and cached on the session; otherwise the global instances are used.
+        """
+        session = get_session(context, chat_id)
+        if session is None:
+            return None, self.campaign_manager, self.process_action_use_case, self.dice_roller
+
+        services = session.services
+        if "process_action_use_case" not in services:
+            from core.story_director.director_link import DirectorLink
+
+            story_director = session.story_director
+            services["process_action_use_case"] = ProcessPlayerActionUseCase(
+                game_service=self.process_action_use_case.game_service,
+                story_director=story_director,
+                director_link=DirectorLink(story_director),
+                chat_id=session.chat_id,
+            )
+            services["dice_roller"] = ConversationalRoller(session.campaign_manager)
+        return session, session.campaign_manager, services["process_action_use_case"], services["dice_roller"]
+
+    async def _get_party_members_in_chat(self, chat_id: int, campaign_manager: CampaignManager = None) -> list:
         """
         Gets all party members who are in the same chat.
         Returns list of (telegram_id, player_name) tuples.
         """
-        active_party = self.campaign_manager.get_active_party()
+        campaign_manager = campaign_manager or self.campaign_manager
         party_members = []
         
-        for telegram_id in active_party:
-            # Check if player is in this chat
-            player_chat_id = self.campaign_manager.get_party_chat_id(telegram_id)
-            if player_chat_id == chat_id or player_chat_id is None:
-                player = self.campaign_manager.get_player_by_telegram_id(telegram_id)
-                if player:
-                    party_members.append((telegram_id, player.get("name", "Unknown")))
+        # Indexed lookup: members registered in this chat + members without a chat
+        for telegram_id in campaign_manager.members_in_chat(chat_id):
+            player = campaign_manager.get_player_by_telegram_id(telegram_id)
+            if player:
+                party_members.append((telegram_id, player.get("name", "Unknown")))
         
         return party_members
 
@@ -138,12 +238,14 @@ class ConversationHandler:
         context: ContextTypes.DEFAULT_TYPE, 
         chat_id: int, 
         message: str,
-        acting_player_name: str = None
+        acting_player_name: str = None,
+        skip_chat_id: int = None,
     ):
         """
         Broadcasts a message to all party members in the chat.
         In group chats, sends to the chat (all members see it automatically).
         In private chats, sends to individual players.
+        skip_chat_id excludes a chat that already has the message (streaming).
         """
         try:
             chat = await context.bot.get_chat(chat_id)
@@ -151,18 +253,23 @@ class ConversationHandler:
             # Check if it's a group chat
             if chat.type in ["group", "supergroup"]:
                 # In group chat, just send to the group (all members see it)
+                if chat_id == skip_chat_id:
+                    return
                 await self._send_message_with_split(context, chat_id, message)
                 logger.debug(f"[ConversationHandler] Broadcasted to group chat {chat_id}")
             else:
                 # Private chat - broadcast to all party members individually
                 # Get all unique chat IDs where party members are
-                party_chat_ids = self.campaign_manager.get_all_party_chat_ids()
+                _, campaign_manager, _, _ = self._services_for(context, chat_id)
+                party_chat_ids = campaign_manager.get_all_party_chat_ids()
                 
                 if not party_chat_ids:
                     # Fallback: send to current chat
                     party_chat_ids = [chat_id]
                 
                 for target_chat_id in party_chat_ids:
+                    if target_chat_id == skip_chat_id:
+                        continue
                     try:
                         await self._send_message_with_split(context, target_chat_id, message)
                     except Exception as e:
@@ -170,6 +277,8 @@ class ConversationHandler:
         except Exception as e:
             logger.error(f"Error broadcasting message: {e}")
             # Fallback: send to current chat
+            if chat_id == skip_chat_id:
+                return
             try:
                 await self._send_message_with_split(context, chat_id, message)
             except Exception as fallback_error:
@@ -184,7 +293,8 @@ class ConversationHandler:
         user = update.effective_user
         user_id = user.id
         chat_id = update.effective_chat.id
-        message_text = update.message.text.strip()
+        # Con CHAT_QUEUE_OVERFLOW=merge puede traer varios mensajes unidos
+        message_text = queued_message_text(update.message).strip()
 
         # Skip if message is too short or empty
         if len(message_text) < 2:
@@ -202,8 +312,13 @@ class ConversationHandler:
             logger.info(f"[ConversationHandler] Usuario {user_id} tiene createcharacter_conversation activo, ignorando mensaje")
             return
 
+        session, campaign_manager, process_action_use_case, dice_roller = self._services_for(context, chat_id)
+
         # Get player character from campaign
-        player = self.campaign_manager.get_player_by_telegram_id(user_id)
+        if session is not None:
+            player = context.bot_data["session_registry"].ensure_player(session, user_id)
+        else:
+            player = campaign_manager.get_player_by_telegram_id(user_id)
         if not player:
             await update.message.reply_text(
                 "⚠️ No tienes un personaje creado. Usa /createcharacter primero."
@@ -215,10 +330,10 @@ class ConversationHandler:
 
         
         # DETECTAR TIRADAS DE DADOS antes de enviar al GameAPI
-        roll_intent = self.dice_roller.detect_roll_intent(message_text)
+        roll_intent = dice_roller.detect_roll_intent(message_text)
         if roll_intent:
             logger.info(f"[ConversationHandler] Detectada tirada de dados: {roll_intent}")
-            roll_result = self.dice_roller.process_roll(user_id, roll_intent, message_text)
+            roll_result = dice_roller.process_roll(user_id, roll_intent, message_text)
             if roll_result.get('success'):
                 await self._broadcast_to_party(
                     context=context,
@@ -228,60 +343,127 @@ class ConversationHandler:
                 )
                 return  # No enviar al GameAPI, ya procesamos la tirada
 
+        if self.round_batcher is not None:
+            expected = len(campaign_manager.members_in_chat(chat_id))
+            if expected > 1:
+                await self.round_batcher.submit(chat_id, user_id, message_text, expected, context)
+                return
+
+        progress = None
         try:
             # Usar caso de uso para procesar la acción
             # El caso de uso maneja toda la lógica de negocio
-            result = await self.process_action_use_case.execute(
-                player_id=user_id, action_text=message_text
-            )
+            if self.stream_mode:
+                progress = ProgressiveMessage(
+                    context.bot, chat_id, f"{player.get('name', user.first_name)}: {message_text}"
+                )
+                await progress.start()
+                result = await process_action_use_case.execute_stream(
+                    player_id=user_id, action_text=message_text, on_progress=progress.update
+                )
+            else:
+                result = await process_action_use_case.execute(
+                    player_id=user_id, action_text=message_text
+                )
 
             # Construir respuesta con nombre del jugador
             player_name = result.get("player_name", user.first_name)
-            narrative = result.get("narrative", "")
-            event = result.get("event")
-
-            response_text = f"*{player_name}*: {message_text}\n\n"
-            response_text += narrative
-
-            # El evento ya está procesado en el caso de uso, solo mostrarlo si existe
-            if event:
-                event_title = event.get("event_title", "Evento")
-                event_narration = event.get("event_narration", "")
-                if event_narration:
-                    response_text += f"\n\n🔮 *{event_title}*\n{event_narration}"
+            response_text = self._format_action_response(
+                player_name, message_text, result.get("narrative", ""), result.get("event")
+            )
 
         except PlayerNotFoundError:
-            await update.message.reply_text(
-                "⚠️ No tienes un personaje creado. Usa /createcharacter primero."
+            await self._reply_error(
+                update, progress, "⚠️ No tienes un personaje creado. Usa /createcharacter primero."
             )
             return
         except GameAPIError as e:
             logger.error(f"[ConversationHandler] Error del GameAPI: {e}")
-            await update.message.reply_text(
-                f"⚠️ Error procesando acción: {str(e)}"
-            )
+            await self._reply_error(update, progress, f"⚠️ Error procesando acción: {str(e)}")
             return
         except Exception as e:
             logger.exception(
                 f"[ConversationHandler] Error inesperado procesando acción: {e}"
             )
-            await update.message.reply_text(
-                "⚠️ Error inesperado procesando acción. Intenta más tarde."
-            )
+            await self._reply_error(update, progress, "⚠️ Error inesperado procesando acción. Intenta más tarde.")
             return
 
-        # Broadcast response to all party members in the chat
-        await self._broadcast_to_party(
-            context=context,
-            chat_id=chat_id,
-            message=response_text,
-            acting_player_name=player_name
-        )
+        if progress is not None:
+            # El chat actual ya vio la narrativa en el mensaje progresivo
+            await progress.finish(response_text)
+            await self._broadcast_to_party(
+                context=context,
+                chat_id=chat_id,
+                message=response_text,
+                acting_player_name=player_name,
+                skip_chat_id=chat_id,
+            )
+        else:
+            # Broadcast response to all party members in the chat
+            await self._broadcast_to_party(
+                context=context,
+                chat_id=chat_id,
+                message=response_text,
+                acting_player_name=player_name
+            )
 
         logger.info(
             f"[ConversationHandler] Processed action for {result.get('player_name', 'Unknown')} in chat {chat_id}: {message_text[:50]}..."
         )
 
+    @staticmethod
+    async def _reply_error(update: Update, progress: ProgressiveMessage, text: str) -> None:
+        """Responde con un error; en streaming reemplaza el mensaje provisional."""
+        if progress is not None and progress.message is not None:
+            try:
+                await progress.message.edit_text(text)
+                return
+            except Exception as e:
+                logger.warning(f"[ConversationHandler] No se pudo editar el mensaje provisional: {e}")
+        await update.message.reply_text(text)
+
+    @staticmethod
+    def _format_action_response(player_name: str, action_text: str, narrative: str, event=None) -> str:
+        """Texto de respuesta a una acción: jugador, acción, narrativa y evento."""
+        response_text = f"*{player_name}*: {action_text}\n\n"
+        response_text += narrative
+
+        # El evento ya está procesado en el caso de uso, solo mostrarlo si existe
+        if event:
+            event_title = event.get("event_title", "Evento")
+            event_narration = event.get("event_narration", "")
+            if event_narration:
+                response_text += f"\n\n🔮 *{event_title}*\n{event_narration}"
+        return response_text
+
+    async def _resolve_round(self, chat_id: int, actions: list, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Resuelve una ronda cerrada por el RoundBatcher: una llamada al GameAPI
+        y un único mensaje con una sección por jugador.
+        """
+        _, _, process_action_use_case, _ = self._services_for(context, chat_id)
+        await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+        try:
+            round_result = await process_action_use_case.execute_round(actions)
+        except PlayerNotFoundError:
+            return
+        except GameAPIError as e:
+            logger.error(f"[ConversationHandler] Error del GameAPI en la ronda: {e}")
+            await self._send_message_with_split(context, chat_id, f"⚠️ Error procesando la ronda: {str(e)}")
+            return
+
+        sections = [
+            self._format_action_response(r["player_name"], r["action_text"], r.get("narrative", ""), r.get("event"))
+            for r in round_result.get("results", [])
+        ]
+        if round_result.get("narrative"):
+            sections.append(round_result["narrative"])
+        if not sections:
+            return
+
+        await self._broadcast_to_party(context=context, chat_id=chat_id, message="\n\n———\n\n".join(sections))
+        logger.info(f"[ConversationHandler] Processed round of {len(actions)} actions in chat {chat_id}")
+
     def register_handler(self, application):
         """
         Registers the conversation handler with the Telegram application.
@@ -5,15 +5,19 @@ from telegram.ext import (
     CallbackQueryHandler,
     ConversationHandler,
     ContextTypes,
+    TypeHandler,
     filters,
 )
 import logging
+import os
 
 logger = logging.getLogger("CreateCharacterHandler")
 
 from core.character_builder.builder_interactive import CharacterBuilderInteractive
 from core.character_builder.point_buy_system import PointBuySystem, ATTRIBUTES as ATTRIBUTE_NAMES
+from core.character_builder.srd_prefetch import SrdPrefetch, discard_prefetch
 from core.inventory.starting_equipment import get_starting_equipment
+from core.campaign.session_registry import get_session
 
 # Estados de conversación
 (
@@ -111,7 +115,13 @@ def register_createcharacter_conversation(application, campaign_manager):
             # Fallback: send new message
             await query.message.reply_text(message, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
+    def _prefetch(context: ContextTypes.DEFAULT_TYPE) -> SrdPrefetch:
+        """Consultas SRD adelantadas de la conversación del usuario."""
+        return context.user_data.setdefault("srd_prefetch", SrdPrefetch())
+
     async def start_creation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Una creación nueva descarta las consultas de la anterior
+        discard_prefetch(context.user_data)
         context.user_data["character_data"] = {}
         await update.message.reply_text(builder.get_prompt("name", {}))
         return NAME
@@ -132,6 +142,7 @@ def register_createcharacter_conversation(application, campaign_manager):
         if not builder.process_step("race", query.data, data):
             await query.edit_message_text("❌ Selección inválida. Usa los botones.")
             return RACE
+        builder.enhanced_builder.prefetch_race(_prefetch(context), data["race"])
         keyboard = [[InlineKeyboardButton(opt, callback_data=opt)] for opt in builder.get_options("class")]
         await query.edit_message_text(builder.get_prompt("class", data), reply_markup=InlineKeyboardMarkup(keyboard))
         return CLASS
@@ -143,6 +154,7 @@ def register_createcharacter_conversation(application, campaign_manager):
         if not builder.process_step("class", query.data, data):
             await query.edit_message_text("❌ Clase inválida.")
             return CLASS
+        builder.enhanced_builder.prefetch_class(_prefetch(context), data["class"])
         keyboard = [[InlineKeyboardButton(opt, callback_data=opt)] for opt in builder.get_options("background")]
         await query.edit_message_text(builder.get_prompt("background", data), reply_markup=InlineKeyboardMarkup(keyboard))
         return BACKGROUND
@@ -346,6 +358,7 @@ def register_createcharacter_conversation(application, campaign_manager):
     async def confirm_step(update: Update, context: ContextTypes.DEFAULT_TYPE):
         data = context.user_data["character_data"]
         if not builder.process_step("confirm", update.message.text, data):
+            discard_prefetch(context.user_data)
             await update.message.reply_text("❌ No confirmado. Creación cancelada.")
             return ConversationHandler.END
 
@@ -353,7 +366,12 @@ def register_createcharacter_conversation(application, campaign_manager):
         await update.message.reply_text("🔄 Creando personaje con mejoras SRD... (esto puede tomar unos segundos)")
 
         # Finalize character with enhancements (async)
-        character = await builder.finalize_character(data)
+        prefetch = context.user_data.pop("srd_prefetch", None)
+        try:
+            character = await builder.finalize_character(data, prefetch)
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
         user_id = update.effective_user.id
         
         # Add telegram_id to character
@@ -370,18 +388,24 @@ def register_createcharacter_conversation(application, campaign_manager):
         character["gold"] = starting_eq.get("gold", 100)
         logger.info(f"[CreateCharacterHandler] Equipamiento inicial agregado: {len(character['inventory'])} items")
         
-        # Guardar en campaign_manager
-        campaign_manager.add_player(
-            telegram_id=user_id,
-            player_name=character["name"],
-            player_data=character,
-        )
-        
-        # IMPORTANTE: También guardar en StoryDirector para que ProcessPlayerActionUseCase lo encuentre
-        story_director = context.bot_data.get("story_director")
-        if story_director:
-            story_director.players[user_id] = character
-            logger.info(f"[CreateCharacterHandler] Personaje {character['name']} también guardado en StoryDirector")
+        session = get_session(context, update.effective_chat.id)
+        if session is not None:
+            # Sesión por chat: shard del chat + roster global
+            context.bot_data["session_registry"].register_player(session, user_id, character)
+            logger.info(f"[CreateCharacterHandler] Personaje {character['name']} guardado en la sesión del chat {session.chat_id}")
+        else:
+            # Guardar en campaign_manager
+            campaign_manager.add_player(
+                telegram_id=user_id,
+                player_name=character["name"],
+                player_data=character,
+            )
+            
+            # IMPORTANTE: También guardar en StoryDirector para que ProcessPlayerActionUseCase lo encuentre
+            story_director = context.bot_data.get("story_director")
+            if story_director:
+                story_director.players[user_id] = character
+                logger.info(f"[CreateCharacterHandler] Personaje {character['name']} también guardado en StoryDirector")
         
         # Build summary message
         race = character.get("race", "")
@@ -432,6 +456,16 @@ def register_createcharacter_conversation(application, campaign_manager):
         
         return ConversationHandler.END
 
+    async def cancel_creation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        discard_prefetch(context.user_data)
+        return ConversationHandler.END
+
+    async def creation_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Conversación abandonada: se cancelan las consultas SRD pendientes."""
+        discard_prefetch(context.user_data)
+        context.user_data.pop("character_data", None)
+        logger.info("[CreateCharacterHandler] Creación de personaje abandonada (timeout)")
+
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("createcharacter", start_creation)],
         states={
@@ -443,10 +477,12 @@ def register_createcharacter_conversation(application, campaign_manager):
             ALLOCATE_ATTRIBUTES: [CallbackQueryHandler(attributes_step)],
             SKILLS: [MessageHandler(filters.TEXT & ~filters.COMMAND, skills_step)],
             CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_step)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, creation_timeout)],
         },
-        fallbacks=[CommandHandler("cancel", lambda u, c: ConversationHandler.END)],
+        fallbacks=[CommandHandler("cancel", cancel_creation)],
         name="createcharacter_conversation",
         persistent=False,
+        conversation_timeout=float(os.getenv("CREATECHARACTER_TIMEOUT", "1800")) or None,
     )
 
     application.add_handler(conv_handler)
@@ -11,11 +11,13 @@ from telegram.ext import CommandHandler
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from core.campaign.session_registry import story_director_for
+
 logger = logging.getLogger(__name__)
 
 async def scene(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("[NarrativeHandler] /scene command received")
-    sd = context.bot_data.get("story_director")
+    sd = story_director_for(context, update.effective_chat.id)
     if not sd:
         logger.error("[NarrativeHandler] StoryDirector not found in bot_data")
         await update.message.reply_text("⚠️ Error: StoryDirector no disponible.")
@@ -187,7 +189,7 @@ async def scene(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(result, parse_mode="Markdown")
 
 async def event(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sd = context.bot_data.get("story_director")
+    sd = story_director_for(context, update.effective_chat.id)
     if not context.args:
         await update.message.reply_text(
             "Usa: `/event <tipo>` (ej: `/event combat_victory`)", parse_mode="Markdown"
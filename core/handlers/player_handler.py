@@ -9,6 +9,7 @@ from telegram.ext import (
 
 # Importa el manejador de creación interactiva
 from core.handlers.createcharacter_handler import register_createcharacter_conversation
+from core.campaign.session_registry import campaign_manager_for, get_session
 
 logger = logging.getLogger("PlayerHandler")
 
@@ -22,7 +23,10 @@ def register_player_handlers(application, campaign_manager):
     Registra los comandos principales del jugador:
     /start, /join, /status, /progress, /scene
     Y la conversación interactiva /createcharacter.
+    Con sesiones por chat (CAMPAIGN_SESSIONS=1) cada comando usa el
+    CampaignManager del chat; `campaign_manager` es el roster global.
     """
+    default_campaign_manager = campaign_manager
 
     # ------------------------------------------------------------
     # /start
@@ -62,7 +66,14 @@ def register_player_handlers(application, campaign_manager):
     async def join(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         chat_id = update.effective_chat.id
-        player = campaign_manager.get_player_by_telegram_id(user_id)
+        session = get_session(context, chat_id)
+        if session is not None:
+            # Sesión por chat: trae el personaje del roster global si hace falta
+            player = context.bot_data["session_registry"].ensure_player(session, user_id)
+            campaign_manager = session.campaign_manager
+        else:
+            campaign_manager = default_campaign_manager
+            player = campaign_manager.get_player_by_telegram_id(user_id)
         if not player:
             await update.message.reply_text(
                 "⚠️ No tienes un personaje creado.\nUsa /createcharacter antes de unirte a la aventura."
@@ -119,7 +130,10 @@ def register_player_handlers(application, campaign_manager):
     # ------------------------------------------------------------
     async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
+        campaign_manager = campaign_manager_for(context, update.effective_chat.id, default_campaign_manager)
         player = campaign_manager.get_player_by_telegram_id(user_id)
+        if not player and campaign_manager is not default_campaign_manager:
+            player = default_campaign_manager.get_player_by_telegram_id(user_id)
         if not player:
             await update.message.reply_text("⚠️ No tienes un personaje creado aún.")
             return
@@ -143,6 +157,7 @@ def register_player_handlers(application, campaign_manager):
     # /progress
     # ------------------------------------------------------------
     async def progress(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        campaign_manager = campaign_manager_for(context, update.effective_chat.id, default_campaign_manager)
         chapter = campaign_manager.state.get("chapter", 1)
         current_scene = campaign_manager.state.get("current_scene", "Desconocida")
         await update.message.reply_text(
@@ -5,12 +5,13 @@ Define protocols/interfaces para servicios principales.
 Facilita testing y permite intercambiar implementaciones.
 """
 
-from typing import Protocol, Dict, Any, Optional, List
+from typing import Protocol, Dict, Any, Optional, List, Callable, Awaitable, Hashable
 
 __all__ = [
     "IGameService",
     "ICampaignManager",
     "IStoryDirector",
+    "IStateStore",
 ]
 
 
@@ -21,7 +22,14 @@ class IGameService(Protocol):
     """
 
     async def process_action(
-        self, player_name: str, action_text: str, mode: str = "action"
+        self,
+        player_name: str,
+        action_text: str,
+        mode: str = "action",
+        character_data: Optional[Dict[str, Any]] = None,
+        scene_context: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        context_key: Optional[Hashable] = None,
     ) -> Dict[str, Any]:
         """
         Procesa una acción del jugador.
@@ -30,9 +38,48 @@ class IGameService(Protocol):
             player_name: Nombre del jugador
             action_text: Acción en lenguaje natural
             mode: "action" o "dialogue"
+            character_data: Datos del personaje
+            scene_context: Contexto de la escena actual
+            idempotency_key: Clave de la acción, igual en todos los reintentos
+            context_key: Dueño del contexto cacheado (chat y jugador); por defecto player_name
         
         Returns:
-            Dict con "success", "result", y opcionalmente "event"
+            Dict con "success", "result", y opcionalmente "event";
+            "unavailable" indica que el GameAPI no está disponible
+        """
+        ...
+
+    async def stream_action(
+        self,
+        player_name: str,
+        action_text: str,
+        on_delta: Callable[[str], Awaitable[None]],
+        character_data: Optional[Dict[str, Any]] = None,
+        scene_context: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        context_key: Optional[Hashable] = None,
+    ) -> Dict[str, Any]:
+        """
+        Procesa una acción recibiendo la narrativa en fragmentos (on_delta).
+
+        Returns:
+            El mismo dict que process_action; "unsupported" indica que el
+            GameAPI no implementa streaming
+        """
+        ...
+
+    async def process_action_batch(
+        self,
+        actions: List[Dict[str, Any]],
+        scene_context: Optional[Dict[str, Any]] = None,
+        round_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Procesa una ronda de acciones del mismo chat en una sola llamada.
+
+        Returns:
+            Dict con "success", "results" por acción y "narrative" combinada;
+            "unsupported" indica que el GameAPI no implementa rondas
         """
         ...
 
@@ -98,6 +145,10 @@ class ICampaignManager(Protocol):
         """Obtiene la lista de IDs de Telegram de la party activa."""
         ...
 
+    def members_in_chat(self, chat_id: int, include_unassigned: bool = True) -> List[int]:
+        """Obtiene los IDs de Telegram de la party activa presentes en un chat."""
+        ...
+
     def get_active_scene(self) -> Optional[Dict[str, Any]]:
         """Obtiene la escena activa actual."""
         ...
@@ -138,3 +189,54 @@ class IStoryDirector(Protocol):
     def get_campaign_progress(self) -> Dict[str, Any]:
         """Obtiene el progreso de la campaña."""
         ...
+
+
+class IStateStore(Protocol):
+    """
+    Protocolo para los backends de persistencia de CampaignManager
+    (JsonStateStore, SqliteStateStore).
+    Los cambios llegan como registros delta con el formato de CampaignJournal.
+    """
+
+    backend: str
+
+    def exists(self) -> bool:
+        """Indica si ya hay estado persistido."""
+        ...
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Carga el estado completo (None si no hay nada persistido)."""
+        ...
+
+    def save_snapshot(self, snapshot: Callable[[], Dict[str, Any]]) -> bool:
+        """
+        Persiste el estado completo.
+        
+        Returns:
+            True si quedó escrito inmediatamente, False si quedó diferido
+        """
+        ...
+
+    def apply(self, snapshot: Callable[[], Dict[str, Any]], *records: Dict[str, Any]) -> None:
+        """Persiste un cambio puntual descrito por registros delta."""
+        ...
+
+    def pending_changes(self) -> int:
+        """Número de cambios aún no consolidados en un snapshot."""
+        ...
+
+    def find_player_key(self, state: Dict[str, Any], telegram_id: int) -> Optional[str]:
+        """Obtiene la clave del jugador con ese ID de Telegram."""
+        ...
+
+    def in_active_party(self, state: Dict[str, Any], telegram_id: int) -> bool:
+        """Indica si el jugador está en la party activa."""
+        ...
+
+    def party_chat_ids(self, state: Dict[str, Any]) -> List[int]:
+        """Obtiene los IDs de chat únicos de la party."""
+        ...
+
+    def close(self) -> None:
+        """Libera los recursos del backend."""
+        ...
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from uuid import UUID
 from core.models.base import ErrorModel
 
@@ -25,7 +25,7 @@ class SrdHit(BaseModel):
     name: str
     slug: Optional[str] = None
     summary: Optional[str] = None
-    details: Optional[Dict[str, Optional[str]]] = {}
+    details: Optional[Dict[str, Any]] = {}
 
 
 class SrdResponse(BaseModel):
@@ -34,6 +34,6 @@ class SrdResponse(BaseModel):
     """
     query_id: UUID
     from_cache: bool
-    source: Dict[str, str]
+    source: Dict[str, Any]            # service_url, latency_ms, cache
     hits: List[SrdHit] = []
     errors: Optional[List[ErrorModel]] = None
@@ -3,6 +3,7 @@ import unicodedata
 from uuid import uuid4
 from core.models.intent import Intent, IntentType
 from core.models.base import ErrorModel
+from core.services.srd_resolver import get_srd_resolver
 
 
 def normalize_text(text: str) -> str:
@@ -60,15 +61,20 @@ async def parse_intent(text: str, action_id):
 
         # --- Extracción de entidades básicas ---
         entities = {}
-        # Hechizos conocidos (Sleep / Dormir / Luz / Light)
+        resolver = get_srd_resolver()
+        # Hechizos del SRD y alias en español, con tolerancia a erratas
         if intent == IntentType.cast_spell:
-            if "dormir" in lower or "sleep" in lower:
-                entities["spell_name"] = "Sleep"
-            elif "luz" in lower or "light" in lower:
-                entities["spell_name"] = "Light"
-
-        if intent == IntentType.attack and "arco" in lower:
-            entities["attack_weapon"] = "arco"
+            spell = resolver.find_in_text(lower, "spells")
+            if spell is not None:
+                entities["spell_name"] = spell.name
+                entities["spell_slug"] = spell.slug
+
+        if intent == IntentType.attack:
+            if "arco" in lower:
+                entities["attack_weapon"] = "arco"
+            monster = resolver.find_in_text(lower, "monsters")
+            if monster is not None:
+                entities["target"] = monster.name
 
         if intent == IntentType.investigate and "puerta" in lower:
             entities["target"] = "puerta"
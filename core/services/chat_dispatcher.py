@@ -0,0 +1,307 @@
+"""
+Chat Dispatcher
+---------------
+Procesador de updates de PTB (ApplicationBuilder.concurrent_updates) con
+una cola ordenada por chat.
+
+Sin concurrent_updates la Application procesa un update a la vez para
+todos los chats: una llamada lenta al GameAPI en un grupo frena a los demás.
+Activarlo sin más permitiría que dos acciones del mismo chat se intercalen
+(y con ellas sus escrituras de estado). ChatUpdateProcessor:
+
+- mantiene una cola acotada (CHAT_QUEUE_SIZE) por chat, procesada en orden
+  por un worker propio que termina cuando la cola queda vacía;
+- procesa chats distintos en paralelo, hasta CHAT_MAX_PARALLEL a la vez,
+  solo si cada chat tiene su propio estado (CAMPAIGN_SESSIONS=1). Sin
+  sesiones por chat todos comparten CampaignManager/StoryDirector y dos
+  acciones de chats distintos intercalarían sus lecturas y escrituras de
+  estado: entonces se procesa un update a la vez (las colas, el orden y la
+  política de desborde se mantienen);
+- aplica una política cuando la cola de un chat está llena
+  (CHAT_QUEUE_OVERFLOW):
+      reply   responde "espera tu turno" y descarta el update (por defecto)
+      reject  descarta el update sin responder
+      merge   une el texto al último mensaje en cola del mismo jugador;
+              si no hay con quién unirlo, se comporta como reply. El
+              Message de Telegram no se modifica: el texto unido queda en
+              la entrada de la cola y los handlers lo leen con
+              message_text(update.message)
+- registra profundidad de cola y tiempos de espera (stats(), log_stats()).
+
+Los updates sin chat (p.ej. inline queries) se procesan sin cola.
+El trabajo del bot que no nace de un update (p.ej. el cierre de una ronda
+por tiempo del RoundBatcher) entra en la cola del chat con run_in_chat().
+Se activa con CHAT_DISPATCHER=1; por defecto se mantiene el procesamiento
+secuencial de PTB.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Awaitable, Deque, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from core.services.outbound_scheduler import outbound_chat
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("reply", "reject", "merge")
+WAIT_TURN_MESSAGE = "⏳ Espera tu turno: todavía estoy resolviendo las acciones anteriores de este chat."
+
+
+# Texto unido por la política merge para el update en curso: (message_id, texto)
+_merged_text: "contextvars.ContextVar[Optional[Tuple[int, str]]]" = contextvars.ContextVar(
+    "merged_text", default=None
+)
+
+
+def chat_dispatcher_enabled() -> bool:
+    return os.getenv("CHAT_DISPATCHER", "0").lower() in ("1", "true", "yes")
+
+
+def message_text(message: Any) -> str:
+    """Texto del mensaje, con los mensajes unidos por la política merge si los hay."""
+    if message is None:
+        return ""
+    merged = _merged_text.get()
+    if merged is not None and merged[0] == message.message_id:
+        return merged[1]
+    return message.text or ""
+
+
+class _QueuedUpdate:
+    __slots__ = ("update", "coroutine", "enqueued_at", "merged_text")
+
+    def __init__(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.update = update
+        self.coroutine = coroutine
+        self.enqueued_at = time.monotonic()
+        # Texto del mensaje con los que se le unieron (política merge)
+        self.merged_text: Optional[str] = None
+
+
+class _ChatQueue:
+    def __init__(self) -> None:
+        self.items: Deque[_QueuedUpdate] = deque()
+        self.worker: Optional[asyncio.Task] = None
+
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """Colas ordenadas por chat con backpressure y paralelismo entre chats."""
+
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        overflow: Optional[str] = None,
+        max_parallel: Optional[int] = None,
+        session_registry: Any = None,
+    ) -> None:
+        if queue_size is None:
+            queue_size = int(os.getenv("CHAT_QUEUE_SIZE", "5"))
+        if overflow is None:
+            overflow = os.getenv("CHAT_QUEUE_OVERFLOW", "reply").lower()
+        if max_parallel is None:
+            max_parallel = int(os.getenv("CHAT_MAX_PARALLEL", "16"))
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"[ChatDispatcher] CHAT_QUEUE_OVERFLOW inválido: {overflow!r}, se usa 'reply'")
+            overflow = "reply"
+        if session_registry is not None and not session_registry.enabled:
+            # Estado global compartido entre chats: nada de paralelismo
+            max_parallel = 1
+        # do_process_update solo encola, así que el semáforo de PTB no limita el trabajo real
+        super().__init__(max_concurrent_updates=max(2, max_parallel))
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.max_parallel = max(1, max_parallel)
+        self._parallel = asyncio.Semaphore(self.max_parallel)
+        self._chats: Dict[int, _ChatQueue] = {}
+        # Con sesiones por chat, la del chat queda marcada en uso mientras se procesa su update
+        self.session_registry = session_registry
+        self._waits: Deque[float] = deque(maxlen=500)
+        self.counters = {"processed": 0, "rejected": 0, "merged": 0, "told_to_wait": 0, "max_depth": 0}
+
+    # ---------------------------------------------------------
+    # BaseUpdateProcessor
+    # ---------------------------------------------------------
+    async def initialize(self) -> None:
+        logger.info(
+            f"[ChatDispatcher] Colas por chat activas (tamaño {self.queue_size}, "
+            f"desborde '{self.overflow}', {self.max_parallel} chats en paralelo"
+            + (", un update a la vez sin CAMPAIGN_SESSIONS)" if self._shared_state() else ")")
+        )
+
+    async def shutdown(self) -> None:
+        """Espera a que terminen las colas pendientes (como mucho 10 segundos)."""
+        workers = [chat.worker for chat in self._chats.values() if chat.worker is not None]
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=10)
+            for task in pending:
+                task.cancel()
+        self.log_stats()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self._chat_id(update)
+        if chat_id is None:
+            async with self._parallel:
+                await coroutine
+            return
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatQueue()
+        if len(chat.items) >= self.queue_size:
+            await self._on_overflow(chat, update, coroutine)
+            return
+
+        self._enqueue(chat_id, chat, _QueuedUpdate(update, coroutine))
+
+    def submit(self, chat_id: int, coroutine: Awaitable[Any]) -> None:
+        """
+        Encola trabajo interno para un chat: se ejecuta en orden con sus updates.
+        No se aplica el límite de la cola (no es un mensaje que se pueda descartar).
+        """
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatQueue()
+        self._enqueue(chat_id, chat, _QueuedUpdate(None, coroutine))
+
+    def _enqueue(self, chat_id: int, chat: _ChatQueue, item: _QueuedUpdate) -> None:
+        chat.items.append(item)
+        self.counters["max_depth"] = max(self.counters["max_depth"], len(chat.items))
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._run_chat(chat_id, chat), name=f"ChatDispatcher:{chat_id}")
+
+    # ---------------------------------------------------------
+    # Worker por chat
+    # ---------------------------------------------------------
+    async def _run_chat(self, chat_id: int, chat: _ChatQueue) -> None:
+        # Las llamadas salientes de este chat se reparten por turnos con las de los demás
+        outbound_chat.set(chat_id)
+        try:
+            while chat.items:
+                item = chat.items.popleft()
+                async with self._parallel:
+                    self._waits.append(time.monotonic() - item.enqueued_at)
+                    try:
+                        # Application.process_update ya entrega los errores de handlers al error_handler
+                        token = _merged_text.set(self._merged(item))
+                        try:
+                            with self._session_in_use(chat_id):
+                                await item.coroutine
+                        finally:
+                            _merged_text.reset(token)
+                    except Exception as e:
+                        logger.exception(f"[ChatDispatcher] Error procesando update del chat {chat_id}: {e}")
+                    self.counters["processed"] += 1
+        finally:
+            if self._chats.get(chat_id) is chat and not chat.items:
+                del self._chats[chat_id]
+
+    def _shared_state(self) -> bool:
+        return self.session_registry is not None and not self.session_registry.enabled
+
+    def _session_in_use(self, chat_id: int):
+        registry = self.session_registry
+        if registry is None or not registry.enabled:
+            return nullcontext()
+        return registry.in_use(chat_id)
+
+    # ---------------------------------------------------------
+    # Desborde
+    # ---------------------------------------------------------
+    async def _on_overflow(self, chat: _ChatQueue, update: object, coroutine: Awaitable[Any]) -> None:
+        # El update no se procesará: cerrar la corrutina evita el aviso "never awaited"
+        coroutine.close()
+        if self.overflow == "merge" and self._merge(chat, update):
+            self.counters["merged"] += 1
+            return
+        if self.overflow == "reject":
+            self.counters["rejected"] += 1
+            logger.warning(f"[ChatDispatcher] Cola llena, update descartado (chat {self._chat_id(update)})")
+            return
+        self.counters["told_to_wait"] += 1
+        message = update.effective_message if isinstance(update, Update) else None
+        if message is not None:
+            try:
+                await message.reply_text(WAIT_TURN_MESSAGE)
+            except Exception as e:
+                logger.warning(f"[ChatDispatcher] No se pudo avisar al jugador: {e}")
+
+    @staticmethod
+    def _merge(chat: _ChatQueue, update: object) -> bool:
+        """Une el texto de un mensaje libre al último en cola del mismo jugador."""
+        new = update.message if isinstance(update, Update) else None
+        if new is None or not new.text or new.text.startswith("/") or new.from_user is None:
+            return False
+        for item in reversed(chat.items):
+            queued = item.update.message if isinstance(item.update, Update) else None
+            if queued is None or not queued.text or queued.text.startswith("/") or queued.from_user is None:
+                continue
+            if queued.from_user.id != new.from_user.id:
+                continue
+            # El update en cola aún no se procesó: su handler leerá el texto unido con message_text()
+            item.merged_text = f"{item.merged_text or queued.text}\n{new.text}"
+            return True
+        return False
+
+    @staticmethod
+    def _merged(item: _QueuedUpdate) -> Optional[Tuple[int, str]]:
+        if item.merged_text is None or not isinstance(item.update, Update) or item.update.message is None:
+            return None
+        return item.update.message.message_id, item.merged_text
+
+    # ---------------------------------------------------------
+    # Métricas
+    # ---------------------------------------------------------
+    @staticmethod
+    def _chat_id(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            **self.counters,
+            "active_chats": len(self._chats),
+            "queued": sum(len(chat.items) for chat in self._chats.values()),
+            "wait_p50": percentile(0.5),
+            "wait_p95": percentile(0.95),
+            "wait_max": round(waits[-1], 3) if waits else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        data = self.stats()
+        logger.info(
+            f"[ChatDispatcher] {data['processed']} updates, {data['active_chats']} chats activos, "
+            f"{data['queued']} en cola (máx. {data['max_depth']}), espera p50 {data['wait_p50']}s / "
+            f"p95 {data['wait_p95']}s, descartados {data['rejected']}, unidos {data['merged']}, "
+            f"'espera tu turno' {data['told_to_wait']}"
+        )
+
+
+async def run_in_chat(application: Any, chat_id: int, coroutine: Awaitable[Any]) -> None:
+    """
+    Ejecuta trabajo del bot para un chat sin intercalarlo con sus updates:
+    en la cola del chat con ChatUpdateProcessor, o bajo el semáforo del
+    procesador de PTB (un update a la vez) sin él.
+    """
+    processor = getattr(application, "update_processor", None)
+    if isinstance(processor, ChatUpdateProcessor):
+        processor.submit(chat_id, coroutine)
+    elif processor is not None:
+        await processor.process_update(None, coroutine)
+    else:
+        await coroutine
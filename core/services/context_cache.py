@@ -0,0 +1,117 @@
+"""
+Context Cache
+-------------
+Huellas (fingerprints) del contexto que acompaña cada acción al GameAPI
+(personaje y escena) para no reenviarlo completo en cada turno.
+
+Contrato de caché de sesión en POST /game/action y /game/action/stream.
+Cada parte del contexto ("character", "scene") viaja de una de tres formas:
+
+    completa:    {"character": {...}, "character_hash": H}
+    referencia:  {"character_ref": H}                       sin cambios desde H
+    delta:       {"character_ref": H0, "character_delta": {campo: valor},
+                  "character_hash": H1}                      campos cambiados sobre H0
+                                                             (un campo eliminado va como None)
+
+- El GameAPI que implementa el contrato guarda cada contexto por su hash y
+  responde con "context_cached": true. Hasta ver esa confirmación el
+  cliente manda siempre el contexto completo (los campos *_hash extra los
+  ignora un GameAPI sin soporte).
+- Si el GameAPI ya no tiene un hash (p.ej. tras reiniciar) responde 409
+  con {"missing": [...]}; el cliente olvida lo confirmado de ese jugador y
+  reenvía la acción con el contexto completo.
+- Las entradas se guardan por dueño (chat y telegram_id del jugador), no por
+  nombre: dos chats con personajes del mismo nombre no se pisan la base.
+- Un hash solo pasa a "conocido" cuando la petición que lo llevaba tuvo éxito.
+
+GAMEAPI_CONTEXT_CACHE=0 desactiva las referencias y deltas.
+"""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+Pending = Tuple[Tuple[Hashable, str], str, Dict[str, Any]]
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Hash estable del contenido (independiente del orden de las claves)."""
+    return hashlib.blake2b(codec.dumps(payload, pretty=False, sort_keys=True), digest_size=12).hexdigest()
+
+
+def _delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    for key in old:
+        if key not in new:
+            changed[key] = None
+    return changed
+
+
+class _Known:
+    __slots__ = ("hash", "payload")
+
+    def __init__(self, hash_: str, payload: Dict[str, Any]) -> None:
+        self.hash = hash_
+        self.payload = payload
+
+
+class ContextCache:
+    """Contexto que el GameAPI ya tiene, por dueño y tipo (LRU acotado)."""
+
+    def __init__(self, enabled: Optional[bool] = None, max_entries: int = 1024) -> None:
+        if enabled is None:
+            enabled = os.getenv("GAMEAPI_CONTEXT_CACHE", "1").lower() not in ("0", "false", "no")
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        # Se activa cuando el GameAPI confirma que implementa el contrato
+        self.server_supported = False
+        self._known: "OrderedDict[Tuple[Hashable, str], _Known]" = OrderedDict()
+        self.stats = {"full": 0, "ref": 0, "delta": 0, "resync": 0}
+
+    def encode(self, owner: Hashable, kind: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Pending]]:
+        """
+        Campos a añadir al cuerpo de la acción para una parte del contexto.
+        owner identifica de quién es el contexto, p.ej. (chat_id, telegram_id).
+        Retorna (campos, pendiente): pendiente se confirma con confirm() si la petición tiene éxito.
+        """
+        key = (owner, kind)
+        hash_ = fingerprint(payload)
+        known = self._known.get(key) if self.enabled and self.server_supported else None
+        if known is None:
+            self.stats["full"] += 1
+            return {kind: payload, f"{kind}_hash": hash_}, (key, hash_, payload)
+        self._known.move_to_end(key)
+        if known.hash == hash_:
+            self.stats["ref"] += 1
+            return {f"{kind}_ref": hash_}, None
+        self.stats["delta"] += 1
+        fields = {f"{kind}_ref": known.hash, f"{kind}_delta": _delta(known.payload, payload), f"{kind}_hash": hash_}
+        return fields, (key, hash_, payload)
+
+    def confirm(self, pending: List[Optional[Pending]], response: Dict[str, Any]) -> None:
+        """Registra como conocidos los contextos de una petición que tuvo éxito."""
+        if not response.get("context_cached"):
+            return
+        if not self.server_supported:
+            logger.info("[ContextCache] El GameAPI guarda el contexto: se envían referencias y deltas")
+        self.server_supported = True
+        for item in pending:
+            if item is None:
+                continue
+            key, hash_, payload = item
+            self._known[key] = _Known(hash_, payload)
+            self._known.move_to_end(key)
+        while len(self._known) > self.max_entries:
+            self._known.popitem(last=False)
+
+    def forget(self, owner: Hashable) -> None:
+        """El GameAPI perdió el contexto de owner: la próxima vez va completo."""
+        self.stats["resync"] += 1
+        for key in [k for k in self._known if k[0] == owner]:
+            del self._known[key]
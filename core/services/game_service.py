@@ -1,20 +1,87 @@
 import httpx
 import os
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from uuid import uuid4
+
+from core.exceptions import CircuitOpenError
+from core.services.context_cache import ContextCache
+from core.services.response_cache import ResponseCache
+from core.utils import codec
+from core.services.http_client_manager import http_client, request_timeout
+from core.services.outbound_scheduler import Priority
+from core.services.resilience import CircuitBreaker, RetryPolicy, call_with_resilience
 
 logger = logging.getLogger(__name__)
 
 
+class GameStreamError(Exception):
+    """Evento "error" recibido dentro del stream del GameAPI."""
+
+
+async def _iter_sse(response: httpx.Response) -> AsyncIterator[Tuple[str, str]]:
+    """Itera los eventos Server-Sent Events de una respuesta: (evento, datos)."""
+    name, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield name, "\n".join(data)
+            name, data = "message", []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            name = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].removeprefix(" "))
+    if data:
+        yield name, "\n".join(data)
+
+
+def _sse_json(data: str) -> Dict[str, Any]:
+    try:
+        value = codec.loads(data)
+    except codec.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
 class GameService:
     """
     Servicio que conecta con la GameAPI externa (sam-gameapi)
     para procesar acciones de jugador, combates o verificaciones.
     Usa el AI engine del GameAPI para interpretar lenguaje natural.
+
+    Las llamadas pasan por reintentos con backoff + jitter y un circuit
+    breaker compartido (core/services/resilience.py). Las acciones llevan
+    una Idempotency-Key que se mantiene entre reintentos.
     """
 
     def __init__(self):
         self.api_url = os.getenv("GAME_API_URL", "https://sam-gameapi.onrender.com").strip("/")
+        self.breaker = CircuitBreaker("gameapi")
+        self.retry_policy = RetryPolicy()
+        # Personaje y escena ya enviados al GameAPI (referencias y deltas)
+        self.context_cache = ContextCache()
+        # Estado y party del GameAPI: TTL + invalidación tras cada cambio + single-flight
+        self.state_cache = ResponseCache()
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        idempotency_key: Optional[str] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Petición con reintentos y circuit breaker; la clave se reenvía igual en cada intento."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return await call_with_resilience(
+            lambda: client.request(method, url, headers=headers, **kwargs),
+            self.breaker,
+            self.retry_policy,
+        )
 
     async def process_action(
         self, 
@@ -22,7 +89,9 @@ class GameService:
         action_text: str, 
         mode: str = "action",
         character_data: Optional[Dict[str, Any]] = None,
-        scene_context: Optional[Dict[str, Any]] = None
+        scene_context: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        context_key: Optional[Hashable] = None,
     ) -> Dict[str, Any]:
         """
         Envía una acción del jugador al GameAPI.
@@ -32,67 +101,38 @@ class GameService:
             player_name: Nombre del jugador
             action_text: Acción en lenguaje natural (ej: "I hit the goblin with my axe")
             mode: "action" o "dialogue" (para interacciones con NPCs)
+            idempotency_key: clave de la acción (se genera si no se indica)
+            context_key: dueño del contexto en ContextCache, p.ej. (chat_id, telegram_id);
+                por defecto player_name
         
         Returns:
-            Dict con "result" (narrativa) y opcionalmente "event" (evento dinámico)
+            Dict con "result" (narrativa) y opcionalmente "event" (evento dinámico).
+            Si el GameAPI no está disponible, "success" es False y "unavailable" True.
         """
         endpoint = f"{self.api_url}/game/action"
-        payload = {"player": player_name, "action": action_text}
-
-        # Agregar contexto de escena si esta disponible
-        if scene_context:
-            payload["scene"] = {
-                "title": scene_context.get("title"),
-                "description": scene_context.get("description"),
-                "location": scene_context.get("location"),
-                "npcs": scene_context.get("npcs", []),
-                "available_options": scene_context.get("options", []),
-                "mood": scene_context.get("mood"),
-            }
-            logger.debug(f"[GameService] Enviando contexto de escena: {scene_context.get('title')}")
-
-        # Agregar datos del personaje si estan disponibles
-        if character_data:
-            # Procesar equipment - puede ser dict o list
-            equipment = character_data.get("equipment", {})
-            if isinstance(equipment, dict):
-                # Nuevo formato con weapons, armor, shield
-                equipment_payload = {
-                    "weapons": equipment.get("weapons", []),
-                    "armor": equipment.get("armor"),
-                    "shield": equipment.get("shield"),
-                }
-            else:
-                # Formato antiguo (lista)
-                equipment_payload = {"weapons": equipment if equipment else []}
-            
-            payload["character"] = {
-                "name": character_data.get("name"),
-                "race": character_data.get("race"),
-                "character_class": character_data.get("class"),
-                "level": character_data.get("level", 1),
-                "attributes": character_data.get("attributes"),
-                "skills": character_data.get("skills", []),
-                "spells": character_data.get("spells", []),
-                "equipment": equipment_payload,
-                "inventory": character_data.get("inventory", []),
-                "gold": character_data.get("gold", 0),
-            }
-            logger.debug(f"[GameService] Enviando datos del personaje: {character_data.get('class')}")
-
-        # DEBUG: Log del payload completo
-        import json as json_lib
-        try:
-            payload_str = json_lib.dumps(payload, default=str, ensure_ascii=False)
-            logger.info(f"[GameService] Payload ({len(payload_str)} chars): {payload_str[:1000]}")
-        except Exception as log_err:
-            logger.warning(f"[GameService] No se pudo serializar payload: {log_err}")
+        idempotency_key = idempotency_key or uuid4().hex
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client("gameapi", Priority.ACTION) as client:
             try:
-                response = await client.post(endpoint, json=payload)
+                for attempt in range(2):
+                    body, pending = self._action_body(player_name, action_text, character_data, scene_context, context_key)
+                    response = await self._send(
+                        client,
+                        "POST",
+                        endpoint,
+                        content=body,
+                        headers={"Content-Type": "application/json"},
+                        timeout=request_timeout("gameapi", "action"),
+                        idempotency_key=idempotency_key,
+                    )
+                    if response.status_code == 409 and attempt == 0:
+                        self._resync_context(player_name, response, context_key)
+                        continue
+                    break
                 response.raise_for_status()
                 data = response.json()
+                self.context_cache.confirm(pending, data)
+                self.state_cache.invalidate()
                 
                 # GameAPI retorna: {"player": "...", "result": "...", "event": {...} (opcional)}
                 return {
@@ -100,24 +140,291 @@ class GameService:
                     "result": data.get("result", "No se obtuvo respuesta del motor de juego."),
                     "event": data.get("event"),  # Evento dinámico si se generó
                 }
-            except httpx.ConnectError as e:
-                logger.error(f"Error de conexión con GameAPI: {e}")
-                return {
-                    "success": False,
-                    "error": "No se pudo conectar al motor de juego. Verifica que el servicio esté activo.",
-                }
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Error HTTP del GameAPI: {e}")
-                return {
-                    "success": False,
-                    "error": f"Error del servidor de juego: {e.response.status_code}",
-                }
             except Exception as e:
-                logger.error(f"Error inesperado al contactar GameAPI: {e}")
+                return self._failure(e)
+
+    async def process_action_batch(
+        self,
+        actions: List[Dict[str, Any]],
+        scene_context: Optional[Dict[str, Any]] = None,
+        round_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía una ronda de acciones (varios jugadores del mismo chat) en una sola llamada.
+
+        Contrato POST /game/actions/batch:
+            request:  {"round_id", "scene"?, "actions": [{"action_id", "player", "action", "character"?}]}
+            response: {"round_id", "narrative"?, "results": [{"action_id", "player", "result", "event"?}]}
+
+        Args:
+            actions: [{"action_id", "player_name", "action_text", "character_data"?}]
+            scene_context: Contexto de la escena compartida por la ronda
+            round_id: Identificador de la ronda (también es la Idempotency-Key)
+
+        Returns:
+            Dict con "results" por acción y "narrative" combinada si el GameAPI la envía.
+            "unsupported" True si el GameAPI no implementa el endpoint (404/405).
+        """
+        endpoint = f"{self.api_url}/game/actions/batch"
+        round_id = round_id or uuid4().hex
+        payload: Dict[str, Any] = {"round_id": round_id, "actions": []}
+        if scene_context:
+            payload["scene"] = self._scene_payload(scene_context)
+        for action in actions:
+            item = {"action_id": action["action_id"], "player": action["player_name"], "action": action["action_text"]}
+            if action.get("character_data"):
+                item["character"] = self._character_payload(action["character_data"])
+            payload["actions"].append(item)
+
+        logger.info(f"[GameService] Ronda {round_id[:8]} con {len(actions)} acciones")
+        async with http_client("gameapi", Priority.ACTION) as client:
+            try:
+                response = await self._send(
+                    client,
+                    "POST",
+                    endpoint,
+                    json=payload,
+                    timeout=request_timeout("gameapi", "action"),
+                    idempotency_key=round_id,
+                )
+                if response.status_code in (404, 405):
+                    return {"success": False, "unsupported": True, "error": "El GameAPI no soporta rondas"}
+                response.raise_for_status()
+                data = response.json()
+                self.state_cache.invalidate()
                 return {
-                    "success": False,
-                    "error": f"Error inesperado: {str(e)}",
+                    "success": True,
+                    "round_id": data.get("round_id", round_id),
+                    "narrative": data.get("narrative", ""),
+                    "results": data.get("results", []),
                 }
+            except Exception as e:
+                return self._failure(e)
+
+    async def stream_action(
+        self,
+        player_name: str,
+        action_text: str,
+        on_delta: Callable[[str], Awaitable[None]],
+        character_data: Optional[Dict[str, Any]] = None,
+        scene_context: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        context_key: Optional[Hashable] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía una acción y consume la narrativa a medida que el GameAPI la genera.
+
+        Contrato POST /game/action/stream (mismo payload que /game/action):
+            text/event-stream:  "data: {"delta": "..."}" por fragmento y al final
+                                "event: done" con {"result"?, "event"?}
+            text/plain:         fragmentos de texto (chunked)
+            application/json:   respuesta completa, como /game/action
+
+        Args:
+            on_delta: se llama con cada fragmento de texto recibido
+            context_key: como en process_action
+
+        Returns:
+            El mismo dict que process_action. "unsupported" True si el GameAPI
+            no implementa el endpoint (404/405); "truncated" True si el stream
+            se cortó después de recibir texto.
+        """
+        endpoint = f"{self.api_url}/game/action/stream"
+        idempotency_key = idempotency_key or uuid4().hex
+        parts: List[str] = []
+        event = None
+
+        async with http_client("gameapi", Priority.ACTION) as client:
+            for attempt in range(2):
+                body, pending = self._action_body(player_name, action_text, character_data, scene_context, context_key)
+                request = client.build_request(
+                    "POST",
+                    endpoint,
+                    content=body,
+                    headers={
+                        "Content-Type": "application/json",
+                        "Accept": "text/event-stream, text/plain, application/json",
+                        "Idempotency-Key": idempotency_key,
+                    },
+                    timeout=request_timeout("gameapi", "stream"),
+                )
+
+                async def send() -> httpx.Response:
+                    response = await client.send(request, stream=True)
+                    if response.status_code >= 400:
+                        # Las respuestas de error no se consumen como stream
+                        await response.aread()
+                        await response.aclose()
+                    return response
+
+                try:
+                    response = await call_with_resilience(send, self.breaker, self.retry_policy)
+                except Exception as e:
+                    return self._failure(e)
+                if response.status_code == 409 and attempt == 0:
+                    self._resync_context(player_name, response, context_key)
+                    continue
+                break
+            if response.status_code in (404, 405):
+                return {"success": False, "unsupported": True, "error": "El GameAPI no soporta streaming"}
+
+            try:
+                response.raise_for_status()
+                # La acción ya se aceptó: el estado del juego cambia aunque el stream se corte
+                self.state_cache.invalidate()
+                # En streaming la confirmación del contrato de contexto va en la cabecera
+                self.context_cache.confirm(pending, {"context_cached": response.headers.get("X-Context-Cached") == "1"})
+                content_type = response.headers.get("content-type", "")
+                if "text/event-stream" in content_type:
+                    async for name, data in _iter_sse(response):
+                        if name == "done":
+                            final = _sse_json(data)
+                            event = final.get("event")
+                            if final.get("result") and not parts:
+                                parts.append(final["result"])
+                                await on_delta(final["result"])
+                            break
+                        if name == "error":
+                            raise GameStreamError(_sse_json(data).get("error") or data)
+                        delta = _sse_json(data).get("delta", data) if data.startswith("{") else data
+                        if delta:
+                            parts.append(delta)
+                            await on_delta(delta)
+                elif "application/json" in content_type:
+                    data = codec.loads(await response.aread())
+                    event = data.get("event")
+                    parts.append(data.get("result", ""))
+                    await on_delta(parts[-1])
+                else:
+                    async for chunk in response.aiter_text():
+                        if chunk:
+                            parts.append(chunk)
+                            await on_delta(chunk)
+            except Exception as e:
+                if not parts:
+                    return self._failure(e)
+                logger.warning(f"[GameService] Stream interrumpido tras {len(parts)} fragmentos: {e}")
+                return {"success": True, "result": "".join(parts), "event": event, "truncated": True}
+            finally:
+                await response.aclose()
+
+        return {
+            "success": True,
+            "result": "".join(parts) or "No se obtuvo respuesta del motor de juego.",
+            "event": event,
+        }
+
+    @staticmethod
+    def _failure(e: Exception) -> Dict[str, Any]:
+        """Traduce un error de la llamada al GameAPI al dict de respuesta."""
+        if isinstance(e, CircuitOpenError):
+            logger.warning(f"[GameService] {e}")
+            return {"success": False, "unavailable": True, "error": str(e)}
+        if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)):
+            logger.error(f"Error de conexión con GameAPI: {e}")
+            return {
+                "success": False,
+                "unavailable": True,
+                "error": "No se pudo conectar al motor de juego. Verifica que el servicio esté activo.",
+            }
+        if isinstance(e, httpx.TimeoutException):
+            logger.error(f"Timeout esperando al GameAPI: {e}")
+            return {"success": False, "unavailable": True, "error": "El motor de juego no respondió a tiempo."}
+        if isinstance(e, httpx.HTTPStatusError):
+            logger.error(f"Error HTTP del GameAPI: {e}")
+            return {
+                "success": False,
+                "unavailable": e.response.status_code >= 500,
+                "error": f"Error del servidor de juego: {e.response.status_code}",
+            }
+        logger.error(f"Error inesperado al contactar GameAPI: {e}")
+        return {
+            "success": False,
+            "error": f"Error inesperado: {str(e)}",
+        }
+
+    def _action_body(
+        self,
+        player_name: str,
+        action_text: str,
+        character_data: Optional[Dict[str, Any]] = None,
+        scene_context: Optional[Dict[str, Any]] = None,
+        context_key: Optional[Hashable] = None,
+    ) -> Tuple[bytes, list]:
+        """
+        Cuerpo JSON de una acción, serializado una sola vez (se usa para el log y la petición).
+        Escena y personaje van completos, por referencia o como delta (ContextCache).
+        Retorna (cuerpo, pendientes de confirmar).
+        """
+        payload: Dict[str, Any] = {"player": player_name, "action": action_text}
+        pending = []
+        owner = context_key if context_key is not None else player_name
+
+        # Agregar contexto de escena si esta disponible
+        if scene_context:
+            fields, item = self.context_cache.encode(owner, "scene", self._scene_payload(scene_context))
+            payload.update(fields)
+            pending.append(item)
+            logger.debug(f"[GameService] Enviando contexto de escena: {scene_context.get('title')}")
+
+        # Agregar datos del personaje si estan disponibles
+        if character_data:
+            fields, item = self.context_cache.encode(owner, "character", self._character_payload(character_data))
+            payload.update(fields)
+            pending.append(item)
+            logger.debug(f"[GameService] Enviando datos del personaje: {character_data.get('class')}")
+
+        body = codec.dumps(payload, pretty=False)
+        logger.info(f"[GameService] Payload ({len(body)} bytes): {body[:1000].decode('utf-8', 'replace')}")
+        return body, pending
+
+    def _resync_context(self, player_name: str, response: httpx.Response, context_key: Optional[Hashable] = None) -> None:
+        """409: el GameAPI no tiene el contexto referenciado; se reenvía completo."""
+        try:
+            missing = response.json().get("missing", [])
+        except ValueError:
+            missing = []
+        logger.warning(f"[GameService] El GameAPI no tiene el contexto de {player_name} {missing}, se reenvía completo")
+        self.context_cache.forget(context_key if context_key is not None else player_name)
+
+    @staticmethod
+    def _scene_payload(scene_context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "title": scene_context.get("title"),
+            "description": scene_context.get("description"),
+            "location": scene_context.get("location"),
+            "npcs": scene_context.get("npcs", []),
+            "available_options": scene_context.get("options", []),
+            "mood": scene_context.get("mood"),
+        }
+
+    @staticmethod
+    def _character_payload(character_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Procesar equipment - puede ser dict o list
+        equipment = character_data.get("equipment", {})
+        if isinstance(equipment, dict):
+            # Nuevo formato con weapons, armor, shield
+            equipment_payload = {
+                "weapons": equipment.get("weapons", []),
+                "armor": equipment.get("armor"),
+                "shield": equipment.get("shield"),
+            }
+        else:
+            # Formato antiguo (lista)
+            equipment_payload = {"weapons": equipment if equipment else []}
+
+        return {
+            "name": character_data.get("name"),
+            "race": character_data.get("race"),
+            "character_class": character_data.get("class"),
+            "level": character_data.get("level", 1),
+            "attributes": character_data.get("attributes"),
+            "skills": character_data.get("skills", []),
+            "spells": character_data.get("spells", []),
+            "equipment": equipment_payload,
+            "inventory": character_data.get("inventory", []),
+            "gold": character_data.get("gold", 0),
+        }
 
     async def start_game(self, party_levels: Optional[List[int]] = None) -> Dict[str, Any]:
         """
@@ -132,22 +439,26 @@ class GameService:
         endpoint = f"{self.api_url}/game/start"
         payload = {"party_levels": party_levels or [1]}
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with http_client("gameapi") as client:
             try:
-                response = await client.post(endpoint, json=payload)
+                response = await self._send(client, "POST", endpoint, json=payload, idempotency_key=uuid4().hex)
                 response.raise_for_status()
+                self.state_cache.invalidate()
                 return {"success": True, "data": response.json()}
             except Exception as e:
                 logger.error(f"Error iniciando partida: {e}")
                 return {"success": False, "error": str(e)}
 
     async def get_game_state(self) -> Dict[str, Any]:
-        """Obtiene el estado actual del juego desde GameAPI."""
+        """Obtiene el estado actual del juego desde GameAPI (cacheado, ver state_cache)."""
+        return await self.state_cache.get("game_state", self._fetch_game_state)
+
+    async def _fetch_game_state(self) -> Dict[str, Any]:
         endpoint = f"{self.api_url}/game/state"
         
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with http_client("gameapi") as client:
             try:
-                response = await client.get(endpoint)
+                response = await self._send(client, "GET", endpoint)
                 response.raise_for_status()
                 return {"success": True, "data": response.json()}
             except Exception as e:
@@ -159,10 +470,11 @@ class GameService:
         endpoint = f"{self.api_url}/party/join"
         payload = {"player": player_name}
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with http_client("gameapi") as client:
             try:
-                response = await client.post(endpoint, json=payload)
+                response = await self._send(client, "POST", endpoint, json=payload, idempotency_key=uuid4().hex)
                 response.raise_for_status()
+                self.state_cache.invalidate()
                 return {"success": True, "data": response.json()}
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 400:
@@ -173,12 +485,15 @@ class GameService:
                 return {"success": False, "error": str(e)}
 
     async def get_party(self) -> Dict[str, Any]:
-        """Obtiene la lista de jugadores en el grupo."""
+        """Obtiene la lista de jugadores en el grupo (cacheada, ver state_cache)."""
+        return await self.state_cache.get("party", self._fetch_party)
+
+    async def _fetch_party(self) -> Dict[str, Any]:
         endpoint = f"{self.api_url}/party"
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with http_client("gameapi") as client:
             try:
-                response = await client.get(endpoint)
+                response = await self._send(client, "GET", endpoint)
                 response.raise_for_status()
                 return {"success": True, "data": response.json()}
             except Exception as e:
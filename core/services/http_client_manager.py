@@ -0,0 +1,256 @@
+"""
+HTTP Client Manager
+-------------------
+Clientes httpx.AsyncClient compartidos por servicio externo (GameAPI, SRD).
+
+Antes cada llamada abría su propio AsyncClient: un handshake TCP + TLS
+nuevo por cada acción de jugador. El manager se crea en el hook post_init
+de PTB y se cierra en post_shutdown; mientras tanto cada servicio reutiliza
+su pool de conexiones (keep-alive y HTTP/2 si el paquete h2 está instalado).
+
+Timeouts por endpoint con HTTP_TIMEOUT (segundos):
+    HTTP_TIMEOUT=15                              default para todo
+    HTTP_TIMEOUT=15,gameapi.action=45,srd=8      default + overrides
+La clave puede ser "<servicio>" o "<servicio>.<endpoint>". Sin override se
+usan los valores de DEFAULT_TIMEOUTS y, si tampoco hay, el default.
+
+Límites del pool: HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE,
+HTTP_KEEPALIVE_EXPIRY. HTTP/2 se puede desactivar con HTTP2=0.
+
+stats() informa de peticiones, conexiones nuevas y tasa de reutilización
+por servicio (se registran en el log periódico de estadísticas y al apagar).
+idle_seconds() indica cuánto hace de la última respuesta de un servicio
+(lo usa WarmupScheduler para no hacer ping si el tráfico real lo mantiene despierto).
+
+Cada http_client() espera turno en el OutboundScheduler del manager
+(límites de concurrencia, prioridad y reparto entre chats, ver
+core/services/outbound_scheduler.py) y lo libera al salir del bloque.
+
+Si no hay manager instalado (scripts, tests) http_client() abre un cliente
+temporal, como antes, sin turnos.
+"""
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from core.services.outbound_scheduler import OutboundScheduler, Priority
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15.0
+
+# Timeouts de cada endpoint antes de centralizar los clientes
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "gameapi.action": 30.0,
+    "gameapi.health": 10.0,
+    # En streaming es el máximo entre fragmentos, no para la respuesta completa
+    "gameapi.stream": 30.0,
+    "srd": 10.0,
+    # Descarga de colecciones completas para el snapshot local
+    "srd.sync": 60.0,
+}
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_timeouts(spec: Optional[str]):
+    """Parsea HTTP_TIMEOUT. Retorna (default, overrides)."""
+    default = DEFAULT_TIMEOUT
+    overrides: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "=" in part:
+                key, value = part.split("=", 1)
+                overrides[key.strip()] = float(value)
+            else:
+                default = float(part)
+        except ValueError:
+            logger.warning(f"[HttpClients] Valor inválido en HTTP_TIMEOUT: {part!r}")
+    return default, overrides
+
+
+def _resolve_timeout(default: float, overrides: Dict[str, float], service: str, endpoint: Optional[str]) -> float:
+    keys = [f"{service}.{endpoint}", service] if endpoint else [service]
+    for table in (overrides, DEFAULT_TIMEOUTS):
+        for key in keys:
+            if key in table:
+                return table[key]
+    return default
+
+
+class _ServiceStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        self.http2_responses = 0
+        self.errors = 0
+        self.last_response: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.new_connections)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "http2_responses": self.http2_responses,
+            "errors": self.errors,
+        }
+
+
+class HttpClientManager:
+    """
+    Un AsyncClient con pool propio por servicio, creado bajo demanda.
+    """
+
+    def __init__(self, http2: Optional[bool] = None, timeouts: Optional[str] = None) -> None:
+        if http2 is None:
+            http2 = os.getenv("HTTP2", "1").lower() not in ("0", "false", "no")
+        if http2 and not _h2_available():
+            logger.info("[HttpClients] Paquete h2 no instalado - se usa HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.default_timeout, self.timeout_overrides = parse_timeouts(
+            timeouts if timeouts is not None else os.getenv("HTTP_TIMEOUT")
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _ServiceStats] = {}
+        self.scheduler = OutboundScheduler()
+        self.closed = False
+
+    # ---------------------------------------------------------
+    # Clientes
+    # ---------------------------------------------------------
+    def client(self, service: str) -> httpx.AsyncClient:
+        """Cliente compartido del servicio (se crea en el primer uso)."""
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            stats = self._stats.setdefault(service, _ServiceStats())
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout(service),
+                follow_redirects=True,
+                event_hooks={"request": [self._on_request(stats)], "response": [self._on_response(stats)]},
+            )
+            self._clients[service] = client
+            logger.info(f"[HttpClients] Cliente '{service}' creado (HTTP/2: {self.http2})")
+        return client
+
+    def timeout(self, service: str, endpoint: Optional[str] = None) -> float:
+        """Timeout en segundos para un servicio/endpoint."""
+        return _resolve_timeout(self.default_timeout, self.timeout_overrides, service, endpoint)
+
+    @staticmethod
+    def _on_request(stats: _ServiceStats):
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            # Solo se abre conexión TCP cuando el pool no tenía una reutilizable
+            if event == "connection.connect_tcp.complete":
+                stats.new_connections += 1
+
+        async def hook(request: httpx.Request) -> None:
+            stats.requests += 1
+            request.extensions["trace"] = trace
+
+        return hook
+
+    @staticmethod
+    def _on_response(stats: _ServiceStats):
+        async def hook(response: httpx.Response) -> None:
+            stats.last_response = time.monotonic()
+            if response.http_version == "HTTP/2":
+                stats.http2_responses += 1
+            if response.status_code >= 500:
+                stats.errors += 1
+
+        return hook
+
+    # ---------------------------------------------------------
+    # Estadísticas / cierre
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {service: stats.to_dict() for service, stats in self._stats.items()}
+
+    def idle_seconds(self, service: str) -> Optional[float]:
+        """Segundos desde la última respuesta del servicio (None si aún no respondió)."""
+        stats = self._stats.get(service)
+        if stats is None or stats.last_response is None:
+            return None
+        return time.monotonic() - stats.last_response
+
+    def log_stats(self) -> None:
+        for service, data in self.stats().items():
+            logger.info(
+                f"[HttpClients] {service}: {data['requests']} peticiones, {data['new_connections']} conexiones nuevas, "
+                f"reutilización {data['reuse_ratio']:.0%}, HTTP/2 {data['http2_responses']}"
+            )
+        self.scheduler.log_stats()
+
+    async def aclose(self) -> None:
+        """Cierra todos los clientes (al apagar)."""
+        self.closed = True
+        for service, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"[HttpClients] Error cerrando cliente '{service}': {e}")
+        self._clients.clear()
+
+
+# ---------------------------------------------------------
+# Manager por defecto (instalado en post_init)
+# ---------------------------------------------------------
+_default_manager: Optional[HttpClientManager] = None
+
+
+def install_http_client_manager(manager: Optional[HttpClientManager]) -> None:
+    """Instala (o quita, con None) el manager por defecto."""
+    global _default_manager
+    _default_manager = manager
+
+
+def get_http_client_manager() -> Optional[HttpClientManager]:
+    return _default_manager
+
+
+def request_timeout(service: str, endpoint: Optional[str] = None) -> float:
+    """Timeout configurado para un servicio/endpoint (con o sin manager instalado)."""
+    manager = _default_manager
+    if manager is not None:
+        return manager.timeout(service, endpoint)
+    default, overrides = parse_timeouts(os.getenv("HTTP_TIMEOUT"))
+    return _resolve_timeout(default, overrides, service, endpoint)
+
+
+@asynccontextmanager
+async def http_client(service: str, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Cliente para un servicio: el compartido si hay manager instalado (tras
+    esperar turno con la prioridad indicada), o uno temporal que se cierra al salir.
+    """
+    manager = _default_manager
+    if manager is not None and not manager.closed:
+        async with manager.scheduler.slot(service, priority):
+            yield manager.client(service)
+        return
+    async with httpx.AsyncClient(timeout=request_timeout(service), follow_redirects=True) as client:
+        yield client
@@ -0,0 +1,225 @@
+"""
+Outbound Scheduler
+------------------
+Límite de llamadas simultáneas a los servicios externos (GameAPI, SRD) con
+clases de prioridad y reparto equitativo entre chats.
+
+Acciones de jugador, búsquedas SRD de la creación de personaje, consultas
+de estado de /start y pings de calentamiento compiten por los mismos
+backends lentos. http_client() pide un turno al scheduler del
+HttpClientManager antes de entregar el cliente y lo libera al salir:
+
+- Límite global y por servicio con OUTBOUND_CONCURRENCY (mismo formato que
+  HTTP_TIMEOUT):
+      OUTBOUND_CONCURRENCY=16                  límite global
+      OUTBOUND_CONCURRENCY=16,gameapi=8,srd=4  global + límite por servicio
+  Sin valor se usan 16 en total, 8 para el GameAPI y 4 para el SRD.
+- Prioridad estricta entre clases: ACTION (acciones de jugador) antes que
+  INTERACTIVE (consultas con un jugador esperando) antes que BACKGROUND
+  (calentamiento y trabajo sin nadie esperando).
+- Dentro de una clase, round-robin entre chats: cada turno liberado pasa
+  al siguiente chat con llamadas en espera, así un grupo muy activo no deja
+  sin turno a los demás. El chat se toma de outbound_chat (lo fija
+  ChatUpdateProcessor para cada update).
+- Si el servicio de la primera llamada en espera está al límite, el turno
+  pasa a la siguiente que sí pueda salir.
+
+stats() informa del tiempo de espera en cola (p50/p95/máximo) por clase.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOTAL = 16
+DEFAULT_PER_SERVICE: Dict[str, int] = {"gameapi": 8, "srd": 4}
+
+# Chat del update en curso (None fuera de un update o sin ChatUpdateProcessor)
+outbound_chat: "contextvars.ContextVar[Optional[Hashable]]" = contextvars.ContextVar("outbound_chat", default=None)
+
+
+class Priority(IntEnum):
+    ACTION = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+
+def parse_concurrency(spec: Optional[str]) -> Tuple[int, Dict[str, int]]:
+    """
+    Parsea OUTBOUND_CONCURRENCY. Retorna (límite global, límites por servicio);
+    los servicios no indicados conservan los límites de DEFAULT_PER_SERVICE.
+    """
+    total = DEFAULT_TOTAL
+    per_service = dict(DEFAULT_PER_SERVICE)
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "=" in part:
+                key, value = part.split("=", 1)
+                per_service[key.strip()] = max(1, int(value))
+            else:
+                total = max(1, int(part))
+        except ValueError:
+            logger.warning(f"[OutboundScheduler] Valor inválido en OUTBOUND_CONCURRENCY: {part!r}")
+    return total, per_service
+
+
+class _Waiter:
+    __slots__ = ("service", "future", "enqueued_at")
+
+    def __init__(self, service: str, future: "asyncio.Future[None]") -> None:
+        self.service = service
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class OutboundScheduler:
+    """Turnos de llamada saliente: límites global/por servicio, prioridad y round-robin por chat."""
+
+    def __init__(self, spec: Optional[str] = None) -> None:
+        self.max_total, self.max_per_service = parse_concurrency(
+            spec if spec is not None else os.getenv("OUTBOUND_CONCURRENCY")
+        )
+        self._active = 0
+        self._active_by_service: Counter = Counter()
+        self._queues: Dict[Priority, "OrderedDict[Hashable, Deque[_Waiter]]"] = {p: OrderedDict() for p in Priority}
+        self._waits: Dict[Priority, Deque[float]] = {p: deque(maxlen=500) for p in Priority}
+        self.counters = {p: Counter() for p in Priority}
+
+    # ---------------------------------------------------------
+    # Turnos
+    # ---------------------------------------------------------
+    @asynccontextmanager
+    async def slot(
+        self, service: str, priority: Priority = Priority.INTERACTIVE, chat_id: Optional[Hashable] = None
+    ) -> AsyncIterator[None]:
+        await self.acquire(service, priority, chat_id)
+        try:
+            yield
+        finally:
+            self.release(service)
+
+    async def acquire(
+        self, service: str, priority: Priority = Priority.INTERACTIVE, chat_id: Optional[Hashable] = None
+    ) -> None:
+        """Espera un turno para llamar a `service`."""
+        if chat_id is None:
+            chat_id = outbound_chat.get()
+        self.counters[priority]["calls"] += 1
+        # Tras cada reparto las llamadas en espera están bloqueadas por un límite,
+        # así que si hay hueco para este servicio nadie en cola tiene preferencia
+        if self._has_capacity(service):
+            self._take(service)
+            self._waits[priority].append(0.0)
+            return
+
+        waiter = _Waiter(service, asyncio.get_running_loop().create_future())
+        chats = self._queues[priority]
+        chats.setdefault(chat_id, deque()).append(waiter)
+        self.counters[priority]["queued"] += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # El turno ya se había concedido: se devuelve
+                self.release(service)
+            else:
+                self._discard(priority, chat_id, waiter)
+            raise
+        self._waits[priority].append(time.monotonic() - waiter.enqueued_at)
+
+    def release(self, service: str) -> None:
+        self._active -= 1
+        self._active_by_service[service] -= 1
+        self._dispatch()
+
+    def _has_capacity(self, service: str) -> bool:
+        if self._active >= self.max_total:
+            return False
+        limit = self.max_per_service.get(service)
+        return limit is None or self._active_by_service[service] < limit
+
+    def _take(self, service: str) -> None:
+        self._active += 1
+        self._active_by_service[service] += 1
+
+    def _discard(self, priority: Priority, chat_id: Hashable, waiter: _Waiter) -> None:
+        chats = self._queues[priority]
+        queue = chats.get(chat_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if not queue:
+            del chats[chat_id]
+
+    def _dispatch(self) -> None:
+        """Concede turnos libres: por prioridad y, dentro de cada clase, rotando entre chats."""
+        for priority in Priority:
+            chats = self._queues[priority]
+            granted = True
+            while granted and chats and self._active < self.max_total:
+                granted = False
+                for chat_id, queue in chats.items():
+                    waiter = next((w for w in queue if self._has_capacity(w.service)), None)
+                    if waiter is None:
+                        continue
+                    queue.remove(waiter)
+                    if not queue:
+                        del chats[chat_id]
+                    else:
+                        # El chat que acaba de recibir turno pasa al final de la rueda
+                        chats.move_to_end(chat_id)
+                    if waiter.future.done():
+                        # Cancelado mientras esperaba
+                        granted = True
+                        break
+                    self._take(waiter.service)
+                    waiter.future.set_result(None)
+                    granted = True
+                    break
+
+    # ---------------------------------------------------------
+    # Estadísticas
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        classes: Dict[str, Any] = {}
+        for priority in Priority:
+            waits = sorted(self._waits[priority])
+
+            def percentile(p: float) -> float:
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+            classes[priority.name.lower()] = {
+                "calls": self.counters[priority]["calls"],
+                "queued": self.counters[priority]["queued"],
+                "waiting": sum(len(q) for q in self._queues[priority].values()),
+                "wait_p50": percentile(0.5),
+                "wait_p95": percentile(0.95),
+                "wait_max": round(waits[-1], 3) if waits else 0.0,
+            }
+        return {"active": self._active, "active_by_service": dict(+self._active_by_service), "classes": classes}
+
+    def log_stats(self) -> None:
+        data = self.stats()
+        for name, info in data["classes"].items():
+            if not info["calls"]:
+                continue
+            logger.info(
+                f"[OutboundScheduler] {name}: {info['calls']} llamadas, {info['queued']} esperaron turno, "
+                f"espera p50 {info['wait_p50']}s / p95 {info['wait_p95']}s / máx. {info['wait_max']}s"
+            )
@@ -0,0 +1,359 @@
+"""
+Persistence Service
+-------------------
+Servicio de persistencia write-behind para los archivos JSON de estado.
+
+Los componentes (CampaignManager, StoryDirector, MemoryManager, FactionManager,
+memorias emocionales) ya no escriben directamente en disco desde los handlers
+async: marcan su archivo como "sucio" y el servicio agrupa las escrituras por
+archivo (debounce con un retardo máximo configurable). La escritura se hace en
+un thread executor con archivo temporal + fsync + rename atómico, y todo lo
+pendiente se vuelca al apagar la aplicación.
+
+Los snapshots de estado (campaña, StoryDirector) se guardan con checksum=True:
+una cabecera "SAMSNAP1 <longitud> <crc32>" precede al JSON y el snapshot
+anterior se conserva como <archivo>.prev. read_snapshot() detecta un archivo
+truncado o corrupto y recurre al snapshot anterior; verify_snapshot() comprueba
+un guardado leyendo solo la cabecera.
+
+Si no hay servicio instalado o no hay un event loop corriendo (arranque,
+scripts, tests) la escritura es inmediata y síncrona, también atómica.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Union
+
+from core.exceptions import SnapshotCorruptError
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Union[Any, Callable[[], Any]]
+
+
+def serialize_json(data: Any, pretty: Optional[bool] = None) -> bytes:
+    """
+    Serializa a JSON UTF-8 con el codec central (orjson).
+    Compacto por defecto; pretty=True (o STATE_JSON_PRETTY=1) para depurar.
+    """
+    return codec.dumps(data, pretty=pretty)
+
+
+SNAPSHOT_MAGIC = b"SAMSNAP1"
+
+
+def previous_snapshot_path(path: str) -> str:
+    return f"{path}.prev"
+
+
+def frame_snapshot(payload: bytes) -> bytes:
+    """Antepone la cabecera con longitud y crc32 del payload."""
+    header = b"%s %d %08x\n" % (SNAPSHOT_MAGIC, len(payload), zlib.crc32(payload) & 0xFFFFFFFF)
+    return header + payload
+
+
+def _parse_header(line: bytes):
+    parts = line.split()
+    if len(parts) != 3 or parts[0] != SNAPSHOT_MAGIC:
+        raise SnapshotCorruptError(f"Cabecera de snapshot inválida: {line[:40]!r}")
+    return int(parts[1]), int(parts[2], 16)
+
+
+def decode_snapshot(raw: bytes) -> Any:
+    """
+    Decodifica un snapshot verificando longitud y checksum.
+    Los archivos sin cabecera (formato anterior) se leen como JSON plano.
+    """
+    if not raw.startswith(SNAPSHOT_MAGIC):
+        return codec.loads(raw)
+    newline = raw.find(b"\n")
+    if newline < 0:
+        raise SnapshotCorruptError("Snapshot truncado en la cabecera")
+    length, crc = _parse_header(raw[:newline])
+    payload = raw[newline + 1:]
+    if len(payload) != length:
+        raise SnapshotCorruptError(f"Snapshot truncado: {len(payload)} de {length} bytes")
+    if zlib.crc32(payload) & 0xFFFFFFFF != crc:
+        raise SnapshotCorruptError("Checksum del snapshot no coincide")
+    return codec.loads(payload)
+
+
+def read_snapshot(path: str) -> Optional[Any]:
+    """
+    Lee un snapshot verificado. Si está truncado o corrupto, usa el snapshot
+    anterior (<path>.prev). Retorna None si no existe ninguno.
+    """
+    errors = []
+    for candidate in (path, previous_snapshot_path(path)):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "rb") as f:
+                data = decode_snapshot(f.read())
+            if errors:
+                logger.warning(f"[PersistenceService] {path} dañado ({errors[0]}), usando snapshot anterior {candidate}")
+            return data
+        except (SnapshotCorruptError, ValueError) as e:
+            logger.error(f"[PersistenceService] Snapshot inválido {candidate}: {e}")
+            errors.append(e)
+    if errors:
+        raise SnapshotCorruptError(f"No hay snapshot válido para {path}: {errors[0]}")
+    return None
+
+
+def verify_snapshot(path: str) -> bool:
+    """
+    Comprueba un snapshot guardado leyendo solo la cabecera y el tamaño del
+    archivo (coste constante, sin volver a parsear el JSON).
+    """
+    try:
+        with open(path, "rb") as f:
+            line = f.readline(64)
+        length, _ = _parse_header(line)
+        return os.path.getsize(path) == len(line) + length
+    except (OSError, ValueError, SnapshotCorruptError):
+        return False
+
+
+def write_atomic(path: str, payload: bytes, keep_previous: bool = False) -> None:
+    """
+    Escribe `payload` en `path` de forma atómica:
+    archivo temporal en el mismo directorio, fsync y os.replace.
+    Con keep_previous el archivo actual se conserva como <path>.prev.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if keep_previous and os.path.exists(path):
+            os.replace(path, previous_snapshot_path(path))
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass
+class _PendingWrite:
+    snapshot: Snapshot
+    pretty: Optional[bool]
+    on_written: Optional[Callable[[], None]]
+    checksum: bool
+    first_marked: float
+    last_marked: float
+
+
+class PersistenceService:
+    """
+    Agrupa y difiere escrituras JSON por archivo.
+
+    - mark_dirty(path, snapshot): registra que `path` debe reescribirse.
+      `snapshot` es el objeto a guardar o un callable que lo devuelve; se
+      evalúa en el momento de escribir, así que varias marcas seguidas
+      producen una sola escritura con el estado más reciente.
+    - La escritura ocurre `debounce` segundos después de la última marca,
+      pero nunca más de `max_delay` segundos después de la primera.
+    - flush() vuelca todo lo pendiente (usado al apagar).
+    """
+
+    def __init__(self, debounce: Optional[float] = None, max_delay: Optional[float] = None):
+        if debounce is None:
+            debounce = float(os.getenv("PERSISTENCE_DEBOUNCE_SECONDS", "1.0"))
+        if max_delay is None:
+            max_delay = float(os.getenv("PERSISTENCE_MAX_DELAY_SECONDS", "5.0"))
+        self.debounce = max(0.0, debounce)
+        self.max_delay = max(self.debounce, max_delay)
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._flushing = False
+        self.stats = {"marks": 0, "writes": 0, "errors": 0}
+
+    # ---------------------------------------------------------
+    # API pública
+    # ---------------------------------------------------------
+    def mark_dirty(
+        self,
+        path: str,
+        snapshot: Snapshot,
+        pretty: Optional[bool] = None,
+        on_written: Optional[Callable[[], None]] = None,
+        checksum: bool = False,
+    ) -> bool:
+        """
+        Marca un archivo como sucio.
+        Retorna True si la escritura se hizo ya (sin event loop), False si quedó diferida.
+        """
+        self.stats["marks"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            # Sin event loop: escritura inmediata (arranque, scripts)
+            pending = self._pending.pop(path, None)
+            if pending is not None:
+                logger.debug(f"[PersistenceService] Escritura pendiente de {path} reemplazada por escritura síncrona")
+            self._write_now(path, _PendingWrite(snapshot, pretty, on_written, checksum, 0.0, 0.0))
+            return True
+
+        now = loop.time()
+        pending = self._pending.get(path)
+        if pending is None:
+            self._pending[path] = _PendingWrite(snapshot, pretty, on_written, checksum, now, now)
+        else:
+            pending.snapshot = snapshot
+            pending.pretty = pretty
+            pending.checksum = checksum
+            pending.on_written = on_written or pending.on_written
+            pending.last_marked = now
+
+        task = self._tasks.get(path)
+        if task is None or task.done():
+            self._tasks[path] = loop.create_task(self._writer(path), name=f"persist:{path}")
+        return False
+
+    async def flush(self) -> None:
+        """Escribe inmediatamente todos los archivos pendientes y espera a que terminen."""
+        if not self._pending and not self._tasks:
+            return
+        self._flushing = True
+        try:
+            if self._wake is not None:
+                self._wake.set()
+            loop = asyncio.get_running_loop()
+            for path in list(self._pending):
+                task = self._tasks.get(path)
+                if task is None or task.done():
+                    self._tasks[path] = loop.create_task(self._writer(path), name=f"persist:{path}")
+            tasks = [t for t in self._tasks.values() if not t.done()]
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"[PersistenceService] Flush completado ({self.stats['writes']} escrituras totales)")
+        finally:
+            self._flushing = False
+
+    def flush_sync(self) -> None:
+        """Vuelca lo pendiente de forma síncrona (cuando ya no hay event loop)."""
+        for path in list(self._pending):
+            self._write_now(path, self._pending.pop(path))
+
+    def pending_paths(self) -> list:
+        return list(self._pending)
+
+    # ---------------------------------------------------------
+    # Internos
+    # ---------------------------------------------------------
+    def _wake_event(self) -> asyncio.Event:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        return self._wake
+
+    async def _writer(self, path: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while path in self._pending:
+                pending = self._pending[path]
+                deadline = min(pending.last_marked + self.debounce, pending.first_marked + self.max_delay)
+                delay = 0.0 if self._flushing else deadline - loop.time()
+                if delay > 0:
+                    wake = self._wake_event()
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    if not self._flushing:
+                        wake.clear()
+                    continue
+
+                pending = self._pending.pop(path)
+                try:
+                    # El snapshot se toma en el loop (estado consistente); el I/O va al executor
+                    payload = self._serialize(pending)
+                    started = time.perf_counter()
+                    await loop.run_in_executor(None, write_atomic, path, payload, pending.checksum)
+                    self.stats["writes"] += 1
+                    logger.debug(
+                        f"[PersistenceService] {path} escrito ({len(payload)} bytes, "
+                        f"{(time.perf_counter() - started) * 1000:.1f} ms)"
+                    )
+                    if pending.on_written is not None:
+                        pending.on_written()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"[PersistenceService] Error escribiendo {path}: {e}", exc_info=True)
+        finally:
+            if self._tasks.get(path) is asyncio.current_task():
+                self._tasks.pop(path, None)
+
+    def _write_now(self, path: str, pending: _PendingWrite) -> None:
+        try:
+            write_atomic(path, self._serialize(pending), pending.checksum)
+            self.stats["writes"] += 1
+            if pending.on_written is not None:
+                pending.on_written()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"[PersistenceService] Error escribiendo {path}: {e}", exc_info=True)
+            raise
+
+    @staticmethod
+    def _serialize(pending: _PendingWrite) -> bytes:
+        data = pending.snapshot() if callable(pending.snapshot) else pending.snapshot
+        payload = serialize_json(data, pretty=pending.pretty)
+        return frame_snapshot(payload) if pending.checksum else payload
+
+
+# ---------------------------------------------------------
+# Servicio por defecto (instalado por main.py / ServiceContainer)
+# ---------------------------------------------------------
+_default_service: Optional[PersistenceService] = None
+
+
+def set_persistence_service(service: Optional[PersistenceService]) -> None:
+    """Instala (o quita con None) el servicio de persistencia por defecto."""
+    global _default_service
+    _default_service = service
+
+
+def get_persistence_service() -> Optional[PersistenceService]:
+    """Devuelve el servicio de persistencia por defecto, si hay uno instalado."""
+    return _default_service
+
+
+def save_json(
+    path: str,
+    snapshot: Snapshot,
+    pretty: Optional[bool] = None,
+    on_written: Optional[Callable[[], None]] = None,
+    checksum: bool = False,
+) -> bool:
+    """
+    Guarda JSON a través del servicio por defecto (write-behind) o, si no hay
+    servicio instalado, de forma inmediata y atómica.
+    Con checksum=True se escribe como snapshot con cabecera (ver read_snapshot).
+    Retorna True si el archivo ya quedó escrito, False si la escritura quedó diferida.
+    """
+    service = _default_service
+    if service is not None:
+        return service.mark_dirty(path, snapshot, pretty=pretty, on_written=on_written, checksum=checksum)
+    data = snapshot() if callable(snapshot) else snapshot
+    payload = serialize_json(data, pretty=pretty)
+    write_atomic(path, frame_snapshot(payload) if checksum else payload, keep_previous=checksum)
+    if on_written is not None:
+        on_written()
+    return True
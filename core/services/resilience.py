@@ -0,0 +1,176 @@
+"""
+Resilience
+----------
+Reintentos con backoff exponencial + jitter y circuit breaker para las
+llamadas al GameAPI.
+
+El GameAPI en Render arranca en frío: las primeras conexiones fallan o
+tardan. RetryPolicy reintenta un número acotado de veces los errores de
+conexión y las respuestas 5xx (con "full jitter", para no sincronizar a
+todos los chats); CircuitBreaker corta las llamadas mientras el backend
+está caído, de modo que los chats reciben la narración local de inmediato
+en vez de esperar al timeout.
+
+Configuración:
+    GAMEAPI_RETRY_ATTEMPTS       intentos totales por llamada (3)
+    GAMEAPI_RETRY_BASE_DELAY     retardo base en segundos (0.5)
+    GAMEAPI_RETRY_MAX_DELAY      retardo máximo por espera (4.0)
+    GAMEAPI_BREAKER_THRESHOLD    fallos seguidos que abren el circuito (5)
+    GAMEAPI_BREAKER_RESET        segundos abierto antes de probar de nuevo (30)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from core.exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Errores en los que la petición no llegó a procesarse: reintentar es seguro
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class RetryPolicy:
+    """Reintentos acotados con backoff exponencial y full jitter."""
+
+    def __init__(
+        self,
+        attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        if attempts is None:
+            attempts = int(os.getenv("GAMEAPI_RETRY_ATTEMPTS", "3"))
+        if base_delay is None:
+            base_delay = float(os.getenv("GAMEAPI_RETRY_BASE_DELAY", "0.5"))
+        if max_delay is None:
+            max_delay = float(os.getenv("GAMEAPI_RETRY_MAX_DELAY", "4.0"))
+        self.attempts = max(1, attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+
+    def delay(self, attempt: int) -> float:
+        """Espera antes del reintento número `attempt` (0 = primer reintento)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def should_retry_response(response: httpx.Response) -> bool:
+        return response.status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico: closed → open tras N fallos seguidos;
+    tras reset_timeout pasa a half_open y deja pasar una sola prueba.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None) -> None:
+        if failure_threshold is None:
+            failure_threshold = int(os.getenv("GAMEAPI_BREAKER_THRESHOLD", "5"))
+        if reset_timeout is None:
+            reset_timeout = float(os.getenv("GAMEAPI_BREAKER_RESET", "30"))
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.stats = {"opened": 0, "rejected": 0}
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"[CircuitBreaker:{self.name}] Half-open: probando el backend")
+        if self.state == self.HALF_OPEN:
+            # Una sola prueba a la vez; si se perdió (tarea cancelada) se permite otra
+            now = time.monotonic()
+            if not self._probe_in_flight or now - self._probe_started >= self.reset_timeout:
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+        self.stats["rejected"] += 1
+        return False
+
+    def retry_after(self) -> float:
+        """Segundos hasta la próxima prueba (0 si no está abierto)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"[CircuitBreaker:{self.name}] Backend recuperado - circuito cerrado")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats["opened"] += 1
+                logger.warning(
+                    f"[CircuitBreaker:{self.name}] Circuito abierto tras {self.failures} fallos - "
+                    f"fallo rápido durante {self.reset_timeout:.0f}s"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self.failures, **self.stats}
+
+
+async def call_with_resilience(
+    send: Callable[[], Awaitable[httpx.Response]],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy,
+) -> httpx.Response:
+    """
+    Ejecuta send() con reintentos y circuit breaker.
+    Lanza CircuitOpenError si el circuito está abierto; si se agotan los
+    reintentos devuelve la última respuesta 5xx o relanza el último error.
+    Los timeouts de lectura no se reintentan (la acción pudo procesarse),
+    pero cuentan como fallo del backend.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"GameAPI no disponible (reintento en {breaker.retry_after():.0f}s)")
+
+    for attempt in range(policy.attempts):
+        last_attempt = attempt == policy.attempts - 1
+        try:
+            response = await send()
+        except RETRYABLE_ERRORS as e:
+            if last_attempt:
+                breaker.record_failure()
+                raise
+            logger.warning(f"[Resilience] {type(e).__name__} hacia {breaker.name}, reintento {attempt + 1}/{policy.attempts - 1}")
+        except Exception:
+            # Timeouts de lectura y errores inesperados: sin reintento
+            breaker.record_failure()
+            raise
+        else:
+            if not policy.should_retry_response(response):
+                breaker.record_success()
+                return response
+            if last_attempt:
+                breaker.record_failure()
+                return response
+            logger.warning(f"[Resilience] {breaker.name} respondió {response.status_code}, reintento {attempt + 1}/{policy.attempts - 1}")
+        await asyncio.sleep(policy.delay(attempt))
+    raise AssertionError("unreachable")
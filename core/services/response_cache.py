@@ -0,0 +1,98 @@
+"""
+Response Cache
+--------------
+Caché de respuestas de consultas al GameAPI (get_game_state, get_party).
+
+- Cada entrada vive GAMEAPI_STATE_CACHE_TTL segundos (0 desactiva la caché).
+- GameService la invalida cuando una llamada que modifica el juego tiene
+  éxito (start_game, join_party, process_action y sus variantes).
+- Single-flight: las peticiones idénticas concurrentes esperan a la misma
+  llamada al GameAPI en vez de lanzar una cada una.
+- Una invalidación durante una llamada en curso impide que su resultado
+  (posiblemente anterior al cambio) se guarde.
+- Solo se guardan las respuestas con "success"; los errores no se cachean.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ResponseCache:
+    """TTL + invalidación explícita + single-flight, con contadores."""
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = float(os.getenv("GAMEAPI_STATE_CACHE_TTL", "30"))
+        self.ttl = max(0.0, ttl)
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._generation = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    async def get(self, key: str, fetch: Fetch) -> Dict[str, Any]:
+        """Respuesta cacheada de `key`, o la de fetch() (compartida entre llamadas concurrentes)."""
+        if self.ttl <= 0:
+            return await fetch()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats["hits"] += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Se canceló la llamada compartida (no esta espera): se reintenta
+                if inflight.cancelled():
+                    return await self.get(key, fetch)
+                raise
+
+        self.stats["misses"] += 1
+        generation = self._generation
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita el aviso "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if result.get("success") and generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, *keys: str) -> None:
+        """Descarta las entradas indicadas (todas si no se indica ninguna)."""
+        self.stats["invalidations"] += 1
+        self._generation += 1
+        if not keys:
+            self._entries.clear()
+            self._inflight.clear()
+            return
+        for key in keys:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served = self.stats["hits"] + self.stats["coalesced"]
+        return {**self.stats, "hit_ratio": round(served / lookups, 3) if lookups else 0.0, "entries": len(self._entries)}
@@ -0,0 +1,116 @@
+"""
+Round Batcher
+-------------
+Modo por rondas (ROUND_MODE=1): en vez de una llamada al GameAPI por
+mensaje, las acciones de un chat se agrupan durante una ventana corta y se
+resuelven juntas con una sola petición (POST /game/actions/batch).
+
+- La ronda de un chat empieza con la primera acción y se cierra al pasar
+  ROUND_WINDOW_SECONDS, o antes si ya actuaron todos los miembros de la
+  party presentes en el chat o se llegó a ROUND_MAX_ACTIONS.
+- Varios mensajes del mismo jugador dentro de una ronda se unen en una
+  sola acción (en orden).
+- Al cerrar la ronda se llama a on_flush(chat_id, actions, context) con
+  [(player_id, action_text)] en orden de llegada. Las acciones que llegan
+  mientras se resuelve una ronda abren la siguiente.
+- El cierre por tiempo no se resuelve en la tarea del temporizador: entra
+  en la cola del chat (chat_dispatcher.run_in_chat), así su llamada al
+  GameAPI y sus escrituras de estado no se intercalan con el siguiente
+  update del mismo chat.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.services.chat_dispatcher import run_in_chat
+
+logger = logging.getLogger(__name__)
+
+RoundActions = List[Tuple[int, str]]
+FlushCallback = Callable[[int, RoundActions, Any], Awaitable[None]]
+
+
+def round_mode_enabled() -> bool:
+    return os.getenv("ROUND_MODE", "0").lower() in ("1", "true", "yes")
+
+
+class _Round:
+    def __init__(self, context: Any) -> None:
+        self.context = context
+        self.actions: Dict[int, List[str]] = {}
+        self.timer: Optional[asyncio.Task] = None
+        # La ventana venció y el cierre ya está pedido a la cola del chat
+        self.expired = False
+
+
+class RoundBatcher:
+    """Agrupa las acciones de cada chat en rondas."""
+
+    def __init__(
+        self,
+        on_flush: FlushCallback,
+        window: Optional[float] = None,
+        max_actions: Optional[int] = None,
+    ) -> None:
+        if window is None:
+            window = float(os.getenv("ROUND_WINDOW_SECONDS", "4"))
+        if max_actions is None:
+            max_actions = int(os.getenv("ROUND_MAX_ACTIONS", "8"))
+        self.on_flush = on_flush
+        self.window = max(0.0, window)
+        self.max_actions = max(1, max_actions)
+        self._rounds: Dict[int, _Round] = {}
+        self.stats = {"rounds": 0, "actions": 0, "merged": 0, "early": 0}
+
+    async def submit(self, chat_id: int, player_id: int, action_text: str, expected_players: int, context: Any) -> None:
+        """
+        Añade la acción a la ronda abierta del chat (o abre una).
+        Si con ella ya actuaron expected_players jugadores, la ronda se resuelve
+        en esta misma llamada; si no, se resolverá al vencer la ventana.
+        """
+        round_ = self._rounds.get(chat_id)
+        if round_ is None:
+            round_ = self._rounds[chat_id] = _Round(context)
+            round_.timer = asyncio.create_task(self._expire(chat_id, round_))
+        if player_id in round_.actions:
+            self.stats["merged"] += 1
+        round_.actions.setdefault(player_id, []).append(action_text)
+        self.stats["actions"] += 1
+
+        if len(round_.actions) >= min(max(1, expected_players), self.max_actions):
+            self.stats["early"] += 1
+            await self.flush(chat_id)
+
+    def pending(self, chat_id: int) -> int:
+        """Jugadores con acción pendiente en la ronda abierta del chat."""
+        round_ = self._rounds.get(chat_id)
+        return len(round_.actions) if round_ else 0
+
+    async def flush(self, chat_id: int) -> None:
+        """Cierra la ronda abierta del chat y la resuelve."""
+        round_ = self._rounds.pop(chat_id, None)
+        if round_ is None:
+            return
+        if round_.timer is not None and not round_.expired:
+            round_.timer.cancel()
+        actions = [(player_id, "\n".join(texts)) for player_id, texts in round_.actions.items()]
+        self.stats["rounds"] += 1
+        logger.info(f"[RoundBatcher] Ronda del chat {chat_id} cerrada con {len(actions)} acciones")
+        try:
+            await self.on_flush(chat_id, actions, round_.context)
+        except Exception as e:
+            logger.exception(f"[RoundBatcher] Error resolviendo la ronda del chat {chat_id}: {e}")
+
+    async def _expire(self, chat_id: int, round_: _Round) -> None:
+        await asyncio.sleep(self.window)
+        if self._rounds.get(chat_id) is round_:
+            round_.expired = True
+            application = getattr(round_.context, "application", None)
+            await run_in_chat(application, chat_id, self._flush_round(chat_id, round_))
+
+    async def _flush_round(self, chat_id: int, round_: _Round) -> None:
+        # Un update anterior en la cola pudo cerrar ya esta ronda
+        if self._rounds.get(chat_id) is round_:
+            await self.flush(chat_id)
@@ -0,0 +1,272 @@
+"""
+SRD Cache
+---------
+Caché de dos niveles para las consultas al SRD Service.
+
+Antes lookup() usaba @cached(ttl=3600) de aiocache, pero action_id (un UUID
+nuevo en cada llamada) formaba parte de la clave: la caché nunca acertaba.
+Ahora la clave es (kind, consulta normalizada, lang): la consulta se pasa
+por fold_text (sin tildes, minúsculas, sin puntuación), así "Bola de Fuego"
+y "bola de fuego" comparten entrada.
+
+Niveles:
+- memoria: LRU acotado a SRD_CACHE_MAX_ENTRIES entradas;
+- disco: SQLite (SRD_CACHE_PATH, por defecto data/srd_cache.db) que
+  sobrevive a los reinicios; un acierto en disco se sube a memoria.
+
+Frescura (stale-while-revalidate):
+- Durante SRD_CACHE_TTL segundos una entrada es fresca y se sirve tal cual.
+- Después, y hasta SRD_CACHE_STALE_TTL, se sirve al momento y se refresca
+  en segundo plano (una sola vez por clave, con prioridad BACKGROUND).
+- Pasado SRD_CACHE_STALE_TTL se consulta al servicio; si falla se sirve la
+  entrada vieja antes que nada.
+- Una búsqueda sin resultados se guarda solo NEGATIVE_TTL segundos; los
+  errores del servicio no se guardan.
+
+get() resuelve una consulta completa. lookup_many() usa sus dos mitades:
+cached() para lo que ya hay y settle() para registrar lo que trajo el lote.
+
+stats() da aciertos (memoria/disco/viejos) y fallos por kind.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from core.utils import codec
+from core.utils.text import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se recuerda una búsqueda sin resultados
+NEGATIVE_TTL = 600.0
+
+Hits = List[Dict[str, Any]]
+# fetch(background) -> hits, o None si el servicio falló
+Fetch = Callable[[bool], Awaitable[Optional[Hits]]]
+
+
+def cache_key(kind: str, q: str, lang: str) -> str:
+    return f"{kind}|{lang}|{fold_text(q)}"
+
+
+class _Entry:
+    __slots__ = ("hits", "fetched_at")
+
+    def __init__(self, hits: Hits, fetched_at: float) -> None:
+        self.hits = hits
+        self.fetched_at = fetched_at
+
+
+class SrdCache:
+    """LRU en memoria + SQLite en disco, con refresco en segundo plano."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS srd_cache (
+            key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            hits BLOB NOT NULL
+        );
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> None:
+        self.path = path if path is not None else os.getenv("SRD_CACHE_PATH", "data/srd_cache.db")
+        self.max_entries = max(1, max_entries or int(os.getenv("SRD_CACHE_MAX_ENTRIES", "512")))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SRD_CACHE_TTL", "86400"))
+        self.stale_ttl = max(self.ttl, stale_ttl if stale_ttl is not None else float(os.getenv("SRD_CACHE_STALE_TTL", "604800")))
+        self._memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._stats: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(self.SCHEMA)
+            except sqlite3.Error as e:
+                logger.warning(f"[SrdCache] Caché en disco no disponible ({self.path}): {e}")
+                self._conn = None
+
+    # ---------------------------------------------------------
+    # Consulta
+    # ---------------------------------------------------------
+    async def get(self, kind: str, q: str, lang: str, fetch: Fetch) -> Tuple[Hits, Optional[str]]:
+        """
+        Resultados de la consulta. Retorna (hits, nivel): nivel es "memory",
+        "disk" o "stale" si vinieron de la caché y None si se consultó al servicio.
+        """
+        cached = self.cached(kind, q, lang, fetch)
+        if cached is not None:
+            return cached
+        return self.settle(kind, q, lang, await fetch(False))
+
+    def cached(self, kind: str, q: str, lang: str, fetch: Optional[Fetch] = None) -> Optional[Tuple[Hits, str]]:
+        """
+        Respuesta servible desde la caché, sin consultar al servicio: (hits, nivel)
+        o None si hay que consultarlo (y entonces se cuenta como fallo). Con
+        `fetch`, una entrada vieja se refresca en segundo plano.
+        """
+        key = cache_key(kind, q, lang)
+        stats = self._stats.setdefault(kind, Counter())
+        entry, tier = self._memory.get(key), "memory"
+        if entry is not None:
+            self._memory.move_to_end(key)
+        else:
+            entry, tier = self._load(key), "disk"
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            fresh_for = self.ttl if entry.hits else min(self.ttl, NEGATIVE_TTL)
+            if age < fresh_for:
+                stats[f"hits_{tier}"] += 1
+                return entry.hits, tier
+            if age < self.stale_ttl and entry.hits:
+                stats["hits_stale"] += 1
+                if fetch is not None:
+                    self._refresh(key, kind, fetch)
+                return entry.hits, "stale"
+
+        stats["misses"] += 1
+        return None
+
+    def settle(self, kind: str, q: str, lang: str, hits: Optional[Hits]) -> Tuple[Hits, Optional[str]]:
+        """
+        Registra la respuesta del servicio a un fallo de cached() (None = error).
+        Retorna (hits, None), o la entrada vieja con nivel "stale" si el servicio falló.
+        """
+        key = cache_key(kind, q, lang)
+        if hits is None:
+            self._stats.setdefault(kind, Counter())["errors"] += 1
+            entry = self._memory.get(key)
+            if entry is not None and entry.hits:
+                # Mejor una respuesta vieja que ninguna
+                return entry.hits, "stale"
+            return [], None
+        self.put(key, kind, hits)
+        return hits, None
+
+    def _refresh(self, key: str, kind: str, fetch: Fetch) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def run() -> None:
+            try:
+                hits = await fetch(True)
+                if hits is not None:
+                    self._stats.setdefault(kind, Counter())["refreshes"] += 1
+                    self.put(key, kind, hits)
+            except Exception as e:
+                logger.warning(f"[SrdCache] Error refrescando {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ---------------------------------------------------------
+    # Niveles
+    # ---------------------------------------------------------
+    def put(self, key: str, kind: str, hits: Hits) -> None:
+        entry = _Entry(hits, time.time())
+        self._remember(key, entry)
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO srd_cache (key, kind, fetched_at, hits) VALUES (?, ?, ?, ?)",
+                    (key, kind, entry.fetched_at, codec.dumps(hits, pretty=False)),
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"[SrdCache] No se pudo guardar {key} en disco: {e}")
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[_Entry]:
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT fetched_at, hits FROM srd_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"[SrdCache] Error leyendo {key} de disco: {e}")
+            return None
+        if row is None:
+            return None
+        try:
+            return _Entry(codec.loads(row[1]), row[0])
+        except ValueError:
+            return None
+
+    # ---------------------------------------------------------
+    # Estadísticas / cierre
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for kind, counter in self._stats.items():
+            hits = counter["hits_memory"] + counter["hits_disk"] + counter["hits_stale"]
+            lookups = hits + counter["misses"]
+            report[kind] = {**counter, "hit_ratio": round(hits / lookups, 3) if lookups else 0.0}
+        return report
+
+    def log_stats(self) -> None:
+        for kind, data in self.stats().items():
+            logger.info(
+                f"[SrdCache] {kind}: memoria {data.get('hits_memory', 0)}, disco {data.get('hits_disk', 0)}, "
+                f"viejos {data.get('hits_stale', 0)}, fallos {data.get('misses', 0)}, "
+                f"errores {data.get('errors', 0)}, acierto {data['hit_ratio']:.0%}"
+            )
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+
+_default_cache: Optional[SrdCache] = None
+
+
+def get_srd_cache() -> SrdCache:
+    """Caché SRD del proceso (se crea en el primer uso)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SrdCache()
+    return _default_cache
+
+
+async def close_srd_cache() -> None:
+    global _default_cache
+    if _default_cache is not None:
+        await _default_cache.aclose()
+        _default_cache = None
@@ -0,0 +1,425 @@
+"""
+SRD Resolver
+------------
+Resuelve nombres del SRD escritos por los jugadores ("bola de fuego",
+"firebal", "proyectil magico") a su nombre canónico y slug.
+
+- Términos: los nombres del snapshot SRD (core/services/srd_snapshot.py)
+  más una tabla de alias español -> inglés (ALIASES); sin snapshot, los
+  nombres destino de los alias.
+- Todo se compara normalizado con fold_text (sin tildes ni mayúsculas).
+- Coincidencia exacta por diccionario; si no, índice de trigramas para
+  elegir candidatos y distancia de edición acotada (1 error hasta 4
+  letras, 2 hasta 8, 3 a partir de ahí) para ordenarlos.
+- find_in_text() busca el mejor nombre dentro de una frase completa
+  ("lanzo bola de fuego al orco"), probando grupos de 1 a 4 palabras.
+- Las aproximadas solo valen si el recurso tiene nombres del snapshot
+  (covers()); solo con la tabla de alias, "Blight" acabaría en "Light".
+
+get_srd_resolver() lo construye una vez y lo reconstruye solo si cambia el
+snapshot instalado. Lo usan lookup() (la consulta viaja con el nombre
+canónico: menos búsquedas fallidas en el servicio) y parse_intent() para
+extraer hechizos y objetivos.
+"""
+
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from core.services.srd_snapshot import STOPWORDS, SrdSnapshot, get_srd_snapshot
+from core.utils.text import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Alias en español (ya normalizados o no: se pasan por fold_text) -> nombre SRD, por recurso
+ALIASES: Dict[str, Dict[str, str]] = {
+    "spells": {
+        "bola de fuego": "Fireball",
+        "proyectil magico": "Magic Missile",
+        "dormir": "Sleep",
+        "sueño": "Sleep",
+        "luz": "Light",
+        "curar heridas": "Cure Wounds",
+        "palabra de curacion": "Healing Word",
+        "escudo": "Shield",
+        "escudo de fe": "Shield of Faith",
+        "armadura de mago": "Mage Armor",
+        "mano de mago": "Mage Hand",
+        "detectar magia": "Detect Magic",
+        "identificar": "Identify",
+        "bendecir": "Bless",
+        "bendicion": "Bless",
+        "orientacion": "Guidance",
+        "guia": "Guidance",
+        "rayo de fuego": "Fire Bolt",
+        "descarga de fuego": "Fire Bolt",
+        "hechizar persona": "Charm Person",
+        "encantar persona": "Charm Person",
+        "estallido sobrenatural": "Eldritch Blast",
+        "descarga sobrenatural": "Eldritch Blast",
+        "maleficio": "Hex",
+        "burla cruel": "Vicious Mockery",
+        "disfrazarse": "Disguise Self",
+        "fuego feerico": "Faerie Fire",
+        "marca del cazador": "Hunter's Mark",
+        "baya buena": "Goodberry",
+        "bayas nutritivas": "Goodberry",
+        "enmarañar": "Entangle",
+        "ola atronadora": "Thunderwave",
+        "onda atronadora": "Thunderwave",
+        "producir llama": "Produce Flame",
+        "rayo": "Lightning Bolt",
+        "relampago": "Lightning Bolt",
+        "invisibilidad": "Invisibility",
+        "volar": "Fly",
+        "contraconjuro": "Counterspell",
+        "disipar magia": "Dispel Magic",
+        "paso brumoso": "Misty Step",
+        "telaraña": "Web",
+        "rayo de escarcha": "Ray of Frost",
+        "llama sagrada": "Sacred Flame",
+        "rociada de veneno": "Poison Spray",
+        "salpicadura acida": "Acid Splash",
+        "toque helado": "Chill Touch",
+        "prestidigitacion": "Prestidigitation",
+        "reparar": "Mending",
+        "mensaje": "Message",
+        "ilusion menor": "Minor Illusion",
+        "manos ardientes": "Burning Hands",
+        "rociada de color": "Color Spray",
+        "retirada expeditiva": "Expeditious Retreat",
+        "caida de pluma": "Feather Fall",
+        "salto": "Jump",
+        "comprender idiomas": "Comprehend Languages",
+        "armadura de agathys": "Armor of Agathys",
+        "proteccion contra el mal y el bien": "Protection from Evil and Good",
+        "detectar el bien y el mal": "Detect Evil and Good",
+        "restablecimiento menor": "Lesser Restoration",
+        "arma espiritual": "Spiritual Weapon",
+        "revivir": "Revivify",
+    },
+    "races": {
+        "humano": "Human",
+        "elfo": "Elf",
+        "enano": "Dwarf",
+        "mediano": "Halfling",
+        "gnomo": "Gnome",
+        "semielfo": "Half-Elf",
+        "semiorco": "Half-Orc",
+        "draconido": "Dragonborn",
+        "tiefling": "Tiefling",
+    },
+    "classes": {
+        "barbaro": "Barbarian",
+        "bardo": "Bard",
+        "clerigo": "Cleric",
+        "druida": "Druid",
+        "guerrero": "Fighter",
+        "luchador": "Fighter",
+        "monje": "Monk",
+        "paladin": "Paladin",
+        "explorador": "Ranger",
+        "picaro": "Rogue",
+        "hechicero": "Sorcerer",
+        "brujo": "Warlock",
+        "mago": "Wizard",
+    },
+    "conditions": {
+        "cegado": "Blinded",
+        "hechizado": "Charmed",
+        "encantado": "Charmed",
+        "ensordecido": "Deafened",
+        "agotamiento": "Exhaustion",
+        "asustado": "Frightened",
+        "atemorizado": "Frightened",
+        "agarrado": "Grappled",
+        "incapacitado": "Incapacitated",
+        "invisible": "Invisible",
+        "paralizado": "Paralyzed",
+        "petrificado": "Petrified",
+        "envenenado": "Poisoned",
+        "derribado": "Prone",
+        "tumbado": "Prone",
+        "apresado": "Restrained",
+        "aturdido": "Stunned",
+        "inconsciente": "Unconscious",
+    },
+    "skills": {
+        "acrobacias": "Acrobatics",
+        "trato con animales": "Animal Handling",
+        "arcanos": "Arcana",
+        "atletismo": "Athletics",
+        "engaño": "Deception",
+        "historia": "History",
+        "perspicacia": "Insight",
+        "intimidacion": "Intimidation",
+        "investigacion": "Investigation",
+        "medicina": "Medicine",
+        "naturaleza": "Nature",
+        "percepcion": "Perception",
+        "interpretacion": "Performance",
+        "persuasion": "Persuasion",
+        "religion": "Religion",
+        "juego de manos": "Sleight of Hand",
+        "sigilo": "Stealth",
+        "supervivencia": "Survival",
+    },
+    "monsters": {
+        "trasgo": "Goblin",
+        "lobo": "Wolf",
+        "lobo terrible": "Dire Wolf",
+        "esqueleto": "Skeleton",
+        "zombi": "Zombie",
+        "orco": "Orc",
+        "osgo": "Bugbear",
+        "hobgoblin": "Hobgoblin",
+        "ogro": "Ogre",
+        "troll": "Troll",
+        "rata gigante": "Giant Rat",
+        "araña gigante": "Giant Spider",
+        "murcielago": "Bat",
+        "oso pardo": "Brown Bear",
+        "bandido": "Bandit",
+        "cultista": "Cultist",
+        "guardia": "Guard",
+        "gnoll": "Gnoll",
+        "kobold": "Kobold",
+        "limo gris": "Gray Ooze",
+        "cubo gelatinoso": "Gelatinous Cube",
+        "dragon rojo joven": "Young Red Dragon",
+        "mimico": "Mimic",
+        "necrofago": "Ghoul",
+    },
+}
+
+# Grupos de palabras que find_in_text() prueba como nombre
+MAX_NAME_WORDS = 4
+
+
+def srd_slug(name: str) -> str:
+    """Slug canónico de un nombre SRD (el mismo que usa SrdHit)."""
+    return name.lower().replace(" ", "-")
+
+
+def _max_distance(length: int) -> int:
+    if length <= 4:
+        return 1
+    if length <= 8:
+        return 2
+    return 3
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Distancia de Levenshtein entre a y b, o None si supera limit. Solo calcula
+    la banda diagonal de ancho limit y corta en cuanto una fila la supera.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        ca = a[i - 1]
+        row_min = current[0]
+        for j in range(low, high + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class Resolution(NamedTuple):
+    name: str
+    slug: str
+    resource: str
+    distance: int
+    alias: Optional[str] = None
+
+
+class _Term(NamedTuple):
+    text: str
+    name: str
+    resource: str
+    alias: Optional[str]
+
+
+class SrdResolver:
+    """Índice de nombres y alias del SRD con búsqueda tolerante a erratas."""
+
+    # Candidatos (por trigramas compartidos) que se comparan con distancia de edición
+    MAX_CANDIDATES = 8
+
+    def __init__(self, names: Dict[str, Iterable[str]], aliases: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+        aliases = ALIASES if aliases is None else aliases
+        self._terms: List[_Term] = []
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._trigrams: Dict[str, Dict[str, List[int]]] = {}
+        # Recursos con nombres del snapshot (no solo la tabla de alias)
+        self._vocabulary: Set[str] = set()
+        for resource, resource_names in names.items():
+            for name in resource_names:
+                self._add(fold_text(name), name, resource, None)
+                self._vocabulary.add(resource)
+        for resource, table in aliases.items():
+            known = {fold_text(name): name for name in names.get(resource, ())}
+            for spanish, english in table.items():
+                # El canónico es el nombre tal como lo escribe el SRD sincronizado
+                # (en inglés o en español); sin snapshot, el inglés
+                if not known:
+                    canonical = english
+                elif fold_text(english) in known:
+                    canonical = known[fold_text(english)]
+                elif fold_text(spanish) in known:
+                    canonical = known[fold_text(spanish)]
+                else:
+                    continue
+                for term in (spanish, english):
+                    self._add(fold_text(term), canonical, resource, term)
+
+    def _add(self, text: str, name: str, resource: str, alias: Optional[str]) -> None:
+        if not text or (resource, text) in self._exact:
+            return
+        if alias is not None and text == fold_text(name):
+            alias = None
+        index = len(self._terms)
+        self._terms.append(_Term(text, name, resource, alias))
+        self._exact[(resource, text)] = index
+        postings = self._trigrams.setdefault(resource, {})
+        for gram in _trigrams(text):
+            postings.setdefault(gram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def covers(self, resource: str) -> bool:
+        """
+        True si el recurso tiene los nombres del snapshot indexados. Sin ellos
+        solo se conocen los destinos de los alias y una aproximada es poco
+        fiable ("Blight" -> "Light").
+        """
+        return resource in self._vocabulary
+
+    def resolve(self, query: str, resource: str, limit: int = 3) -> List[Resolution]:
+        """Nombres canónicos más parecidos a la consulta, el mejor primero."""
+        text = fold_text(query)
+        if not text:
+            return []
+        exact = self._exact.get((resource, text))
+        if exact is not None:
+            return [self._resolution(self._terms[exact], 0)]
+
+        postings = self._trigrams.get(resource)
+        if not postings:
+            return []
+        grams = _trigrams(text)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(postings.get(gram, ()))
+        limit_distance = _max_distance(len(text))
+        # Cada edición rompe como mucho 3 trigramas: los que comparten menos no pueden estar a tiro
+        min_overlap = max(1, len(grams) - 3 * limit_distance)
+        found: Dict[str, Tuple[int, int, _Term]] = {}
+        for index, overlap in shared.most_common(self.MAX_CANDIDATES):
+            if overlap < min_overlap:
+                break
+            term = self._terms[index]
+            distance = bounded_distance(text, term.text, limit_distance)
+            if distance is None:
+                continue
+            best = found.get(term.name)
+            if best is None or (distance, -overlap) < (best[0], -best[1]):
+                found[term.name] = (distance, overlap, term)
+        ranked = sorted(found.values(), key=lambda item: (item[0], -item[1], item[2].name))
+        return [self._resolution(term, distance) for distance, _, term in ranked[:limit]]
+
+    def best(self, query: str, resource: str) -> Optional[Resolution]:
+        matches = self.resolve(query, resource, limit=1)
+        return matches[0] if matches else None
+
+    def find_in_text(self, text: str, resource: str) -> Optional[Resolution]:
+        """
+        Mejor nombre contenido en una frase. Gana el grupo de más palabras y, a
+        igual tamaño, el de menor distancia: "lobo terible" (aproximado, 2
+        palabras) gana a "lobo" (exacto, 1). Las aproximadas se buscan en grupos
+        de 5 letras o más (evita que "luz" case con "lanzo") que no empiecen ni
+        terminen en palabra vacía ("el orco", "fuego contra"), y solo se aceptan
+        si el recurso tiene nombres del snapshot (covers); sin ellos, solo exactas
+        y alias, y ninguna si una aproximada más larga las contradice.
+        """
+        words = fold_text(text).split()
+        chunks = [
+            (size, " ".join(words[start : start + size]))
+            for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1)
+            for start in range(len(words) - size + 1)
+        ]
+        # Coincidencia exacta más larga (los grupos van de más a menos palabras)
+        exact: Optional[Tuple[int, Resolution]] = None
+        for size, chunk in chunks:
+            index = self._exact.get((resource, chunk))
+            if index is not None:
+                exact = (size, self._resolution(self._terms[index], 0))
+                break
+
+        # Solo un grupo más largo que la exacta puede ganarle
+        longest_exact = exact[0] if exact else 0
+        best: Optional[Tuple[Tuple[int, int], Resolution]] = None
+        for size, chunk in chunks:
+            if size <= longest_exact:
+                break
+            if len(chunk) < 5:
+                continue
+            first, _, rest = chunk.partition(" ")
+            if first in STOPWORDS or (rest and rest.rsplit(" ", 1)[-1] in STOPWORDS):
+                continue
+            match = self.best(chunk, resource)
+            if match is None:
+                continue
+            rank = (-size, match.distance)
+            if best is None or rank < best[0]:
+                best = (rank, match)
+        if best is not None:
+            # Sin nombres del snapshot la aproximada no es fiable, pero sí indica
+            # que la exacta más corta ("lobo" en "lobo terible") no es el nombre
+            return best[1] if self.covers(resource) else None
+        return exact[1] if exact else None
+
+    @staticmethod
+    def _resolution(term: _Term, distance: int) -> Resolution:
+        return Resolution(term.name, srd_slug(term.name), term.resource, distance, term.alias)
+
+
+# ---------------------------------------------------------
+# Resolver por defecto (se reconstruye si cambia el snapshot)
+# ---------------------------------------------------------
+_default_resolver: Optional[SrdResolver] = None
+_resolver_source: Optional[SrdSnapshot] = None
+
+
+def get_srd_resolver() -> SrdResolver:
+    global _default_resolver, _resolver_source
+    snapshot = get_srd_snapshot()
+    if _default_resolver is None or snapshot is not _resolver_source:
+        started = time.perf_counter()
+        names = {resource: list(items) for resource, items in snapshot.collections.items()} if snapshot else {}
+        _default_resolver = SrdResolver(names)
+        _resolver_source = snapshot
+        logger.info(
+            f"[SrdResolver] {len(_default_resolver)} nombres y alias indexados en "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+    return _default_resolver
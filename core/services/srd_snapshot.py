@@ -0,0 +1,275 @@
+"""
+SRD Snapshot
+------------
+Copia local de las colecciones del SRD Service con un índice invertido,
+para responder lookup() sin red.
+
+Sin snapshot, una búsqueda con q que el servicio no filtra trae la colección
+entera de /srd/{recurso} y se recorre cada entrada comparando cada campo de
+texto. Con el snapshot:
+
+- sync_snapshot() descarga spells, monsters, races, classes, conditions y
+  skills y los guarda en SRD_SNAPSHOT_PATH (data/srd_snapshot.json, con
+  cabecera de verificación como los demás snapshots):
+      python -m core.services.srd_snapshot sync
+  Con SRD_SNAPSHOT_AUTO_SYNC=1 (por defecto) el bot también lo descarga en
+  segundo plano si no existe o está caducado.
+- Al cargarlo se construye, por recurso, un índice token -> entradas sobre
+  el nombre (peso alto) y la descripción (peso bajo), con los tokens
+  normalizados por fold_text (sin tildes ni mayúsculas). Los tokens de la
+  consulta casan por prefijo ("fire" -> "fireball") y todos deben aparecer.
+- lookup() consulta primero el snapshot; solo si no hay resultados o el
+  snapshot tiene más de SRD_SNAPSHOT_MAX_AGE segundos pasa a la caché
+  SRD y al servicio remoto.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import time
+from bisect import bisect_left
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.services.http_client_manager import http_client, request_timeout
+from core.services.outbound_scheduler import Priority
+from core.services.persistence_service import read_snapshot, save_json
+from core.utils.text import fold_text
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("spells", "monsters", "races", "classes", "conditions", "skills")
+
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+# Máximo de tokens del índice que puede abarcar un prefijo de la consulta
+MAX_PREFIX_EXPANSION = 64
+DESCRIPTION_FIELDS = ("description", "desc", "summary")
+# Palabras vacías (es/en) que no se indexan en las descripciones
+STOPWORDS = frozenset(
+    "de la el los las un una unos unas y o en del al por con para que se su sus es "
+    "the a an of to and or in on for with by is are be as at it its your you".split()
+)
+
+Collection = Dict[str, Dict[str, Any]]
+
+
+def normalize_collection(data: Any) -> Collection:
+    """Convierte la respuesta de /srd/{recurso} en {nombre: datos}."""
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        data = data["results"]
+    if isinstance(data, list):
+        collection: Collection = {}
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            if "name" in item and isinstance(item.get("data"), dict):
+                collection[str(item["name"])] = item["data"]
+                continue
+            name = item.get("name") or item.get("title") or item.get("index")
+            if name:
+                collection[str(name)] = item
+        return collection
+    if isinstance(data, dict):
+        return {str(name): content for name, content in data.items() if isinstance(content, dict)}
+    return {}
+
+
+def _description(data: Dict[str, Any]) -> str:
+    for field in DESCRIPTION_FIELDS:
+        value = data.get(field)
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        if value:
+            return str(value)
+    return ""
+
+
+class _ResourceIndex:
+    """Índice invertido de una colección: token -> {nombre: peso}."""
+
+    __slots__ = ("postings", "tokens", "folded_names", "names_folded")
+
+    def __init__(self, collection: Collection) -> None:
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.folded_names: Dict[str, str] = {}
+        self.names_folded: Dict[str, str] = {}
+        for name, data in collection.items():
+            folded = fold_text(name)
+            self.folded_names.setdefault(folded, name)
+            self.names_folded[name] = folded
+            for token in folded.split():
+                self._add(token, name, NAME_WEIGHT)
+            for token in set(fold_text(_description(data)).split()):
+                if len(token) > 2 and token not in STOPWORDS:
+                    self._add(token, name, DESCRIPTION_WEIGHT)
+        self.tokens = sorted(self.postings)
+
+    def _add(self, token: str, name: str, weight: int) -> None:
+        entries = self.postings.setdefault(token, {})
+        entries[name] = max(entries.get(name, 0), weight)
+
+    def _prefix_matches(self, prefix: str) -> Dict[str, int]:
+        matches: Dict[str, int] = {}
+        start = bisect_left(self.tokens, prefix)
+        for token in self.tokens[start : start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(prefix):
+                break
+            # Un token exacto pesa más que uno que solo empieza igual
+            bonus = 2 if token == prefix else 1
+            for name, weight in self.postings[token].items():
+                matches[name] = max(matches.get(name, 0), weight * bonus)
+        return matches
+
+    def search(self, query: str, limit: int) -> List[str]:
+        folded = fold_text(query)
+        if not folded:
+            return []
+        scores: Optional[Dict[str, int]] = None
+        for token in folded.split():
+            matches = self._prefix_matches(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {name: score + matches[name] for name, score in scores.items() if name in matches}
+            if not scores:
+                return []
+        exact = self.folded_names.get(folded)
+        if exact is not None:
+            scores[exact] = scores.get(exact, 0) + 1000
+        for name in scores:
+            if self.names_folded[name].startswith(folded):
+                scores[name] += 100
+        return heapq.nsmallest(limit, scores, key=lambda name: (-scores[name], name))
+
+
+class SrdSnapshot:
+    """Colecciones del SRD descargadas, con su índice y fecha de sincronización por recurso."""
+
+    def __init__(self, collections: Dict[str, Collection], synced_at: Dict[str, float], service_url: str = "") -> None:
+        self.collections = collections
+        self.synced_at = synced_at
+        self.service_url = service_url
+        self._indexes = {resource: _ResourceIndex(items) for resource, items in collections.items()}
+
+    def age(self, resource: str) -> float:
+        return time.time() - self.synced_at.get(resource, 0.0)
+
+    def is_fresh(self, resource: str, max_age: Optional[float] = None) -> bool:
+        if resource not in self.collections:
+            return False
+        if max_age is None:
+            max_age = float(os.getenv("SRD_SNAPSHOT_MAX_AGE", "604800"))
+        return self.age(resource) < max_age
+
+    def stale_resources(self, resources: Iterable[str] = RESOURCES) -> List[str]:
+        return [resource for resource in resources if not self.is_fresh(resource)]
+
+    def search(self, resource: str, query: str, limit: int = 1) -> List[Tuple[str, Dict[str, Any]]]:
+        """Entradas (nombre, datos) que casan con la consulta, las mejores primero."""
+        collection = self.collections.get(resource)
+        if not collection:
+            return []
+        if not query:
+            names: Iterable[str] = islice(collection, limit)
+        else:
+            names = self._indexes[resource].search(query, limit)
+        return [(name, collection[name]) for name in names]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": 1, "synced_at": self.synced_at, "service_url": self.service_url, "collections": self.collections}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SrdSnapshot":
+        collections = {resource: items for resource, items in (data.get("collections") or {}).items() if isinstance(items, dict)}
+        synced_at = {resource: float(ts) for resource, ts in (data.get("synced_at") or {}).items()}
+        return cls(collections, synced_at, data.get("service_url") or "")
+
+
+# ---------------------------------------------------------
+# Snapshot por defecto (se carga del disco en el primer uso)
+# ---------------------------------------------------------
+_default_snapshot: Optional[SrdSnapshot] = None
+_loaded = False
+
+
+def snapshot_path() -> str:
+    return os.getenv("SRD_SNAPSHOT_PATH", "data/srd_snapshot.json")
+
+
+def get_srd_snapshot() -> Optional[SrdSnapshot]:
+    """Snapshot instalado, o None si todavía no se ha sincronizado."""
+    global _default_snapshot, _loaded
+    if not _loaded:
+        _loaded = True
+        try:
+            data = read_snapshot(snapshot_path())
+        except Exception as e:
+            logger.warning(f"[SrdSnapshot] Snapshot ilegible, se ignora: {e}")
+            data = None
+        if isinstance(data, dict):
+            started = time.perf_counter()
+            _default_snapshot = SrdSnapshot.from_dict(data)
+            entries = sum(len(items) for items in _default_snapshot.collections.values())
+            logger.info(
+                f"[SrdSnapshot] {entries} entradas cargadas e indexadas en {time.perf_counter() - started:.2f}s"
+            )
+    return _default_snapshot
+
+
+def install_srd_snapshot(snapshot: Optional[SrdSnapshot]) -> None:
+    global _default_snapshot, _loaded
+    _default_snapshot = snapshot
+    _loaded = True
+
+
+async def sync_snapshot(service_url: Optional[str] = None, resources: Iterable[str] = RESOURCES) -> SrdSnapshot:
+    """
+    Descarga las colecciones del SRD Service, guarda el snapshot y lo instala.
+    Si un recurso falla se conserva el del snapshot anterior (con su fecha,
+    así se reintenta cuando caduque).
+    """
+    service_url = (service_url or os.getenv("SRD_SERVICE_URL", "https://sam-srdservice.onrender.com")).strip("/")
+    previous = get_srd_snapshot()
+    collections: Dict[str, Collection] = dict(previous.collections) if previous else {}
+    synced_at: Dict[str, float] = dict(previous.synced_at) if previous else {}
+    failed = []
+    async with http_client("srd", Priority.BACKGROUND) as client:
+        for resource in resources:
+            try:
+                response = await client.get(f"{service_url}/srd/{resource}", timeout=request_timeout("srd", "sync"))
+                response.raise_for_status()
+                collections[resource] = normalize_collection(response.json())
+                synced_at[resource] = time.time()
+            except Exception as e:
+                failed.append(resource)
+                logger.warning(f"[SrdSnapshot] No se pudo descargar {resource}: {e}")
+
+    snapshot = SrdSnapshot(collections, synced_at, service_url)
+    save_json(snapshot_path(), snapshot.to_dict, checksum=True)
+    install_srd_snapshot(snapshot)
+    sizes = ", ".join(f"{resource} {len(items)}" for resource, items in collections.items())
+    logger.info(f"[SrdSnapshot] Snapshot sincronizado: {sizes}" + (f" (fallaron: {', '.join(failed)})" if failed else ""))
+    return snapshot
+
+
+async def refresh_snapshot_if_stale(context: Any = None) -> None:
+    """Job de JobQueue: descarga los recursos que faltan en el snapshot o han caducado."""
+    snapshot = get_srd_snapshot()
+    resources = snapshot.stale_resources() if snapshot is not None else list(RESOURCES)
+    if not resources:
+        return
+    try:
+        await sync_snapshot(resources=resources)
+    except Exception as e:
+        logger.warning(f"[SrdSnapshot] Error sincronizando el snapshot: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if sys.argv[1:2] != ["sync"]:
+        print("Uso: python -m core.services.srd_snapshot sync")
+        sys.exit(1)
+    asyncio.run(sync_snapshot())
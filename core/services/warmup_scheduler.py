@@ -0,0 +1,319 @@
+"""
+Warm-up Scheduler
+-----------------
+Mantiene despiertos el GameAPI y el SRD Service (Render duerme los servicios
+gratuitos tras ~15 minutos sin tráfico) solo cuando hace falta.
+
+Antes un job hacía ping al GameAPI cada 10 minutos, hubiera o no tráfico, y
+el SRD nunca se despertaba. Ahora un job cada WARMUP_TICK_SECONDS decide:
+
+- Si el servicio respondió hace menos de WARMUP_WARM_WINDOW segundos (tráfico
+  real o un ping anterior) sigue caliente: no se hace ping.
+- Si no, se hace ping a <servicio>/health cuando estamos en una franja de
+  juego prevista o faltan menos de WARMUP_LEAD_MINUTES para una, de modo que
+  el primer mensaje de la sesión ya no paga el arranque en frío.
+- Cualquier respuesta HTTP cuenta como "despierto" (Render arranca el
+  servicio ante cualquier petición), aunque /health no exista.
+
+Franjas previstas: ActivityHistory guarda, por hora de la semana (7 x 24,
+hora local), una puntuación que se actualiza al cerrar cada hora:
+    puntuación = puntuación * WARMUP_DECAY + (1 si hubo updates en esa hora)
+Una franja está prevista si su puntuación llega a WARMUP_MIN_SCORE. Hasta
+tener WARMUP_LEARNING_DAYS días de historial se mantienen los servicios
+siempre calientes, como el keep-alive anterior. El historial se guarda en
+data/warmup_activity.json.
+
+Además, un update que llega con un servicio inactivo más de WARMUP_COLD_AFTER
+segundos lo despierta en segundo plano (el SRD suele necesitarse unos
+segundos después del primer mensaje).
+
+La latencia de cada ping se registra en un histograma por servicio,
+separando los pings en frío (servicio inactivo más de WARMUP_COLD_AFTER) de
+los pings en caliente.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set
+
+from core.services.http_client_manager import get_http_client_manager, http_client, request_timeout
+from core.services.outbound_scheduler import Priority
+from core.services.persistence_service import read_snapshot, save_json
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _slot(hour: int) -> int:
+    """Hora de la semana (0 = lunes 00h, hora local) de una hora absoluta."""
+    local = time.localtime(hour * 3600)
+    return local.tm_wday * 24 + local.tm_hour
+
+
+class ActivityHistory:
+    """Puntuación de actividad por hora de la semana, con decaimiento."""
+
+    def __init__(self, decay: Optional[float] = None) -> None:
+        if decay is None:
+            decay = float(os.getenv("WARMUP_DECAY", "0.75"))
+        self.decay = min(max(decay, 0.0), 1.0)
+        self.scores: List[float] = [0.0] * HOURS_PER_WEEK
+        self.observed_hours = 0
+        # Hora absoluta (time.time() // 3600) en curso y si tuvo actividad
+        self._hour: Optional[int] = None
+        self._active = False
+
+    def record(self, now: float) -> bool:
+        """Registra actividad. Retorna True si se cerró alguna hora."""
+        closed = self.advance(now)
+        self._active = True
+        return closed
+
+    def advance(self, now: float) -> bool:
+        """Cierra las horas ya pasadas. Retorna True si se cerró alguna."""
+        hour = int(now // 3600)
+        if self._hour is None:
+            self._hour = hour
+            return False
+        if hour <= self._hour:
+            return False
+        # Tras una parada larga basta con decaer cada franja unas semanas
+        start = max(self._hour, hour - HOURS_PER_WEEK * 8)
+        for h in range(start, hour):
+            slot = _slot(h)
+            active = self._active and h == self._hour
+            self.scores[slot] = self.scores[slot] * self.decay + (1.0 if active else 0.0)
+            self.observed_hours += 1
+        self._hour = hour
+        self._active = False
+        return True
+
+    def score(self, now: float) -> float:
+        return self.scores[_slot(int(now // 3600))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scores": [round(s, 4) for s in self.scores],
+            "observed_hours": self.observed_hours,
+            "hour": self._hour,
+            "active": self._active,
+        }
+
+    def load(self, data: Dict[str, Any]) -> None:
+        scores = data.get("scores") or []
+        if len(scores) == HOURS_PER_WEEK:
+            self.scores = [float(s) for s in scores]
+        self.observed_hours = int(data.get("observed_hours") or 0)
+        self._hour = data.get("hour")
+        self._active = bool(data.get("active"))
+
+
+class LatencyHistogram:
+    """Conteo de latencias por bucket (el último bucket es > 60 s)."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        return {
+            "count": self.total,
+            "max": round(self.max, 2),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class WarmupScheduler:
+    """
+    Pings de calentamiento al GameAPI y al SRD según tráfico real y franjas previstas.
+    """
+
+    def __init__(
+        self,
+        targets: Optional[Dict[str, str]] = None,
+        history_path: Optional[str] = None,
+        warm_window: Optional[float] = None,
+        lead_minutes: Optional[float] = None,
+        cold_after: Optional[float] = None,
+        min_score: Optional[float] = None,
+        learning_days: Optional[float] = None,
+    ) -> None:
+        if targets is None:
+            game_api_url = os.getenv("GAME_API_URL", "https://sam-gameapi.onrender.com").strip("/")
+            srd_url = os.getenv("SRD_SERVICE_URL", "https://sam-srdservice.onrender.com").strip("/")
+            targets = {"gameapi": f"{game_api_url}/health", "srd": f"{srd_url}/health"}
+        self.targets = targets
+        self.history_path = history_path or os.getenv("WARMUP_HISTORY_PATH", "data/warmup_activity.json")
+        self.warm_window = warm_window if warm_window is not None else float(os.getenv("WARMUP_WARM_WINDOW", "600"))
+        lead_minutes = lead_minutes if lead_minutes is not None else float(os.getenv("WARMUP_LEAD_MINUTES", "15"))
+        self.lead = lead_minutes * 60
+        self.cold_after = cold_after if cold_after is not None else float(os.getenv("WARMUP_COLD_AFTER", "900"))
+        self.min_score = min_score if min_score is not None else float(os.getenv("WARMUP_MIN_SCORE", "0.5"))
+        learning_days = learning_days if learning_days is not None else float(os.getenv("WARMUP_LEARNING_DAYS", "7"))
+        self.learning_hours = learning_days * 24
+
+        self.history = ActivityHistory()
+        self._load_history()
+        self._last_ping: Dict[str, float] = {}
+        self._inflight: Set[str] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.cold_latency = {service: LatencyHistogram() for service in self.targets}
+        self.warm_latency = {service: LatencyHistogram() for service in self.targets}
+        self.stats = {"pings": 0, "skipped_warm": 0, "skipped_idle_window": 0, "wakeups": 0, "failures": 0}
+
+    # ---------------------------------------------------------
+    # Historial de actividad
+    # ---------------------------------------------------------
+    def _load_history(self) -> None:
+        try:
+            data = read_snapshot(self.history_path)
+        except Exception as e:
+            logger.warning(f"[Warmup] Historial de actividad ilegible, se empieza de cero: {e}")
+            return
+        if isinstance(data, dict):
+            self.history.load(data)
+
+    def save(self) -> None:
+        try:
+            save_json(self.history_path, self.history.to_dict, checksum=True)
+        except Exception as e:
+            logger.warning(f"[Warmup] No se pudo guardar el historial de actividad: {e}")
+
+    @property
+    def learning(self) -> bool:
+        return self.history.observed_hours < self.learning_hours
+
+    def expected_activity(self, now: Optional[float] = None) -> bool:
+        """Indica si ahora (o dentro de WARMUP_LEAD_MINUTES) es una franja de juego prevista."""
+        if self.learning:
+            return True
+        now = time.time() if now is None else now
+        return self.history.score(now) >= self.min_score or self.history.score(now + self.lead) >= self.min_score
+
+    # ---------------------------------------------------------
+    # Tráfico
+    # ---------------------------------------------------------
+    def idle_seconds(self, service: str) -> Optional[float]:
+        """Segundos desde la última respuesta del servicio (tráfico real o ping)."""
+        candidates = []
+        manager = get_http_client_manager()
+        if manager is not None:
+            idle = manager.idle_seconds(service)
+            if idle is not None:
+                candidates.append(idle)
+        if service in self._last_ping:
+            candidates.append(time.monotonic() - self._last_ping[service])
+        return min(candidates) if candidates else None
+
+    async def on_update(self, update: Any, context: Any) -> None:
+        """Handler de PTB para todos los updates: registra actividad y despierta servicios dormidos."""
+        if self.history.record(time.time()):
+            self.save()
+        for service in self.targets:
+            idle = self.idle_seconds(service)
+            if idle is None or idle >= self.cold_after:
+                self._spawn_ping(service, idle)
+
+    def _spawn_ping(self, service: str, idle: Optional[float]) -> None:
+        if service in self._inflight:
+            return
+        self.stats["wakeups"] += 1
+        task = asyncio.get_running_loop().create_task(self.ping(service, idle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ---------------------------------------------------------
+    # Job periódico
+    # ---------------------------------------------------------
+    async def tick(self, context: Any = None) -> None:
+        """Job de JobQueue: hace ping solo a los servicios fríos en franjas previstas."""
+        now = time.time()
+        if self.history.advance(now):
+            self.save()
+        expected = self.expected_activity(now)
+        pings = []
+        for service in self.targets:
+            idle = self.idle_seconds(service)
+            if idle is not None and idle < self.warm_window:
+                self.stats["skipped_warm"] += 1
+                continue
+            if not expected:
+                self.stats["skipped_idle_window"] += 1
+                continue
+            if service not in self._inflight:
+                pings.append(self.ping(service, idle))
+        if pings:
+            await asyncio.gather(*pings)
+
+    async def ping(self, service: str, idle: Optional[float] = None) -> bool:
+        """GET a la URL de calentamiento. Retorna True si el servicio respondió."""
+        if service in self._inflight:
+            return False
+        self._inflight.add(service)
+        cold = idle is None or idle >= self.cold_after
+        started = time.monotonic()
+        try:
+            async with http_client(service, Priority.BACKGROUND) as client:
+                response = await client.get(self.targets[service], timeout=request_timeout(service, "health"))
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning(f"[Warmup] No se pudo contactar {service}: {e}")
+            return False
+        finally:
+            self._inflight.discard(service)
+        elapsed = time.monotonic() - started
+        self._last_ping[service] = time.monotonic()
+        self.stats["pings"] += 1
+        (self.cold_latency if cold else self.warm_latency)[service].observe(elapsed)
+        if response.status_code >= 500:
+            logger.warning(f"[Warmup] {service} respondió con status {response.status_code} en {elapsed:.1f}s")
+        elif cold:
+            logger.info(f"[Warmup] {service} despertado en {elapsed:.1f}s")
+        else:
+            logger.debug(f"[Warmup] {service} ping en {elapsed:.2f}s")
+        return True
+
+    async def aclose(self) -> None:
+        """Cancela los pings en segundo plano y guarda el historial (al apagar)."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.save()
+
+    # ---------------------------------------------------------
+    # Estadísticas
+    # ---------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "learning": self.learning,
+            "expected_now": self.expected_activity(),
+            "cold_latency": {service: h.to_dict() for service, h in self.cold_latency.items()},
+            "warm_latency": {service: h.to_dict() for service, h in self.warm_latency.items()},
+        }
+
+    def log_stats(self) -> None:
+        data = self.snapshot()
+        logger.info(
+            f"[Warmup] pings {data['pings']}, omitidos por tráfico {data['skipped_warm']}, "
+            f"fuera de franja {data['skipped_idle_window']}, despertados por updates {data['wakeups']}, "
+            f"aprendiendo {data['learning']}, franja prevista {data['expected_now']}"
+        )
+        for service, histogram in data["cold_latency"].items():
+            if histogram["count"]:
+                logger.info(f"[Warmup] Arranques en frío de {service}: {histogram}")
@@ -1,52 +1,166 @@
-import httpx
+import asyncio
 import os
 import logging
+import time
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
-from aiocache import cached
+from core.models.base import ErrorModel
 from core.models.srd import SrdQuery, SrdResponse, SrdHit
+from core.services.http_client_manager import http_client, request_timeout
+from core.services.outbound_scheduler import Priority
+from core.services.srd_cache import cache_key, get_srd_cache
+from core.services.srd_resolver import get_srd_resolver, srd_slug
+from core.services.srd_snapshot import get_srd_snapshot, normalize_collection
 
 logger = logging.getLogger(__name__)
 
 SRD_SERVICE_URL = os.getenv("SRD_SERVICE_URL", "https://sam-srdservice.onrender.com").strip("/")
 
+# Consultas simultáneas de lookup_many (además del límite del OutboundScheduler)
+BATCH_CONCURRENCY = 4
 
-@cached(ttl=3600)
-async def lookup(kind: str, q: str, action_id):
+
+# Recurso del SRD Service (/srd/{recurso}) para cada kind
+ENDPOINT_MAP = {
+    "spell": "spells",
+    "monster": "monsters",
+    "race": "races",
+    "class": "classes",
+    "feature": "classes",  # Features are in classes
+    "condition": "conditions",
+    "skill": "skills",
+}
+
+
+async def lookup(kind: str, q: str, action_id, lang: str = "es"):
     """
-    Consulta el servicio SRD (hechizos, rasgos, condiciones, etc.)
-    con caché TTL de 1 hora para evitar repeticiones.
+    Consulta el servicio SRD (hechizos, rasgos, condiciones, etc.).
+    La consulta se traduce antes al nombre canónico con el resolver tolerante
+    a erratas y alias español/inglés (core/services/srd_resolver.py); las
+    erratas solo se corrigen si el snapshot tiene los nombres del recurso.
+    Primero busca en el snapshot local (core/services/srd_snapshot.py); si no
+    hay resultados o el recurso caducó, pasa por la caché de dos niveles
+    (core/services/srd_cache.py), con clave (kind, consulta normalizada, lang).
 
     Args:
         kind: tipo de recurso ("spell", "feature", "condition", etc.)
         q: texto de búsqueda (nombre del hechizo u objeto)
         action_id: UUID de la acción actual (para trazas)
+        lang: idioma de la consulta
     Returns:
-        SrdResponse con hits normalizados o vacío si falla.
+        SrdResponse con hits normalizados o vacío si falla (con errors).
+        from_cache indica si vino del snapshot o de la caché; source["cache"] el
+        origen ("snapshot", "memory", "disk", "stale" o "miss") y
+        source["latency_ms"] el tiempo total.
     """
-    query = SrdQuery(
-        query_id=uuid4(),
-        action_id=action_id,
+    return (await lookup_many([(kind, q)], action_id, lang))[0]
+
+
+async def lookup_many(
+    requests: Iterable[Tuple[str, str]], action_id, lang: str = "es", concurrency: int = BATCH_CONCURRENCY
+) -> List[SrdResponse]:
+    """
+    Varias consultas (kind, q) de una vez: la lista de hechizos de un personaje,
+    los monstruos de una escena, los rasgos de una clase...
+
+    - Las consultas repetidas (misma clave de caché tras resolver el nombre)
+      se hacen una sola vez y comparten respuesta.
+    - Lo que ya está en el snapshot o en la caché se sirve sin red.
+    - Los fallos de un mismo recurso, si son al menos SRD_BULK_MIN, se
+      resuelven con una sola descarga de /srd/{recurso} filtrada en local; el
+      resto se consulta en paralelo, con `concurrency` llamadas como máximo.
+
+    Returns:
+        Una SrdResponse por consulta, en el orden de entrada. Si el servicio
+        falló para una consulta, su respuesta no tiene hits y lleva errors.
+    """
+    started = time.perf_counter()
+    resolver = get_srd_resolver()
+    snapshot = get_srd_snapshot()
+    cache = get_srd_cache()
+
+    order: List[str] = []
+    responses: Dict[str, SrdResponse] = {}
+    pending: Dict[str, SrdQuery] = {}
+    for kind, q in requests:
+        resource = ENDPOINT_MAP.get(kind, "spells")
+        # Nombre canónico ("bola de fuego", "firebal" -> "Fireball") antes de buscar.
+        # Sin nombres del snapshot, solo nombres exactos y alias: si no, se
+        # envía el texto del jugador tal cual
+        resolved = resolver.best(q, resource) if q else None
+        if resolved is not None and (resolved.distance == 0 or resolver.covers(resource)):
+            q = resolved.name
+        q = q or ""
+        key = cache_key(kind, q, lang)
+        order.append(key)
+        if key in responses or key in pending:
+            continue
+        query = SrdQuery(query_id=uuid4(), action_id=action_id, kind=kind, q=q, lang=lang, limit=1)
+
+        # Snapshot local: sin red si el recurso está sincronizado y hay resultados
+        if snapshot is not None and snapshot.is_fresh(resource):
+            entries = snapshot.search(resource, q, query.limit)
+            if entries:
+                hits = [_make_hit(kind, name, data) for name, data in entries]
+                responses[key] = _response(query, started, "snapshot", hits)
+                continue
+
+        cached = cache.cached(kind, q, lang, partial(_fetch_hits, query))
+        if cached is not None:
+            hits, tier = cached
+            responses[key] = _response(query, started, tier, [SrdHit(**hit) for hit in hits])
+            continue
+        pending[key] = query
+
+    if pending:
+        fetched = await _fetch_batch(list(pending.values()), concurrency)
+        for (key, query), result in zip(pending.items(), fetched):
+            hits, tier = cache.settle(query.kind, query.q, lang, result)
+            errors = None
+            if result is None and tier is None:
+                errors = [ErrorModel(code="SRD_UNAVAILABLE", message=f"SRD Service no disponible para {query.kind} {query.q!r}")]
+            responses[key] = _response(query, started, tier, [SrdHit(**hit) for hit in hits], errors)
+
+    return [responses[key] for key in order]
+
+
+def _response(
+    query: SrdQuery, started: float, tier: Optional[str], hits: List[SrdHit], errors: Optional[List[ErrorModel]] = None
+) -> SrdResponse:
+    return SrdResponse(
+        query_id=query.query_id,
+        from_cache=tier is not None,
+        source={
+            "service_url": SRD_SERVICE_URL,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            "cache": tier or "miss",
+        },
+        hits=hits,
+        errors=errors,
+    )
+
+
+def _make_hit(kind: str, name: str, data: Any) -> SrdHit:
+    """SrdHit a partir de una entrada del SRD."""
+    data = data if isinstance(data, dict) else {}
+    return SrdHit(
         kind=kind,
-        q=q,
-        lang="es",
-        limit=1,
+        name=name,
+        slug=srd_slug(name),
+        summary=str(data.get("description", data.get("summary", "")))[:200],
+        details=data,
     )
 
+
+async def _fetch_hits(query: SrdQuery, background: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """Consulta el SRD Service. Retorna los hits como dicts, o None si el servicio falló."""
+    kind, q = query.kind, query.q
+    priority = Priority.BACKGROUND if background else Priority.INTERACTIVE
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client("srd", priority) as client:
             # SRD service uses /srd/{resource}?q=query format
-            # Map kind to endpoint
-            endpoint_map = {
-                "spell": "spells",
-                "monster": "monsters",
-                "race": "races",
-                "class": "classes",
-                "feature": "classes",  # Features are in classes
-                "condition": "conditions",
-                "skill": "skills",
-            }
-            
-            endpoint = endpoint_map.get(kind, "spells")
+            endpoint = ENDPOINT_MAP.get(kind, "spells")
             url = f"{SRD_SERVICE_URL}/srd/{endpoint}"
             
             if q:
@@ -56,7 +170,9 @@ async def lookup(kind: str, q: str, action_id):
                 # Get all if no query
                 r = await client.get(url)
             
-            if r.status_code == 200:
+            if r.status_code == 404:
+                data = {}
+            elif r.status_code == 200:
                 data = r.json()
                 # Transform to expected format
                 if "results" in data:
@@ -64,20 +180,104 @@ async def lookup(kind: str, q: str, action_id):
                     pass
                 elif isinstance(data, dict) and q:
                     # Convert dict to results format
-                    results = []
-                    for name, content in data.items():
-                        if q.lower() in name.lower() or (isinstance(content, dict) and any(q.lower() in str(v).lower() for v in content.values() if isinstance(v, str))):
-                            results.append({"name": name, "data": content})
-                    data = {"results": results}
+                    data = {"results": _filter_collection(data, q)}
                 else:
                     # Single item or list
                     data = {"results": [data] if not isinstance(data, list) else data}
             else:
-                data = {}
+                logger.warning(f"[SRD Lookup] {url} respondió {r.status_code}")
+                return None
     except Exception as e:
-        print(f"[SRD Lookup Error] {e}")
-        data = {}
+        logger.warning(f"[SRD Lookup Error] {e}")
+        return None
+
+    return _parse_hits(query, data)
+
+
+async def _fetch_batch(queries: List[SrdQuery], concurrency: int) -> List[Optional[List[Dict[str, Any]]]]:
+    """
+    Hits de cada consulta (None si falló), en el mismo orden. Agrupa por recurso:
+    con SRD_BULK_MIN consultas o más se descarga la colección una vez.
+    """
+    bulk_min = int(os.getenv("SRD_BULK_MIN", "3"))
+    by_resource: Dict[str, List[int]] = {}
+    for index, query in enumerate(queries):
+        by_resource.setdefault(ENDPOINT_MAP.get(query.kind, "spells"), []).append(index)
+
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+    singles: List[int] = []
+    bulk: Dict[str, List[int]] = {}
+    for resource, indexes in by_resource.items():
+        if bulk_min > 0 and len(indexes) >= bulk_min:
+            bulk[resource] = indexes
+        else:
+            singles.extend(indexes)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def single(index: int) -> None:
+        async with semaphore:
+            results[index] = await _fetch_hits(queries[index])
+
+    async def collection(resource: str, indexes: List[int]) -> None:
+        async with semaphore:
+            items = await _fetch_collection(resource)
+        if items is None:
+            # Sin colección: consulta a consulta
+            await asyncio.gather(*(single(index) for index in indexes))
+            return
+        for index in indexes:
+            query = queries[index]
+            results[index] = _parse_hits(query, {"results": _filter_collection(items, query.q)})
+
+    await asyncio.gather(
+        *(collection(resource, indexes) for resource, indexes in bulk.items()),
+        *(single(index) for index in singles),
+    )
+    if bulk:
+        logger.info(
+            f"[SRD Lookup] {len(queries)} consultas: {sum(len(i) for i in bulk.values())} con "
+            f"{len(bulk)} descargas de colección, {len(singles)} individuales"
+        )
+    return results
+
 
+async def _fetch_collection(resource: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Colección completa /srd/{recurso} como {nombre: datos}, o None si falló."""
+    url = f"{SRD_SERVICE_URL}/srd/{resource}"
+    try:
+        async with http_client("srd") as client:
+            r = await client.get(url, timeout=request_timeout("srd", "sync"))
+            if r.status_code == 404:
+                return {}
+            if r.status_code != 200:
+                logger.warning(f"[SRD Lookup] {url} respondió {r.status_code}")
+                return None
+            return normalize_collection(r.json())
+    except Exception as e:
+        logger.warning(f"[SRD Lookup Error] {e}")
+        return None
+
+
+def _filter_collection(collection: Dict[str, Any], q: str) -> List[Dict[str, Any]]:
+    """
+    Entradas {name, data} cuyo nombre o algún campo de texto contiene q; la
+    de nombre exacto, si la hay, va primero ("Shield" antes que "Shield of Faith").
+    """
+    if not q:
+        return [{"name": name, "data": content} for name, content in collection.items()]
+    needle = q.lower()
+    results = []
+    for name, content in collection.items():
+        if needle in name.lower() or (isinstance(content, dict) and any(needle in str(v).lower() for v in content.values() if isinstance(v, str))):
+            results.append({"name": name, "data": content})
+    results.sort(key=lambda item: item["name"].lower() != needle)
+    return results
+
+
+def _parse_hits(query: SrdQuery, data: Any) -> List[Dict[str, Any]]:
+    """Hits (como dicts) de una respuesta en formato {"results": [...]}."""
+    kind = query.kind
     hits = []
     if "results" in data and isinstance(data["results"], list):
         for h in data["results"][: query.limit]:
@@ -93,22 +293,9 @@ async def lookup(kind: str, q: str, action_id):
                         hit_data = h
                         hit_name = h.get("name", h.get("title", "Unknown"))
                     
-                    # Create SrdHit with available data
-                    hits.append(SrdHit(
-                        kind=kind,
-                        name=hit_name,
-                        slug=hit_name.lower().replace(" ", "-"),
-                        summary=str(hit_data.get("description", hit_data.get("summary", "")))[:200],
-                        details=hit_data if isinstance(hit_data, dict) else {}
-                    ))
+                    hits.append(_make_hit(kind, hit_name, hit_data).model_dump())
             except Exception as e:
                 logger.warning(f"[SRD Lookup] Error parsing hit: {e}")
                 pass
 
-    # Si no hay resultados, crear respuesta vacía
-    return SrdResponse(
-        query_id=query.query_id,
-        from_cache=False,
-        source={"service_url": SRD_SERVICE_URL, "latency_ms": 0},
-        hits=hits,
-    )
+    return hits
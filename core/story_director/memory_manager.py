@@ -16,10 +16,12 @@ Estructura interna de memoria:
 }
 """
 
-import json
 import os
 from datetime import datetime
 
+from core.services.persistence_service import save_json
+from core.utils import codec
+
 
 class MemoryManager:
     def __init__(self, file_path: str = "data/memory_state.json"):
@@ -36,14 +38,13 @@ class MemoryManager:
             return {"timeline": [], "themes_count": {}, "emotion_curve": [], "last_event": {}}
         try:
             with open(self.file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return codec.load(f)
         except Exception:
             return {"timeline": [], "themes_count": {}, "emotion_curve": [], "last_event": {}}
 
     def _save_memory(self):
-        """Guarda el estado actual de memoria."""
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=2, ensure_ascii=False)
+        """Guarda el estado actual de memoria (write-behind vía PersistenceService)."""
+        save_json(self.file_path, lambda: self.memory)
 
     # ==========================================================
     # 🔹 REGISTRO DE EVENTOS
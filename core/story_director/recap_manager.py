@@ -8,9 +8,9 @@ para ofrecer al jugador una recapitulación coherente.
 """
 
 import os
-import json
 from datetime import datetime
 from core.renderer import render
+from core.utils import codec
 
 
 class RecapManager:
@@ -36,7 +36,7 @@ class RecapManager:
 
         if not os.path.exists(self.state_path):
             with open(self.state_path, "w", encoding="utf-8") as f:
-                json.dump(
+                codec.dump(
                     {
                         "mood_state": "neutral",
                         "mood_intensity": 0.5,
@@ -44,19 +44,17 @@ class RecapManager:
                         "last_update": datetime.utcnow().isoformat(),
                     },
                     f,
-                    indent=2,
-                    ensure_ascii=False,
                 )
 
         if not os.path.exists(self.scenes_path):
             with open(self.scenes_path, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=2, ensure_ascii=False)
+                codec.dump([], f)
 
     def _load_scenes(self) -> list:
         """Carga la lista de escenas guardadas."""
         try:
             with open(self.scenes_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return codec.load(f)
         except Exception:
             return []
 
@@ -64,7 +62,7 @@ class RecapManager:
         """Carga el estado tonal global."""
         try:
             with open(self.state_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return codec.load(f)
         except Exception:
             return {
                 "mood_state": "neutral",
@@ -1,9 +1,9 @@
-import json
 import os
 import logging
 from typing import Dict, Any, Optional
 
 from core.campaign.campaign_manager import CampaignManager
+from core.services.persistence_service import previous_snapshot_path, read_snapshot, save_json, verify_snapshot
 from core.auto_narrator import AutoNarrator
 from core.character_builder import CharacterBuilder
 from core.story_director.scene_template_engine import generate_scene_from_template
@@ -34,9 +34,19 @@ class StoryDirector:
 
     STATE_PATH = "data/story_director_state.json"
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        campaign_state_path: str = "data/campaign_state.json",
+        shard: bool = False,
+    ) -> None:
+        # state_path / campaign_state_path permiten un shard por chat (CampaignSessionRegistry)
+        if state_path:
+            self.STATE_PATH = state_path
         self.emotion_tracker = EmotionalTracker()
-        self.campaign_manager = CampaignManager()
+        self.campaign_manager = CampaignManager(
+            state_path=campaign_state_path, story_director_state_path=self.STATE_PATH, shard=shard
+        )
         self.auto_narrator = AutoNarrator()
         self.character_builder = CharacterBuilder()
         self.transition_engine = TransitionEngine()
@@ -51,22 +61,25 @@ class StoryDirector:
     # Persistencia básica
     # ------------------------------------------------------------------
     def _ensure_data_dir(self) -> None:
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(self.STATE_PATH) or "data", exist_ok=True)
 
     def _load_state(self) -> None:
-        if os.path.exists(self.STATE_PATH):
+        if os.path.exists(self.STATE_PATH) or os.path.exists(previous_snapshot_path(self.STATE_PATH)):
             try:
-                with open(self.STATE_PATH, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                # Snapshot verificado; si está dañado se usa el anterior (.prev)
+                data = read_snapshot(self.STATE_PATH)
                 self.players = data.get("players", {})
                 campaign_data = data.get("campaign", {})
                 
-                # Verificar que adventure_data esté en campaign_data antes de cargar
+                # Verificar que la aventura (referencia o datos embebidos antiguos) esté en campaign_data
                 adventure_data_in_file = 'adventure_data' in campaign_data and campaign_data.get('adventure_data') is not None
+                adventure_ref_in_file = campaign_data.get('adventure_ref')
                 campaign_name_in_file = campaign_data.get('campaign_name', '')
                 current_scene_id_in_file = campaign_data.get('current_scene_id')
                 
-                if adventure_data_in_file:
+                if adventure_ref_in_file:
+                    logger.info(f"[StoryDirector] _load_state - adventure_ref presente en archivo: {adventure_ref_in_file}, campaign_name: {campaign_name_in_file}, current_scene_id: {current_scene_id_in_file}")
+                elif adventure_data_in_file:
                     adventure = campaign_data.get('adventure_data')
                     if isinstance(adventure, dict) and "scenes" in adventure:
                         scene_count = len(adventure.get('scenes', []))
@@ -74,7 +87,7 @@ class StoryDirector:
                     else:
                         logger.warning(f"[StoryDirector] _load_state - adventure_data en archivo pero no tiene estructura válida")
                 else:
-                    logger.warning(f"[StoryDirector] _load_state - adventure_data NO presente en archivo. campaign_name: {campaign_name_in_file}, current_scene_id: {current_scene_id_in_file}")
+                    logger.warning(f"[StoryDirector] _load_state - aventura NO presente en archivo. campaign_name: {campaign_name_in_file}, current_scene_id: {current_scene_id_in_file}")
                 
                 self.campaign_manager.load_from_dict(campaign_data)
                 
@@ -102,55 +115,34 @@ class StoryDirector:
                 logger.warning(f"[StoryDirector] No se pudo cargar el estado: {e}")
 
     def _save_state(self) -> None:
-        campaign_dict = self.campaign_manager.to_dict()
-        
-        # Verificar que adventure_data está en el diccionario antes de guardar
-        adventure_data_in_dict = 'adventure_data' in campaign_dict and campaign_dict.get('adventure_data') is not None
-        current_scene_id_in_dict = campaign_dict.get('current_scene_id')
-        campaign_name_in_dict = campaign_dict.get('campaign_name', '')
-        
-        if adventure_data_in_dict:
-            adventure = campaign_dict.get('adventure_data')
-            if isinstance(adventure, dict):
-                scene_count = len(adventure.get('scenes', []))
-                logger.info(f"[StoryDirector] _save_state - adventure_data presente en to_dict() ({scene_count} escenas), current_scene_id: {current_scene_id_in_dict}, campaign_name: {campaign_name_in_dict}")
-            else:
-                logger.warning(f"[StoryDirector] _save_state - adventure_data en to_dict() pero no es dict: {type(adventure)}")
+        # Campos para el log leídos del estado en memoria: to_dict() (que exporta la
+        # aventura solo como referencia) se llama una vez, al escribir
+        campaign_state = self.campaign_manager.state
+        adventure_ref_in_dict = campaign_state.get('adventure_ref')
+        current_scene_id_in_dict = campaign_state.get('current_scene_id')
+        campaign_name_in_dict = campaign_state.get('campaign_name', '')
+        
+        if adventure_ref_in_dict:
+            logger.info(f"[StoryDirector] _save_state - adventure_ref: {adventure_ref_in_dict}, current_scene_id: {current_scene_id_in_dict}, campaign_name: {campaign_name_in_dict}")
         else:
-            logger.error(f"[StoryDirector] _save_state - ERROR: adventure_data NO está en to_dict()! campaign_name: {campaign_name_in_dict}, current_scene_id: {current_scene_id_in_dict}")
-        
-        data = {
-            "players": self.players,
-            "campaign": campaign_dict,
-        }
+            logger.warning(f"[StoryDirector] _save_state - adventure_ref NO está en el estado. campaign_name: {campaign_name_in_dict}, current_scene_id: {current_scene_id_in_dict}")
         
         try:
-            # Intentar serializar para verificar que no hay problemas
-            json_str = json.dumps(data, ensure_ascii=False, indent=2)
-            json_size = len(json_str)
-            logger.info(f"[StoryDirector] Estado serializado correctamente. Tamaño: {json_size} bytes")
+            # Escritura write-behind: el snapshot se recalcula al escribir para
+            # agrupar varios guardados seguidos en una sola escritura.
+            # Se guarda como snapshot atómico con cabecera (longitud + checksum).
+            written_now = save_json(
+                self.STATE_PATH,
+                lambda: {"players": self.players, "campaign": self.campaign_manager.to_dict()},
+                checksum=True,
+            )
             
-            with open(self.STATE_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Verificar que se guardó correctamente
-            if adventure_data_in_dict:
-                try:
-                    with open(self.STATE_PATH, "r", encoding="utf-8") as f:
-                        saved_data = json.load(f)
-                        saved_campaign = saved_data.get("campaign", {})
-                        saved_has_adventure = 'adventure_data' in saved_campaign and saved_campaign.get('adventure_data') is not None
-                        if saved_has_adventure:
-                            saved_adventure = saved_campaign.get('adventure_data')
-                            if isinstance(saved_adventure, dict):
-                                saved_scene_count = len(saved_adventure.get('scenes', []))
-                                logger.info(f"[StoryDirector] Estado guardado y verificado. adventure_data en archivo: True ({saved_scene_count} escenas)")
-                            else:
-                                logger.warning(f"[StoryDirector] adventure_data guardado pero no es dict: {type(saved_adventure)}")
-                        else:
-                            logger.error(f"[StoryDirector] ERROR: adventure_data NO se guardó en el archivo aunque estaba presente antes de guardar!")
-                except Exception as e:
-                    logger.warning(f"[StoryDirector] No se pudo verificar el archivo guardado: {e}", exc_info=True)
+            # Verificar el guardado por cabecera, sin releer el JSON
+            if adventure_ref_in_dict and written_now:
+                if verify_snapshot(self.STATE_PATH):
+                    logger.info(f"[StoryDirector] Estado guardado y verificado. adventure_ref: {adventure_ref_in_dict}")
+                else:
+                    logger.error(f"[StoryDirector] ERROR: el snapshot {self.STATE_PATH} no pasó la verificación de cabecera!")
             
             logger.info("[StoryDirector] Estado guardado.")
         except Exception as e:
@@ -517,6 +509,7 @@ class StoryDirector:
             "current_scene": "Oasis perdido",
             "active_party": []
         })
+        self.campaign_manager.rebuild_indexes()
         self.emotion_tracker.set_emotion("neutral")
         self._save_state()
         logger.info("[StoryDirector] Campaña reiniciada.")
@@ -546,7 +539,9 @@ class StoryDirector:
         self.campaign_manager.state["campaign_name"] = slug
         self.campaign_manager.state["campaign_title"] = info["title"]
         self.campaign_manager.state["chapter"] = 1
-        self.campaign_manager.state["adventure_data"] = adventure_data  # Guardar datos completos
+        # Registrar en el AdventureStore: el estado solo persiste la referencia {slug, hash}
+        adventure_ref = self.campaign_manager.set_adventure(slug, adventure_data)
+        adventure_data = self.campaign_manager.state["adventure_data"]
         
         # Obtener escena inicial
         initial_scene = loader.get_initial_scene(adventure_data)
@@ -556,7 +551,6 @@ class StoryDirector:
             # Asegurar que current_scene sea el título, no un ID o nombre de archivo
             self.campaign_manager.state["current_scene"] = scene_title
             self.campaign_manager.state["current_scene_id"] = scene_id
-            self.campaign_manager.state["adventure_scenes"] = adventure_data.get("scenes", [])
             logger.info(f"[StoryDirector] Escena inicial configurada: {scene_title} (ID: {scene_id})")
             logger.info(f"[StoryDirector] Verificación: current_scene='{self.campaign_manager.state['current_scene']}', current_scene_id='{scene_id}'")
         else:
@@ -564,13 +558,11 @@ class StoryDirector:
             logger.warning(f"[StoryDirector] No se encontró escena inicial en la aventura")
         
         # Guardar estado en CampaignManager (que persiste en JSON)
-        # IMPORTANTE: Guardar adventure_data completo
+        # La aventura queda en el AdventureStore; aquí solo se guarda adventure_ref
         self.campaign_manager._save_state()
         
-        # Verificar que adventure_data se guardó correctamente
-        adventure_data_saved = 'adventure_data' in self.campaign_manager.state
         current_scene_id_saved = self.campaign_manager.state.get('current_scene_id')
-        logger.info(f"[StoryDirector] Estado guardado en CampaignManager. adventure_data: {adventure_data_saved}, current_scene_id: {current_scene_id_saved}")
+        logger.info(f"[StoryDirector] Estado guardado en CampaignManager. adventure_ref: {adventure_ref}, current_scene_id: {current_scene_id_saved}")
         
         # También guardar en StoryDirector (que usa campaign_manager.to_dict())
         self._save_state()
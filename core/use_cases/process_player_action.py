@@ -6,7 +6,9 @@ Separa la logica de negocio del handler de Telegram.
 """
 
 import logging
-from typing import Dict, Any
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
 
 from core.interfaces import IGameService, IStoryDirector
 from core.story_director.director_link import DirectorLink
@@ -15,6 +17,33 @@ from core.exceptions import PlayerNotFoundError, GameAPIError
 logger = logging.getLogger(__name__)
 
 
+def split_round_narrative(narrative: str, player_names: List[str]) -> Dict[str, str]:
+    """
+    Separa una narrativa combinada de ronda por jugador.
+    Reconoce secciones que empiezan con el nombre del jugador al inicio de
+    linea ("Ana: ...", "*Ana*: ...", "**Ana** - ..."). El texto sin seccion
+    (introduccion comun) se antepone a la del primer jugador.
+    """
+    if not narrative or not player_names:
+        return {}
+    names = "|".join(re.escape(n) for n in sorted(set(player_names), key=len, reverse=True))
+    marker = re.compile(rf"^[ \t>*_]*({names})[*_]*\s*[:—–-]\s*", re.MULTILINE)
+    matches = list(marker.finditer(narrative))
+    if not matches:
+        return {}
+    sections: Dict[str, str] = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(narrative)
+        text = narrative[match.end():end].strip()
+        name = match.group(1)
+        sections[name] = f"{sections[name]}\n\n{text}" if name in sections else text
+    preamble = narrative[: matches[0].start()].strip()
+    if preamble:
+        first = matches[0].group(1)
+        sections[first] = f"{preamble}\n\n{sections[first]}"
+    return sections
+
+
 class ProcessPlayerActionUseCase:
     """
     Caso de uso: Procesar accion de jugador.
@@ -24,6 +53,12 @@ class ProcessPlayerActionUseCase:
     2. Procesamiento de accion a traves de GameAPI
     3. Procesamiento narrativo a traves de DirectorLink
     4. Actualizacion de estado emocional y temas
+
+    Si el GameAPI no esta disponible (circuit breaker abierto, caida o
+    timeout) responde con narracion local de la escena actual de la aventura.
+
+    chat_id es el chat de la sesion (CAMPAIGN_SESSIONS=1); el contexto que el
+    GameAPI cachea se identifica por (chat_id, telegram_id), no por nombre.
     """
 
     def __init__(
@@ -31,10 +66,12 @@ class ProcessPlayerActionUseCase:
         game_service: IGameService,
         story_director: IStoryDirector,
         director_link: DirectorLink,
+        chat_id: Optional[int] = None,
     ):
         self.game_service = game_service
         self.story_director = story_director
         self.director_link = director_link
+        self.chat_id = chat_id
 
     async def execute(self, player_id: int, action_text: str) -> Dict[str, Any]:
         # 1. Validar jugador
@@ -45,7 +82,172 @@ class ProcessPlayerActionUseCase:
         player_name = player.get("name", "Unknown")
 
         # 2. Obtener contexto de la escena actual
+        scene, scene_context = self._scene_context()
+
+        # 3. Procesar accion a traves de GameAPI (la clave se mantiene entre reintentos)
+        result = await self.game_service.process_action(
+            player_name=player_name, 
+            action_text=action_text,
+            character_data=player,
+            scene_context=scene_context,
+            idempotency_key=uuid4().hex,
+            context_key=(self.chat_id, player_id),
+        )
+
+        if not result.get("success") and result.get("unavailable"):
+            fallback = self._local_narration(scene)
+            if fallback:
+                logger.warning(f"[ProcessPlayerAction] GameAPI no disponible, narracion local: {result.get('error')}")
+                return {
+                    "narrative": fallback,
+                    "player_name": player_name,
+                    "event": None,
+                    "degraded": True,
+                }
+
+        if not result.get("success"):
+            error_msg = result.get("error", "Error desconocido")
+            raise GameAPIError(f"Error del GameAPI: {error_msg}")
+
+        # 4. Obtener respuesta narrativa
+        narrative_raw = result.get("result", "")
+        event = result.get("event")
+
+        # 5. Procesar resultado narrativo a traves de DirectorLink
+        narrative = await self._narrate(action_text, narrative_raw, event)
+
+        return {
+            "narrative": narrative,
+            "player_name": player_name,
+            "event": event,
+        }
+
+    async def execute_stream(
+        self,
+        player_id: int,
+        action_text: str,
+        on_progress: Callable[[str], Awaitable[None]],
+    ) -> Dict[str, Any]:
+        """
+        Como execute, pero consume la narrativa en streaming: on_progress recibe
+        el texto acumulado cada vez que llega un fragmento. El resultado final
+        pasa igualmente por DirectorLink.
+        Si el GameAPI no soporta streaming se usa execute.
+        """
+        player = self.story_director.get_player(player_id)
+        if not player:
+            raise PlayerNotFoundError(f"Jugador con ID {player_id} no encontrado")
+
+        player_name = player.get("name", "Unknown")
+        scene, scene_context = self._scene_context()
+        received: List[str] = []
+
+        async def on_delta(delta: str) -> None:
+            received.append(delta)
+            await on_progress("".join(received))
+
+        result = await self.game_service.stream_action(
+            player_name=player_name,
+            action_text=action_text,
+            on_delta=on_delta,
+            character_data=player,
+            scene_context=scene_context,
+            idempotency_key=uuid4().hex,
+            context_key=(self.chat_id, player_id),
+        )
+
+        if result.get("unsupported"):
+            logger.info("[ProcessPlayerAction] GameAPI sin streaming, se usa /game/action")
+            return await self.execute(player_id, action_text)
+
+        if not result.get("success") and result.get("unavailable"):
+            fallback = self._local_narration(scene)
+            if fallback:
+                logger.warning(f"[ProcessPlayerAction] GameAPI no disponible, narracion local: {result.get('error')}")
+                return {"narrative": fallback, "player_name": player_name, "event": None, "degraded": True}
+
+        if not result.get("success"):
+            raise GameAPIError(f"Error del GameAPI: {result.get('error', 'Error desconocido')}")
+
+        event = result.get("event")
+        return {
+            "narrative": await self._narrate(action_text, result.get("result", ""), event),
+            "player_name": player_name,
+            "event": event,
+        }
+
+    async def execute_round(self, actions: List[Tuple[int, str]]) -> Dict[str, Any]:
+        """
+        Procesa una ronda de acciones de un chat con una sola llamada al GameAPI.
+
+        Args:
+            actions: [(player_id, action_text)] en orden de llegada
+
+        Returns:
+            {"results": [{"player_id", "player_name", "action_text", "narrative", "event"}],
+             "degraded": bool, "narrative": narracion local si el GameAPI no esta disponible}
+        """
+        batch = []
+        for player_id, action_text in actions:
+            player = self.story_director.get_player(player_id)
+            if not player:
+                logger.warning(f"[ProcessPlayerAction] Jugador {player_id} sin personaje, accion descartada de la ronda")
+                continue
+            batch.append({
+                "action_id": uuid4().hex,
+                "player_id": player_id,
+                "player_name": player.get("name", "Unknown"),
+                "action_text": action_text,
+                "character_data": player,
+            })
+        if not batch:
+            raise PlayerNotFoundError("Ninguna accion de la ronda tiene un personaje asociado")
+
+        scene, scene_context = self._scene_context()
+        result = await self.game_service.process_action_batch(batch, scene_context=scene_context)
+
+        if result.get("unsupported"):
+            # GameAPI sin endpoint de rondas: una llamada por accion
+            logger.info("[ProcessPlayerAction] GameAPI sin soporte de rondas, procesando acciones por separado")
+            results = []
+            for item in batch:
+                single = await self.execute(item["player_id"], item["action_text"])
+                results.append({**single, "player_id": item["player_id"], "action_text": item["action_text"]})
+            return {"results": results, "degraded": any(r.get("degraded") for r in results)}
+
+        if not result.get("success") and result.get("unavailable"):
+            fallback = self._local_narration(scene)
+            if fallback:
+                logger.warning(f"[ProcessPlayerAction] GameAPI no disponible, narracion local para la ronda: {result.get('error')}")
+                return {"results": [], "degraded": True, "narrative": fallback}
+
+        if not result.get("success"):
+            raise GameAPIError(f"Error del GameAPI: {result.get('error', 'Error desconocido')}")
+
+        by_id = {r.get("action_id"): r for r in result.get("results", []) if isinstance(r, dict)}
+        combined = split_round_narrative(result.get("narrative", ""), [item["player_name"] for item in batch])
+
+        results = []
+        for item in batch:
+            entry = by_id.get(item["action_id"]) or {}
+            narrative_raw = entry.get("result") or combined.get(item["player_name"], "")
+            event = entry.get("event")
+            results.append({
+                "player_id": item["player_id"],
+                "player_name": item["player_name"],
+                "action_text": item["action_text"],
+                "narrative": await self._narrate(item["action_text"], narrative_raw, event),
+                "event": event,
+            })
+        return {"results": results, "degraded": False}
+
+    # ---------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------
+    def _scene_context(self) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Devuelve (escena, contexto para el GameAPI) de la escena actual."""
         scene_context = None
+        scene = None
         try:
             current_scene_data = self.story_director.get_current_scene()
             if current_scene_data.get("found") and current_scene_data.get("scene"):
@@ -69,27 +271,13 @@ class ProcessPlayerActionUseCase:
                     logger.warning("[ProcessPlayerAction] Escena generica detectada. Usa /loadcampaign para cargar una aventura.")
         except Exception as e:
             logger.warning(f"[ProcessPlayerAction] No se pudo obtener contexto de escena: {e}")
+        return scene, scene_context
 
-        # 3. Procesar accion a traves de GameAPI
-        result = await self.game_service.process_action(
-            player_name=player_name, 
-            action_text=action_text,
-            character_data=player,
-            scene_context=scene_context
-        )
-
-        if not result.get("success"):
-            error_msg = result.get("error", "Error desconocido")
-            raise GameAPIError(f"Error del GameAPI: {error_msg}")
-
-        # 4. Obtener respuesta narrativa
-        narrative_raw = result.get("result", "")
-        event = result.get("event")
-
-        # 5. Procesar resultado narrativo a traves de DirectorLink
+    async def _narrate(self, action_text: str, narrative_raw: str, event: Optional[Dict[str, Any]]) -> str:
+        """Pasa el resultado por DirectorLink y actualiza emociones y temas."""
         game_result = {
             "action": action_text,
-            "outcome": "success" if result.get("success") else "failure",
+            "outcome": "success",
             "emotion": "neutral",
             "description": narrative_raw,
             "event": event,
@@ -97,7 +285,7 @@ class ProcessPlayerActionUseCase:
 
         narrative = await self.director_link.process_game_result(game_result)
 
-        # 6. Actualizar estado emocional si hay evento
+        # Actualizar estado emocional si hay evento
         if event and hasattr(self.story_director, "emotion_tracker"):
             event_type = event.get("event_type", "")
             emotion_tracker = self.story_director.emotion_tracker
@@ -116,8 +304,22 @@ class ProcessPlayerActionUseCase:
                     theme = self.story_director.theme_tracker.detect_theme(game_state)
                     logger.debug(f"[ProcessPlayerAction] Tema detectado: {theme}")
 
-        return {
-            "narrative": narrative,
-            "player_name": player_name,
-            "event": event,
-        }
+        return narrative
+
+    @staticmethod
+    def _local_narration(scene: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Narracion de respaldo a partir de la escena actual de la aventura."""
+        if not scene:
+            return None
+        narration = scene.get("narration") or scene.get("description", "")
+        options_text = scene.get("options_text", [])
+        if not narration and not options_text:
+            return None
+        title = scene.get("title", "Escena")
+        options_list = ""
+        if options_text:
+            options_list = "\n\n*Opciones disponibles:*\n" + "\n".join(f"• {opt}" for opt in options_text)
+        return (
+            "_El motor de juego no responde ahora mismo; la historia sigue desde la escena actual._\n\n"
+            f"🎭 *{title}*\n\n{narration}{options_list}"
+        )
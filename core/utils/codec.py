@@ -0,0 +1,83 @@
+"""
+Codec
+-----
+Serialización JSON central (orjson) para los archivos de estado y memoria.
+
+- dumps() genera JSON compacto en UTF-8 (bytes); en modo pretty
+  (STATE_JSON_PRETTY=1 o pretty=True) usa indentación de 2 espacios para
+  depurar a mano los archivos de data/.
+- loads() / load() aceptan bytes o str; los errores son JSONDecodeError
+  (subclase de json.JSONDecodeError, así que los except existentes siguen valiendo).
+- Los modelos pydantic (SrdResponse, TelegramMessage, ...) se codifican
+  directamente, sin pasar por .dict() en el llamador.
+- Las claves no string (p.ej. los user_id int de StoryDirector.players)
+  se convierten a string, igual que con json.
+"""
+
+import io
+import os
+from typing import IO, Any, Optional, Union
+
+import orjson
+from pydantic import BaseModel
+
+JSONDecodeError = orjson.JSONDecodeError
+
+_BASE_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def pretty_default() -> bool:
+    """Modo pretty global para depuración (STATE_JSON_PRETTY=1)."""
+    return os.getenv("STATE_JSON_PRETTY", "").lower() in ("1", "true", "yes")
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data: Any, pretty: Optional[bool] = None, sort_keys: bool = False) -> bytes:
+    """Serializa a JSON UTF-8 (compacto salvo en modo pretty)."""
+    if pretty is None:
+        pretty = pretty_default()
+    option = _BASE_OPTIONS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(data, default=_default, option=option)
+
+
+def dumps_str(data: Any, pretty: Optional[bool] = None, sort_keys: bool = False) -> str:
+    """Como dumps() pero devuelve str (logs, columnas de texto SQLite)."""
+    return dumps(data, pretty=pretty, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(payload: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Deserializa JSON desde bytes o str."""
+    return orjson.loads(payload)
+
+
+def load(fp: IO) -> Any:
+    """Deserializa el contenido de un archivo abierto (texto o binario)."""
+    return orjson.loads(fp.read())
+
+
+def dump(data: Any, fp: IO, pretty: Optional[bool] = None) -> None:
+    """Escribe JSON en un archivo abierto (texto o binario)."""
+    payload = dumps(data, pretty=pretty)
+    if isinstance(fp, io.TextIOBase):
+        fp.write(payload.decode("utf-8"))
+    else:
+        fp.write(payload)
+
+
+def load_file(path: str) -> Any:
+    """Lee y deserializa un archivo JSON completo."""
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
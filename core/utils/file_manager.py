@@ -1,7 +1,7 @@
 import os
-import json
 from typing import Any, Dict, Optional
 from core.utils.logger import safe_logger
+from core.utils import codec
 
 logger = safe_logger(__name__)
 
@@ -38,22 +38,25 @@ class FileManager:
             return {}
         try:
             with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+                data = codec.load(f)
             logger.debug(f"Archivo cargado: {path}")
             return data
-        except json.JSONDecodeError as e:
+        except codec.JSONDecodeError as e:
             logger.error(f"Error al decodificar JSON ({path}): {e}")
             return {}
         except Exception as e:
             logger.exception(f"Error al leer archivo {path}: {e}")
             return {}
 
-    def save_json(self, relative_path: str, data: Dict[str, Any], indent: int = 2):
-        """Guarda datos en formato JSON con manejo seguro de errores."""
+    def save_json(self, relative_path: str, data: Dict[str, Any], pretty: Optional[bool] = None):
+        """
+        Guarda datos en formato JSON con manejo seguro de errores.
+        Compacto por defecto; pretty=True (o STATE_JSON_PRETTY=1) para depurar.
+        """
         path = self.build_path(relative_path)
         try:
             with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=indent, ensure_ascii=False)
+                codec.dump(data, f, pretty=pretty)
             logger.info(f"Archivo guardado correctamente: {path}")
         except Exception as e:
             logger.exception(f"Error al guardar JSON ({path}): {e}")
@@ -0,0 +1,128 @@
+"""
+Running Stats
+-------------
+Agregados incrementales para las memorias emocionales.
+
+- RunningStats: contadores por categoría, sumas, medias y medias
+  exponencialmente decaídas (EWMA). add() cuesta lo mismo sea cual sea el
+  tamaño del historial; to_dict()/from_dict() permiten guardarlos en el
+  resumen del SegmentedLog.
+- RecentWindow: ring buffer de los últimos registros para consultas de
+  ventana ("últimos 20", "últimas 2 horas") sin recorrer el historial.
+
+EMOTION_EWMA_HALF_LIFE fija la vida media (en registros) de las EWMA;
+EMOTION_WINDOW_SIZE el tamaño del ring buffer.
+"""
+
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+
+def _half_life_default() -> float:
+    return float(os.getenv("EMOTION_EWMA_HALF_LIFE", "20"))
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class RunningStats:
+    """Contadores, sumas y EWMA actualizados en O(1) por registro."""
+
+    def __init__(self, half_life: Optional[float] = None) -> None:
+        if half_life is None:
+            half_life = _half_life_default()
+        self.half_life = max(1.0, half_life)
+        self.alpha = 1 - 0.5 ** (1 / self.half_life)
+        self.count = 0
+        self.freq: Dict[str, int] = {}
+        self.sums: Dict[str, float] = {}
+        self.ewma: Dict[str, float] = {}
+
+    def add(self, category: Optional[str] = None, **values: float) -> None:
+        self.count += 1
+        if category is not None:
+            self.freq[category] = self.freq.get(category, 0) + 1
+        for name, value in values.items():
+            value = float(value)
+            self.sums[name] = self.sums.get(name, 0.0) + value
+            previous = self.ewma.get(name)
+            self.ewma[name] = value if previous is None else previous + self.alpha * (value - previous)
+
+    def mean(self, name: str, default: float = 0.0) -> float:
+        if not self.count or name not in self.sums:
+            return default
+        return self.sums[name] / self.count
+
+    def decayed(self, name: str, default: float = 0.0) -> float:
+        return self.ewma.get(name, default)
+
+    def dominant(self) -> Optional[str]:
+        return max(self.freq, key=self.freq.get) if self.freq else None
+
+    def distribution(self, ndigits: int = 2) -> Dict[str, float]:
+        total = sum(self.freq.values())
+        if not total:
+            return {}
+        return {k: round(v / total, ndigits) for k, v in self.freq.items()}
+
+    # ---------------------------------------------------------
+    # Persistencia
+    # ---------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "freq": self.freq, "sums": self.sums, "ewma": self.ewma}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], half_life: Optional[float] = None) -> "RunningStats":
+        stats = cls(half_life)
+        if data:
+            stats.count = int(data.get("count", 0))
+            stats.freq = dict(data.get("freq", {}))
+            stats.sums = dict(data.get("sums", {}))
+            stats.ewma = dict(data.get("ewma", {}))
+        return stats
+
+
+class RecentWindow:
+    """Ring buffer de los últimos registros (con su timestamp)."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), maxlen: Optional[int] = None) -> None:
+        if maxlen is None:
+            maxlen = int(os.getenv("EMOTION_WINDOW_SIZE", "200"))
+        self._items: Deque[Tuple[Optional[float], Dict[str, Any]]] = deque(maxlen=max(1, maxlen))
+        for record in records:
+            self.append(record)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self._items.append((_parse_timestamp(record.get("timestamp")), record))
+
+    def last(self, n: int) -> List[Dict[str, Any]]:
+        """Los últimos n registros (como mucho el tamaño del buffer)."""
+        if n <= 0:
+            return []
+        return [record for _, record in list(self._items)[-n:]]
+
+    def since(self, seconds: float, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Registros de los últimos `seconds` segundos dentro del buffer."""
+        if now is None:
+            now = datetime.utcnow().timestamp()
+        cutoff = now - seconds
+        result = []
+        for ts, record in reversed(self._items):
+            if ts is None or ts < cutoff:
+                break
+            result.append(record)
+        result.reverse()
+        return result
+
+    def __len__(self) -> int:
+        return len(self._items)
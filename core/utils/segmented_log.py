@@ -0,0 +1,302 @@
+"""
+Segmented Log
+-------------
+Log append-only segmentado para los historiales que crecen sin límite
+(memorias emocionales: CollectiveEmotionalMemory, ToneMemory,
+EmotionalReinforcementLoop, EmotionalWorldstateProjection).
+
+Estructura en disco (un directorio por log):
+    <dir>/000001-<epoch>.jsonl   segmentos, un registro JSON por línea
+    <dir>/summary.json           resumen duradero (snapshot con cabecera)
+
+- append() añade una línea al segmento activo: el coste por registro no
+  depende del tamaño del historial (antes se reescribía el archivo entero).
+- El segmento activo rota al superar EMOTION_LOG_SEGMENT_BYTES o
+  EMOTION_LOG_SEGMENT_HOURS.
+- Retención: se conservan los últimos EMOTION_LOG_MAX_SEGMENTS segmentos.
+  Antes de borrar uno, sus registros se entregan a on_expire(summary, records)
+  para que el componente los pliegue en el resumen, que sobrevive a la rotación.
+- Al abrir solo se leen los segmentos retenidos, así que el tiempo de carga
+  está acotado aunque la campaña dure meses.
+- Un archivo JSON antiguo ({"history": [...], ...}) se migra al abrir y se
+  renombra a <archivo>.migrated.
+- append() es síncrono y el resumen es write-behind: tras un cierre abrupto
+  los segmentos pueden tener registros que el resumen (y los agregados que
+  guardan los componentes en él) aún no cubría. El resumen anota cuántos
+  registros retenidos cubre; al abrir, los que sobran quedan en
+  unsummarized para que el componente los vuelva a plegar.
+"""
+
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from core.exceptions import SnapshotCorruptError
+from core.services.persistence_service import read_snapshot, save_json
+from core.utils import codec
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE = "summary.json"
+_SEGMENT_RE = re.compile(r"^(\d+)-(\d+)\.jsonl$")
+
+ExpireHook = Callable[[Dict[str, Any], List[Dict[str, Any]]], None]
+
+
+def log_dir_for(legacy_file: str) -> str:
+    """Directorio del log que sustituye a un archivo JSON de historial."""
+    return os.path.splitext(legacy_file)[0]
+
+
+@dataclass
+class _Segment:
+    seq: int
+    started: int
+    path: str
+    count: int = 0
+    size: int = 0
+
+
+class SegmentedLog:
+    """
+    Historial segmentado con retención y resumen duradero.
+
+    records contiene solo los registros de los segmentos retenidos;
+    total_records cuenta todos los registrados desde el inicio.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        on_expire: Optional[ExpireHook] = None,
+        legacy_file: Optional[str] = None,
+        segment_bytes: Optional[int] = None,
+        segment_seconds: Optional[int] = None,
+        max_segments: Optional[int] = None,
+    ) -> None:
+        if segment_bytes is None:
+            segment_bytes = int(os.getenv("EMOTION_LOG_SEGMENT_BYTES", str(256 * 1024)))
+        if segment_seconds is None:
+            segment_seconds = int(float(os.getenv("EMOTION_LOG_SEGMENT_HOURS", "24")) * 3600)
+        if max_segments is None:
+            max_segments = int(os.getenv("EMOTION_LOG_MAX_SEGMENTS", "8"))
+        self.directory = directory
+        self.summary_path = os.path.join(directory, SUMMARY_FILE)
+        self.on_expire = on_expire
+        self.segment_bytes = max(1, segment_bytes)
+        self.segment_seconds = max(1, segment_seconds)
+        self.max_segments = max(1, max_segments)
+
+        self.summary: Dict[str, Any] = {}
+        self.total_records = 0
+        self.records: List[Dict[str, Any]] = []
+        # Registros en disco posteriores al último resumen guardado (ver _load)
+        self.unsummarized: List[Dict[str, Any]] = []
+        self._segments: List[_Segment] = []
+        self._expired_through = 0
+        self._needs_rotation = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        if legacy_file:
+            self._migrate_legacy(legacy_file)
+
+    # ---------------------------------------------------------
+    # Carga
+    # ---------------------------------------------------------
+    def _load(self) -> None:
+        try:
+            data = read_snapshot(self.summary_path) or {}
+        except SnapshotCorruptError as e:
+            logger.error(f"[SegmentedLog] Resumen ilegible en {self.directory}: {e}")
+            data = {}
+        self.summary = data.get("summary") or {}
+        self.total_records = int(data.get("total_records", 0))
+        self._expired_through = int(data.get("expired_through", 0))
+
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if not match:
+                continue
+            seq, started = int(match.group(1)), int(match.group(2))
+            path = os.path.join(self.directory, name)
+            if seq <= self._expired_through:
+                # Ya plegado en el resumen; quedó sin borrar por un cierre abrupto
+                self._remove_file(path)
+                continue
+            segments.append(_Segment(seq, started, path))
+        segments.sort(key=lambda s: s.seq)
+
+        complete = True
+        for segment in segments:
+            self._segments.append(segment)
+            complete = self._read_segment(segment)
+        # Una última línea sin salto (escritura cortada) no debe pegarse a la siguiente
+        self._needs_rotation = not complete
+
+        summarized = data.get("retained_records")
+        if summarized is not None and len(self.records) > int(summarized):
+            # Registros añadidos después del último resumen escrito
+            self.unsummarized = self.records[int(summarized):]
+            self.total_records += len(self.unsummarized)
+            logger.warning(
+                f"[SegmentedLog] {len(self.unsummarized)} registros de {self.directory} no estaban en el resumen"
+            )
+        self._enforce_retention()
+
+        if self.total_records < len(self.records):
+            self.total_records = len(self.records)
+
+    def _read_segment(self, segment: _Segment) -> bool:
+        """Carga los registros de un segmento. Retorna False si acaba en una línea cortada."""
+        with open(segment.path, "rb") as f:
+            raw = f.read()
+        segment.size = len(raw)
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                self.records.append(codec.loads(line))
+                segment.count += 1
+            except codec.JSONDecodeError:
+                logger.warning(f"[SegmentedLog] Línea inválida descartada en {segment.path}")
+        return not raw or raw.endswith(b"\n")
+
+    def _migrate_legacy(self, legacy_file: str, key: str = "history") -> None:
+        if not os.path.exists(legacy_file):
+            return
+        if self.total_records or self._segments:
+            logger.warning(f"[SegmentedLog] {legacy_file} ignorado: el log {self.directory} ya tiene registros")
+            return
+        try:
+            data = codec.load_file(legacy_file)
+        except (OSError, codec.JSONDecodeError) as e:
+            logger.error(f"[SegmentedLog] No se pudo migrar {legacy_file}: {e}")
+            return
+        history = data.pop(key, []) if isinstance(data, dict) else []
+        if isinstance(data, dict):
+            self.summary.update(data)
+        for record in history:
+            self.append(record)
+        os.replace(legacy_file, legacy_file + ".migrated")
+        self.save()
+        logger.info(f"[SegmentedLog] {len(history)} registros migrados de {legacy_file} a {self.directory}")
+
+    # ---------------------------------------------------------
+    # Escritura
+    # ---------------------------------------------------------
+    def append(self, record: Dict[str, Any]) -> None:
+        """Añade un registro al segmento activo (rota si hace falta)."""
+        segment = self._segments[-1] if self._segments else None
+        if (
+            segment is None
+            or self._needs_rotation
+            or segment.size >= self.segment_bytes
+            or time.time() - segment.started >= self.segment_seconds
+        ):
+            segment = self._rotate()
+        line = codec.dumps(record, pretty=False) + b"\n"
+        with open(segment.path, "ab") as f:
+            f.write(line)
+        segment.count += 1
+        segment.size += len(line)
+        self.records.append(record)
+        self.total_records += 1
+
+    def _rotate(self) -> _Segment:
+        last_seq = self._segments[-1].seq if self._segments else self._expired_through
+        started = int(time.time())
+        segment = _Segment(last_seq + 1, started, os.path.join(self.directory, f"{last_seq + 1:06d}-{started}.jsonl"))
+        self._segments.append(segment)
+        self._needs_rotation = False
+        self._enforce_retention()
+        return segment
+
+    def _enforce_retention(self) -> None:
+        expired = False
+        while len(self._segments) > self.max_segments:
+            segment = self._segments.pop(0)
+            records = self.records[: segment.count]
+            del self.records[: segment.count]
+            if self.on_expire is not None and records:
+                self.on_expire(self.summary, records)
+            self._expired_through = segment.seq
+            expired = True
+        if expired:
+            # Los segmentos expirados se borran cuando el resumen ya está en disco
+            self.save()
+
+    def save(self) -> bool:
+        """Persiste el resumen (write-behind) y borra los segmentos ya plegados."""
+        return save_json(self.summary_path, self._snapshot, checksum=True, on_written=self._remove_expired)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            "summary": self.summary,
+            "total_records": self.total_records,
+            "expired_through": self._expired_through,
+            # Registros de los segmentos retenidos que este resumen ya cubre
+            "retained_records": len(self.records),
+        }
+
+    def _remove_expired(self) -> None:
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match and int(match.group(1)) <= self._expired_through:
+                self._remove_file(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # ---------------------------------------------------------
+    # Consulta
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "segments": len(self._segments),
+            "retained_records": len(self.records),
+            "total_records": self.total_records,
+            "retained_bytes": sum(s.size for s in self._segments),
+        }
+
+
+def read_log(directory: str, legacy_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Lectura de solo consulta (dashboards): el resumen más los registros
+    retenidos en "history". Si el log aún no existe, lee el archivo antiguo.
+    """
+    if not os.path.isdir(directory):
+        if legacy_file and os.path.exists(legacy_file):
+            try:
+                return codec.load_file(legacy_file)
+            except (OSError, codec.JSONDecodeError):
+                return {}
+        return {}
+    try:
+        data = read_snapshot(os.path.join(directory, SUMMARY_FILE)) or {}
+    except SnapshotCorruptError:
+        data = {}
+    expired_through = int(data.get("expired_through", 0))
+    history: List[Dict[str, Any]] = []
+    names = sorted(
+        (int(m.group(1)), name)
+        for name in os.listdir(directory)
+        if (m := _SEGMENT_RE.match(name)) and int(m.group(1)) > expired_through
+    )
+    for _, name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        history.append(codec.loads(line))
+                    except codec.JSONDecodeError:
+                        continue
+    return {**(data.get("summary") or {}), "history": history}
@@ -0,0 +1,27 @@
+"""
+Text
+----
+Normalización de texto para claves de búsqueda (SRD, nombres).
+"""
+
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def strip_accents(text: str) -> str:
+    """Quita tildes y diacríticos ("Proyectil Mágico" -> "Proyectil Magico")."""
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def fold_text(text: str) -> str:
+    """
+    Forma canónica para comparar: sin tildes, en minúsculas (casefold), sin
+    puntuación y con los espacios colapsados.
+    "  Bola de FUEGO! " -> "bola de fuego", "Hunter's Mark" -> "hunters mark"
+    """
+    text = strip_accents(text or "").casefold()
+    text = _NON_WORD.sub("", text)
+    return _SPACES.sub(" ", text).strip()
@@ -1,11 +1,13 @@
 # ==========================================================
 # ⚔️ SAM – Fase 7.3: Facciones y Repercusiones Regionales
 # ==========================================================
-import json
 import logging
 from pathlib import Path
 from random import randint, choice
 
+from core.services.persistence_service import save_json
+from core.utils import codec
+
 logger = logging.getLogger(__name__)
 
 class FactionManager:
@@ -26,12 +28,14 @@ class FactionManager:
             logger.warning(f"[FactionManager] No se encontró {self.factions_path}, creando base vacía.")
             return {"factions": []}
         with open(self.factions_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            return codec.load(f)
 
     def save_factions(self):
-        with open(self.factions_path, "w", encoding="utf-8") as f:
-            json.dump(self.factions, f, indent=4, ensure_ascii=False)
-        logger.info(f"[FactionManager] Estado de facciones guardado en {self.factions_path}")
+        written_now = save_json(str(self.factions_path), lambda: self.factions)
+        if written_now:
+            logger.info(f"[FactionManager] Estado de facciones guardado en {self.factions_path}")
+        else:
+            logger.debug(f"[FactionManager] Guardado de facciones programado para {self.factions_path}")
 
     # ==========================================================
     # FUNCIONES PRINCIPALES
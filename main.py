@@ -1,9 +1,9 @@
 import os
 import logging
-import httpx
 from dotenv import load_dotenv
 
-from telegram.ext import ApplicationBuilder
+from telegram import Update
+from telegram.ext import ApplicationBuilder, TypeHandler
 
 # importa tu campaign manager real
 from core.campaign.campaign_manager import CampaignManager
@@ -18,6 +18,21 @@ from core.story_director.story_director import StoryDirector
 from core.services.game_service import GameService
 # importa ServiceContainer para inyeccion de dependencias
 from core.container.service_container import ServiceContainer
+# clientes HTTP compartidos (GameAPI, SRD)
+from core.services.http_client_manager import (
+    HttpClientManager,
+    get_http_client_manager,
+    install_http_client_manager,
+)
+# colas ordenadas por chat (procesamiento paralelo entre chats)
+from core.services.chat_dispatcher import ChatUpdateProcessor, chat_dispatcher_enabled
+# calentamiento de GameAPI/SRD segun trafico real y franjas de juego previstas
+from core.services.warmup_scheduler import WarmupScheduler
+# cache de dos niveles (memoria + disco) de las consultas al SRD
+from core.services.srd_cache import close_srd_cache, get_srd_cache
+# snapshot local del SRD con indice invertido
+from core.services.srd_snapshot import get_srd_snapshot, refresh_snapshot_if_stale
+from core.services.srd_resolver import get_srd_resolver
 
 # ---------------------------------------------------------------------
 # LOGGING
@@ -30,20 +45,86 @@ logger = logging.getLogger("SAM-Bot")
 
 
 # ---------------------------------------------------------------------
-# KEEP-ALIVE PARA GAMEAPI
+# ESTADISTICAS PERIODICAS (clientes HTTP, caches, colas, calentamiento)
+# ---------------------------------------------------------------------
+async def log_service_stats(context):
+    """Registra en el log las estadisticas de los servicios compartidos."""
+    manager = get_http_client_manager()
+    if manager is not None:
+        manager.log_stats()
+    game_service = context.bot_data.get("game_service")
+    if game_service is not None:
+        logger.info(f"[GameService] Cache de estado/party: {game_service.state_cache.snapshot()}")
+    if isinstance(context.application.update_processor, ChatUpdateProcessor):
+        context.application.update_processor.log_stats()
+    warmup = context.bot_data.get("warmup")
+    if warmup is not None:
+        warmup.log_stats()
+    get_srd_cache().log_stats()
+
+
 # ---------------------------------------------------------------------
-async def keep_alive_gameapi(context):
-    """Hace ping al GameAPI cada 10 minutos para mantenerlo despierto."""
-    api_url = os.getenv("GAME_API_URL", "https://sam-gameapi.onrender.com")
+# COMPACTACION DEL JOURNAL DE CAMPANA
+# ---------------------------------------------------------------------
+async def compact_campaign_journal(context):
+    """Compacta el journal de CampaignManager en un snapshot completo."""
+    campaign_manager = context.bot_data.get("campaign_manager")
+    if campaign_manager is None:
+        return
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{api_url}/health")
-            if response.status_code == 200:
-                logger.info("[KeepAlive] GameAPI ping exitoso - servicio activo")
-            else:
-                logger.warning(f"[KeepAlive] GameAPI respondio con status {response.status_code}")
+        campaign_manager.compact_journal()
+        session_registry = context.bot_data.get("session_registry")
+        if session_registry is not None and session_registry.enabled:
+            session_registry.compact_journals()
     except Exception as e:
-        logger.warning(f"[KeepAlive] No se pudo contactar GameAPI: {e}")
+        logger.warning(f"[Journal] No se pudo compactar el journal de campana: {e}")
+
+
+# ---------------------------------------------------------------------
+# ARRANQUE: clientes HTTP compartidos
+# ---------------------------------------------------------------------
+async def start_http_clients(application) -> None:
+    """Crea el manager de clientes HTTP (un pool por servicio externo)."""
+    manager = HttpClientManager()
+    install_http_client_manager(manager)
+    application.bot_data["http_clients"] = manager
+    logger.info(f"[HttpClients] Clientes HTTP compartidos listos (HTTP/2: {manager.http2})")
+
+
+# ---------------------------------------------------------------------
+# APAGADO: cerrar clientes HTTP y volcar escrituras pendientes
+# ---------------------------------------------------------------------
+async def close_http_clients(application) -> None:
+    """Cierra los pools de conexiones y registra sus estadisticas de reutilizacion."""
+    manager = application.bot_data.pop("http_clients", None)
+    if manager is None:
+        return
+    manager.log_stats()
+    await manager.aclose()
+    install_http_client_manager(None)
+
+
+async def on_shutdown(application) -> None:
+    warmup = application.bot_data.get("warmup")
+    if warmup is not None:
+        await warmup.aclose()
+    await close_http_clients(application)
+    await close_srd_cache()
+    await flush_persistence(application)
+
+
+async def flush_persistence(application) -> None:
+    """Escribe en disco todo el estado pendiente del PersistenceService."""
+    container = application.bot_data.get("container")
+    if container is None:
+        return
+    try:
+        # Persistir y cerrar las sesiones por chat antes del volcado final
+        container.session_registry.close_all()
+        await container.persistence_service.flush()
+        logger.info("[Persistence] Estado pendiente guardado antes de apagar")
+    except Exception as e:
+        logger.error(f"[Persistence] Error guardando estado pendiente al apagar: {e}")
 
 
 def main() -> None:
@@ -58,17 +139,34 @@ def main() -> None:
 
     # Crear ServiceContainer para gestion centralizada de servicios
     container = ServiceContainer()
+    # Instalar el servicio de persistencia write-behind antes de crear los managers
+    container.persistence_service
     
     logger.info("ServiceContainer creado - Servicios disponibles bajo demanda")
 
     # construimos la aplicacion de telegram
-    application = ApplicationBuilder().token(bot_token).build()
+    builder = (
+        ApplicationBuilder()
+        .token(bot_token)
+        .post_init(start_http_clients)
+        .post_shutdown(on_shutdown)
+    )
+    if chat_dispatcher_enabled():
+        # Un chat a la vez en orden; chats distintos en paralelo
+        builder = builder.concurrent_updates(ChatUpdateProcessor(session_registry=container.session_registry))
+    application = builder.build()
     
     # Guardar container y servicios en bot_data para que los handlers puedan accederlos
     application.bot_data["container"] = container
     application.bot_data["story_director"] = container.story_director
     application.bot_data["game_service"] = container.game_service
     application.bot_data["campaign_manager"] = container.campaign_manager
+    application.bot_data["session_registry"] = container.session_registry
+    if container.session_registry.enabled:
+        logger.info(
+            f"[Sessions] Sesiones por chat activas - shards en {container.session_registry.base_dir}, "
+            f"maximo {container.session_registry.max_sessions} en memoria"
+        )
 
     # registramos TODOS los comandos de jugador
     register_player_handlers(application, container.campaign_manager)
@@ -96,12 +194,40 @@ def main() -> None:
     application.add_error_handler(error_handler)
 
     # ---------------------------------------------------------------------
-    # KEEP-ALIVE JOB: Ping al GameAPI cada 10 minutos
+    # WARM-UP JOB: GameAPI y SRD despiertos solo cuando hace falta
     # ---------------------------------------------------------------------
     job_queue = application.job_queue
-    # Primer ping despues de 30 segundos, luego cada 10 minutos (600 segundos)
-    job_queue.run_repeating(keep_alive_gameapi, interval=600, first=30, name="gameapi_keepalive")
-    logger.info("[KeepAlive] Programado ping al GameAPI cada 10 minutos")
+    warmup = WarmupScheduler()
+    application.bot_data["warmup"] = warmup
+    # Todos los updates cuentan como actividad (grupo previo al resto, sin bloquear)
+    application.add_handler(TypeHandler(Update, warmup.on_update, block=False), group=-2)
+    warmup_interval = int(os.getenv("WARMUP_TICK_SECONDS", "60"))
+    job_queue.run_repeating(warmup.tick, interval=warmup_interval, first=30, name="service_warmup")
+    job_queue.run_repeating(log_service_stats, interval=600, first=600, name="service_stats")
+    logger.info(
+        f"[Warmup] Calentamiento de GameAPI/SRD cada {warmup_interval} segundos "
+        f"(aprendiendo franjas de juego: {warmup.learning})"
+    )
+
+    # ---------------------------------------------------------------------
+    # SRD SNAPSHOT: lookups locales; descarga en segundo plano si falta o caduco
+    # ---------------------------------------------------------------------
+    get_srd_snapshot()
+    # Resolver de nombres SRD (erratas y alias es/en), construido una vez
+    get_srd_resolver()
+    if os.getenv("SRD_SNAPSHOT_AUTO_SYNC", "1").lower() not in ("0", "false", "no"):
+        job_queue.run_repeating(refresh_snapshot_if_stale, interval=3600, first=60, name="srd_snapshot_sync")
+        logger.info("[SrdSnapshot] Sincronizacion automatica del snapshot SRD activada")
+
+    # ---------------------------------------------------------------------
+    # JOURNAL JOB: Compactacion periodica del journal de campana
+    # ---------------------------------------------------------------------
+    if container.campaign_manager.journal is not None:
+        compact_interval = int(os.getenv("CAMPAIGN_JOURNAL_COMPACT_INTERVAL", "300"))
+        job_queue.run_repeating(
+            compact_campaign_journal, interval=compact_interval, first=compact_interval, name="campaign_journal_compact"
+        )
+        logger.info(f"[Journal] Modo journal activo - compactacion cada {compact_interval} segundos")
 
     logger.info("SAM The Dungeon Bot iniciado correctamente.")
     logger.info("Modo conversacional activado - Los jugadores pueden usar lenguaje natural.")